@@ -0,0 +1,128 @@
+# action_registry.py - One table of RPA actions: handlers, param schemas, resources and timing
+import time
+
+from metrics import metrics
+
+# What an action needs to run
+RESOURCES = ("desktop", "browser", "none")
+
+
+class ActionSpec:
+    """One action: the executor method that runs it, what it needs and how the UI settles after it"""
+    def __init__(self, name, method, params=None, resource="desktop", idempotent=False, settle="input",
+                 internal=False, internal_params=()):
+        if resource not in RESOURCES:
+            raise ValueError(f"Unknown resource for {name}: {resource}")
+        self.name = name
+        self.method = method
+        # {param: (JSON schema type, required)}, as used by instruction_schema
+        self.params = dict(params or {})
+        self.resource = resource
+        self.idempotent = idempotent
+        # Name of the settle.SETTLE_POLICIES entry the executors wait on after this action
+        self.settle = settle
+        # Internal actions and params are only written by the plan optimizer: they are
+        # left out of the plan schema and validator, and stripped from incoming plans
+        self.internal = internal
+        self.internal_params = frozenset(internal_params)
+        self.takes_params = bool(self.params)
+
+
+class ActionRegistry:
+    """Name -> ActionSpec table shared by the executors
+
+    Handlers are executor method names, so subclasses that override an action
+    method (like the web executor's logging versions) are still dispatched to.
+    Each action also names the settle policy to wait on after it. Every dispatch
+    is timed into metrics as action.<NAME>.s, failures are counted as
+    action.<NAME>.errors, and hooks(name, elapsed_s, error) are called.
+    """
+    def __init__(self):
+        self._specs = {}
+        self.hooks = []
+
+    def register(self, name, method, params=None, resource="desktop", idempotent=False, settle="input",
+                 internal=False, internal_params=()):
+        self._specs[name] = ActionSpec(name, method, params, resource, idempotent, settle,
+                                       internal, internal_params)
+        return self._specs[name]
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def __iter__(self):
+        return iter(self._specs.values())
+
+    def get(self, name):
+        return self._specs.get(name)
+
+    def action_params(self):
+        """{action: {param: (type, required)}} of the public actions, for schema building and validation"""
+        return {spec.name: {name: param for name, param in spec.params.items()
+                            if name not in spec.internal_params}
+                for spec in self._specs.values() if not spec.internal}
+
+    def strip_internal(self, instructions):
+        """A plan from outside without internal actions and params; other steps are kept as they are"""
+        stripped = []
+        for step in instructions:
+            spec = self._specs.get(step.get("action")) if isinstance(step, dict) else None
+            if spec is not None and spec.internal:
+                continue
+            params = step.get("params") if spec is not None else None
+            if isinstance(params, dict) and spec.internal_params & params.keys():
+                step = dict(step, params={k: v for k, v in params.items() if k not in spec.internal_params})
+            stripped.append(step)
+        return stripped
+
+    def resources(self, instructions):
+        """The set of resources a list of instructions needs"""
+        return {self._specs[step.get("action")].resource
+                for step in instructions if step.get("action") in self._specs}
+
+    def dispatch(self, executor, instruction):
+        """Run one instruction on an executor; raises KeyError for unknown actions"""
+        spec = self._specs[instruction.get("action")]
+        handler = getattr(executor, spec.method)
+        error = None
+        start = time.perf_counter()
+        try:
+            if spec.takes_params:
+                return handler(instruction.get("params", {}))
+            return handler()
+        except Exception as e:
+            error = e
+            metrics.incr(f"action.{spec.name}.errors")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe(f"action.{spec.name}.s", elapsed)
+            for hook in self.hooks:
+                hook(spec.name, elapsed, error)
+
+
+ACTIONS = ActionRegistry()
+ACTIONS.register("WEB_SEARCH", "web_search_action",
+                 {"site": ("string", True), "query": ("string", True), "auto_play": ("boolean", False)},
+                 resource="browser", idempotent=True, settle="none")
+# Launches wait for their own start-up inside the action
+ACTIONS.register("OPEN_APP", "open_app_action",
+                 {"app": ("string", True), "wait_time": ("number", False), "defer_ready": ("boolean", False)},
+                 idempotent=True, settle="none", internal_params=("defer_ready",))
+ACTIONS.register("OPEN_URL", "open_url_action",
+                 {"url": ("string", True), "wait_time": ("number", False), "defer_ready": ("boolean", False)},
+                 settle="none", internal_params=("defer_ready",))
+# Waits for the launches made with defer_ready, each up to its own wait_time
+ACTIONS.register("WAIT_READY", "wait_ready_action", {"wait_time": ("number", False)}, idempotent=True,
+                 settle="none", internal=True)
+ACTIONS.register("CLICK", "click_action", {"x": ("integer", False), "y": ("integer", False)})
+ACTIONS.register("TYPE", "type_action", {"text": ("string", True), "interval": ("number", False)})
+ACTIONS.register("SCREENSHOT", "screenshot_action", {"filename": ("string", False)}, idempotent=True,
+                 settle="none")
+ACTIONS.register("WAIT", "wait_action", {"seconds": ("number", True)}, resource="none", idempotent=True,
+                 settle="none")
+ACTIONS.register("COPY", "copy_action", idempotent=True, settle="none")
+ACTIONS.register("PASTE", "paste_action")
+ACTIONS.register("SCROLL", "scroll_action", {"direction": ("string", False), "clicks": ("integer", False)})
+ACTIONS.register("PRESS_KEY", "press_key_action", {"key": ("string", True)})
+ACTIONS.register("HOTKEY", "hotkey_action", {"keys": ("array", True)})
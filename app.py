@@ -1,15 +1,22 @@
 # app.py - Flask Web Application for RPA Bot
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response
 from flask_cors import CORS
 import json
 import time
 import threading
 import queue
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 # Import from main_enhanced
 from main import RPABot, RPAExecutor, WebAutomator, SELENIUM_AVAILABLE, SPEECH_AVAILABLE, TTS_AVAILABLE
+from metrics import metrics
+from llm_telemetry import llm_telemetry
+from plan_stream import prefetch
+from action_registry import ACTIONS
+from plan_cache import normalize_task
+from single_flight import SingleFlight
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
@@ -20,6 +27,11 @@ execution_logs = {}
 execution_status = {}
 active_executors = {}  # Keep executors alive to prevent browser from closing
 
+# Batch planning: how many cache/fast-path misses may be sent to Ollama at once
+BATCH_LLM_CONCURRENCY = 2
+MAX_BATCH_LLM_CONCURRENCY = 8
+MAX_BATCH_TASKS = 1000
+
 class LogCapture:
     """Capture logs from RPA execution"""
     def __init__(self, session_id):
@@ -45,77 +57,97 @@ class LogCapture:
 
 class WebRPAExecutor(RPAExecutor):
     """Extended RPA Executor with logging capability"""
-    def __init__(self, logger):
-        super().__init__()
+    def __init__(self, logger, **kwargs):
+        super().__init__(**kwargs)
         self.logger = logger
         
     def execute_instructions(self, instructions):
         """Execute instructions with logging"""
+        instructions, report = self.optimize_plan(instructions)
+        if report["rules"]:
+            self.logger.log(f"🧹 Optimized plan ({', '.join(report['rules'])}): "
+                            f"{report['steps_before']} -> {report['steps_after']} steps, "
+                            f"~{report['estimated_saved_s']:.1f}s saved", "info")
         self.logger.log(f"🚀 Starting execution of {len(instructions)} instructions", "info")
         
-        web_actions_present = any(
-            inst.get("action", "").startswith("WEB_") 
-            for inst in instructions
-        )
+        web_actions_present = "browser" in self.actions.resources(instructions)
         
         if web_actions_present:
             if not self.web_automator.setup_driver():
                 self.logger.log("❌ Cannot perform web actions without browser automation", "error")
                 return False
         
+        self.reset_idle()
         try:
-            for i, instruction in enumerate(instructions):
-                action = instruction.get("action")
-                params = instruction.get("params", {})
+            if self.scheduler.worthwhile(instructions):
+                self.scheduler.run(self, instructions)
+            else:
+                self.run_in_order(instructions)
+            
+            self.logger.log("✅ All instructions completed!", "success")
+            self.logger.log(f"💤 Idle {self.idle_s:.2f}s settling (fixed sleeps: {self.fixed_idle_s:.2f}s)", "info")
+            
+            # Keep browser open for web actions
+            if web_actions_present:
+                self.logger.log("🌐 Browser is open. You can close it manually when done.", "info")
                 
-                self.logger.log(f"🔄 Step {i+1}/{len(instructions)}: {action}", "info")
+            return True
+            
+        except Exception as e:
+            self.logger.log(f"❌ Execution failed: {str(e)}", "error")
+            return False
+    
+    def execute_instruction_stream(self, instructions):
+        """Execute instructions with logging as they arrive from the planner"""
+        self.logger.log("🚀 Executing instructions as they are generated", "info")
+        start = time.perf_counter()
+        web_ready = False
+        count = 0
+        previous = None
+        self.reset_idle()
+        
+        try:
+            for instruction in self.incoming(instructions):
+                count += 1
+                if count == 1:
+                    self.logger.log(f"⚡ First action after {time.perf_counter() - start:.2f}s", "info")
+                self.logger.log(f"🔄 Step {count}: {instruction.get('action')}", "info")
                 
                 try:
-                    if action == "WEB_SEARCH":
-                        self.web_search_action(params)
-                    elif action == "OPEN_APP":
-                        self.open_app_action(params)
-                    elif action == "OPEN_URL":
-                        self.open_url_action(params)
-                    elif action == "CLICK":
-                        self.click_action(params)
-                    elif action == "TYPE":
-                        self.type_action(params)
-                    elif action == "SCREENSHOT":
-                        self.screenshot_action(params)
-                    elif action == "WAIT":
-                        self.wait_action(params)
-                    elif action == "COPY":
-                        self.copy_action()
-                    elif action == "PASTE":
-                        self.paste_action()
-                    elif action == "SCROLL":
-                        self.scroll_action(params)
-                    elif action == "PRESS_KEY":
-                        self.press_key_action(params)
-                    elif action == "HOTKEY":
-                        self.hotkey_action(params)
-                    else:
-                        self.logger.log(f"❌ Unknown action: {action}", "error")
-                        
-                    time.sleep(0.5)
+                    if previous is not None:
+                        self.settle_after(previous, instruction)
+                    previous = instruction
+                    if not web_ready and "browser" in self.actions.resources([instruction]):
+                        if not self.web_automator.setup_driver():
+                            self.logger.log("❌ Cannot perform web actions without browser automation", "error")
+                            continue
+                        web_ready = True
+                    self.execute_step(instruction)
                     
                 except Exception as e:
-                    self.logger.log(f"❌ Error in step {i+1}: {str(e)}", "error")
+                    self.logger.log(f"❌ Error in step {count}: {str(e)}", "error")
                     continue
-                    
-            self.logger.log("✅ All instructions completed!", "success")
             
-            # Keep browser open for web actions
-            if web_actions_present:
-                self.logger.log("🌐 Browser is open. You can close it manually when done.", "info")
+            if count == 0:
+                self.logger.log("❌ Could not generate instructions for this task", "error")
+                return False
                 
+            self.logger.log(f"✅ All {count} instructions completed!", "success")
+            self.logger.log(f"💤 Idle {self.idle_s:.2f}s settling (fixed sleeps: {self.fixed_idle_s:.2f}s)", "info")
+            if web_ready:
+                self.logger.log("🌐 Browser is open. You can close it manually when done.", "info")
             return True
             
         except Exception as e:
             self.logger.log(f"❌ Execution failed: {str(e)}", "error")
             return False
     
+    def log(self, message, level="info"):
+        self.logger.log(message, level)
+    
+    def unknown_action(self, action):
+        self.logger.log(f"❌ Unknown action: {action}", "error")
+    
     def web_search_action(self, params):
         super().web_search_action(params)
         site = params.get("site", "google")
@@ -123,9 +155,15 @@ class WebRPAExecutor(RPAExecutor):
         self.logger.log(f"🔍 Searching {site} for: '{query}'", "info")
     
     def open_app_action(self, params):
-        super().open_app_action(params)
+        readiness = super().open_app_action(params)
         app_name = params.get("app", "")
-        self.logger.log(f"✅ Opened application: {app_name}", "success")
+        if readiness is None:
+            self.logger.log(f"✅ Opened application: {app_name}", "success")
+        elif readiness["ready"]:
+            self.logger.log(f"✅ {app_name} ready in {readiness['latency_s']:.2f}s ({readiness['reason']})", "success")
+        else:
+            self.logger.log(f"⚠️  {app_name} not confirmed ready ({readiness['reason']})", "error" if readiness['reason'] == "failed" else "info")
+        return readiness
         
     def screenshot_action(self, params):
         super().screenshot_action(params)
@@ -135,6 +173,42 @@ class WebRPAExecutor(RPAExecutor):
 # Initialize bot globally
 rpa_bot = RPABot()
 
+# Identical tasks submitted concurrently share one generation
+plan_flight = SingleFlight("plan_singleflight")
+
+def generate_coalesced(user_task, session_id=None):
+    """Generate instructions, joining any identical generation already in flight"""
+    key = (rpa_bot.model_name, normalize_task(user_task))
+    return plan_flight.do(key, rpa_bot.generate_rpa_instructions, user_task, session_id)
+
+def plan_remotely_coalesced(user_task, session_id=None):
+    """Plan a task already known to miss the local planners, joining identical generations in flight"""
+    key = (rpa_bot.model_name, normalize_task(user_task))
+    return plan_flight.do(key, rpa_bot.plan_remotely, user_task, session_id)
+
+def resolve_speculation(speculation, instructions, logger):
+    """Settle speculative preparation once the plan first needs the browser
+
+    Steps that do not use the browser pass straight through; resolving against
+    the first browser step means the prepared browser is always kept for it.
+    The speculation is only discarded when the whole plan turns out not to need
+    a browser, after every step has run.
+    """
+    seen = []
+    resolved = False
+    try:
+        for instruction in instructions:
+            seen.append(instruction)
+            if not resolved and "browser" in ACTIONS.resources([instruction]):
+                resolved = True
+                report = speculation.resolve([instruction])
+                if report["time_saved_s"]:
+                    logger.log(f"⚡ Browser prepared ahead of the plan, saved {report['time_saved_s']:.2f}s", "info")
+            yield instruction
+    finally:
+        if not resolved:
+            speculation.resolve(seen)
+
 @app.route('/')
 def index():
     """Serve the main page"""
@@ -150,6 +224,38 @@ def get_status():
         "tts_available": TTS_AVAILABLE
     })
 
+@app.route('/api/metrics')
+def get_metrics():
+    """Get planning and LLM client metrics"""
+    return jsonify(metrics.snapshot())
+
+@app.route('/api/telemetry/llm')
+def get_llm_telemetry():
+    """Get per-call Ollama timings and rolling histograms, optionally for one session"""
+    session_id = request.args.get('session_id')
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify(llm_telemetry.snapshot(session_id, limit))
+
+@app.route('/api/router')
+def get_router():
+    """Get the learned hedge thresholds of the planning router"""
+    if rpa_bot.router is None:
+        return jsonify({"enabled": False, "model": rpa_bot.model_name})
+    return jsonify({
+        "enabled": True,
+        "fast_model": rpa_bot.router.fast_model,
+        "strong_model": rpa_bot.router.strong_model,
+        "thresholds": rpa_bot.router.thresholds()
+    })
+
+@app.route('/api/templates')
+def get_templates():
+    """Get the plan templates learned from LLM plans"""
+    return jsonify({"templates": rpa_bot.plan_templates.templates()})
+
 @app.route('/api/examples')
 def get_examples():
     """Get example tasks"""
@@ -174,13 +280,13 @@ def generate_instructions():
     if not user_task:
         return jsonify({"error": "No task provided"}), 400
     
+    # Generate session ID
+    session_id = data.get('session_id') or str(int(time.time() * 1000))
+    
     try:
-        instructions = rpa_bot.generate_rpa_instructions(user_task)
+        instructions = generate_coalesced(user_task, session_id)
         
         if instructions:
-            # Generate session ID
-            session_id = str(int(time.time() * 1000))
-            
             return jsonify({
                 "success": True,
                 "instructions": instructions,
@@ -199,6 +305,91 @@ def generate_instructions():
             "error": str(e)
         }), 500
 
+@app.route('/api/generate/batch', methods=['POST'])
+def generate_batch():
+    """Plan many tasks at once, streaming one NDJSON record per task as it completes"""
+    data = request.json or {}
+    tasks = data.get('tasks', [])
+    
+    if not isinstance(tasks, list) or not tasks:
+        return jsonify({"error": "No tasks provided"}), 400
+    if len(tasks) > MAX_BATCH_TASKS:
+        return jsonify({"error": f"At most {MAX_BATCH_TASKS} tasks per batch"}), 400
+    
+    try:
+        concurrency = int(data.get('concurrency', BATCH_LLM_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency must be an integer"}), 400
+    concurrency = max(1, min(concurrency, MAX_BATCH_LLM_CONCURRENCY))
+    session_id = data.get('session_id') or str(int(time.time() * 1000))
+    
+    def record(index, task, instructions, source, started):
+        entry = {
+            "index": index,
+            "task": task,
+            "source": source,
+            "elapsed_s": round(time.perf_counter() - started, 4)
+        }
+        if instructions:
+            entry.update({"success": True, "instructions": instructions, "count": len(instructions)})
+        else:
+            entry.update({"success": False, "error": "Could not generate instructions for this task"})
+        return json.dumps(entry) + "\n"
+    
+    def stream_results():
+        batch_start = time.perf_counter()
+        misses = []
+        local_count = 0
+        
+        # Cache and rule-based hits are answered immediately, in order
+        for index, task in enumerate(tasks):
+            started = time.perf_counter()
+            if not isinstance(task, str) or not task.strip():
+                yield json.dumps({"index": index, "task": task, "success": False,
+                                  "error": "No task provided"}) + "\n"
+                continue
+            instructions = rpa_bot.lookup_local_plan(task)
+            if instructions is not None:
+                local_count += 1
+                yield record(index, task, instructions, "local", started)
+            else:
+                misses.append((index, task))
+        
+        # Misses go to Ollama through a bounded window and stream back as they finish
+        if misses:
+            pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-plan")
+            try:
+                futures = {
+                    pool.submit(plan_remotely_coalesced, task, session_id): (index, task, time.perf_counter())
+                    for index, task in misses
+                }
+                for future in as_completed(futures):
+                    index, task, started = futures[future]
+                    try:
+                        instructions = future.result()
+                    except Exception as e:
+                        yield json.dumps({"index": index, "task": task, "success": False,
+                                          "error": str(e)}) + "\n"
+                        continue
+                    yield record(index, task, instructions, "llm", started)
+            finally:
+                # A client that disconnected mid-batch does not wait for plans nobody reads
+                pool.shutdown(wait=False, cancel_futures=True)
+        
+        metrics.incr("batch.tasks", len(tasks))
+        metrics.incr("batch.local_hits", local_count)
+        yield json.dumps({
+            "done": True,
+            "session_id": session_id,
+            "count": len(tasks),
+            "local": local_count,
+            "llm": len(misses),
+            "concurrency": concurrency,
+            "elapsed_s": round(time.perf_counter() - batch_start, 4)
+        }) + "\n"
+    
+    return Response(stream_results(), mimetype='application/x-ndjson')
+
 @app.route('/api/execute', methods=['POST'])
 def execute_task():
     """Execute RPA instructions"""
@@ -238,6 +429,46 @@ def execute_task():
         "message": "Execution started"
     })
 
+@app.route('/api/run', methods=['POST'])
+def run_task():
+    """Plan a task with a streaming LLM response and execute each step as soon as it is parsed"""
+    data = request.json
+    user_task = data.get('task', '')
+    session_id = data.get('session_id', str(int(time.time() * 1000)))
+    
+    if not user_task:
+        return jsonify({"error": "No task provided"}), 400
+    
+    execution_logs[session_id] = []
+    execution_status[session_id] = "running"
+    
+    def run_in_background():
+        logger = LogCapture(session_id)
+        executor = WebRPAExecutor(logger)
+        active_executors[session_id] = executor
+        
+        try:
+            # Warm the browser from the rule-based plan while the LLM is still planning
+            speculation = rpa_bot.start_speculation(user_task, executor.web_automator)
+            # Prefetch keeps the LLM decoding while earlier steps are executing
+            instructions = prefetch(rpa_bot.stream_rpa_instructions(user_task, session_id))
+            instructions = resolve_speculation(speculation, instructions, logger)
+            success = executor.execute_instruction_stream(instructions)
+            execution_status[session_id] = "completed" if success else "failed"
+        except Exception as e:
+            logger.log(f"Fatal error: {str(e)}", "error")
+            execution_status[session_id] = "failed"
+    
+    thread = threading.Thread(target=run_in_background)
+    thread.daemon = True
+    thread.start()
+    
+    return jsonify({
+        "success": True,
+        "session_id": session_id,
+        "message": "Execution started"
+    })
+
 @app.route('/api/logs/<session_id>')
 def get_logs(session_id):
     """Get execution logs for a session"""
@@ -255,7 +486,7 @@ def close_browser(session_id):
     try:
         if session_id in active_executors:
             executor = active_executors[session_id]
-            executor.web_automator.close()
+            executor.close_browsers()
             del active_executors[session_id]
             return jsonify({
                 "success": True,
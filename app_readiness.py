@@ -0,0 +1,206 @@
+# app_readiness.py - Waits for a launched app's window (or a settled process) instead of fixed sleeps
+import ctypes
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+import psutil
+
+from clock import RealClock
+from process_index import process_index
+
+try:
+    import Xlib.display
+    import Xlib.X
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+_XPROP_WINDOW_RE = re.compile(r"0x[0-9a-fA-F]+")
+_XPROP_PID_RE = re.compile(r"=\s*(\d+)")
+
+
+class WindowProbe:
+    """Lists the PIDs that own top-level windows
+
+    Uses EnumWindows on Windows, and on X11 (including Xvfb) the EWMH
+    _NET_CLIENT_LIST and _NET_WM_PID properties through python-xlib or the
+    xprop tool. window_pids() returns None when no backend is usable.
+    """
+    def __init__(self):
+        self.backend = None
+        self._display = None
+        if sys.platform == "win32":
+            self.backend = "win32"
+        elif XLIB_AVAILABLE:
+            try:
+                self._display = Xlib.display.Display()
+                self.backend = "xlib"
+            except Exception:
+                pass
+        if self.backend is None and sys.platform != "win32" and shutil.which("xprop"):
+            self.backend = "xprop"
+
+    def window_pids(self):
+        try:
+            if self.backend == "win32":
+                return self._win32_pids()
+            if self.backend == "xlib":
+                return self._xlib_pids()
+            if self.backend == "xprop":
+                return self._xprop_pids()
+        except Exception:
+            # No display (yet); readiness falls back to the process state
+            return None
+        return None
+
+    def _win32_pids(self):
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        pids = set()
+
+        @ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+        def collect(hwnd, _):
+            if user32.IsWindowVisible(hwnd):
+                pid = wintypes.DWORD()
+                user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+                pids.add(pid.value)
+            return True
+
+        user32.EnumWindows(collect, 0)
+        return pids
+
+    def _xlib_pids(self):
+        display = self._display
+        root = display.screen().root
+        clients = root.get_full_property(display.intern_atom("_NET_CLIENT_LIST"), Xlib.X.AnyPropertyType)
+        pid_atom = display.intern_atom("_NET_WM_PID")
+        pids = set()
+        for window_id in (clients.value if clients else ()):
+            window = display.create_resource_object("window", window_id)
+            prop = window.get_full_property(pid_atom, Xlib.X.AnyPropertyType)
+            if prop and len(prop.value):
+                pids.add(int(prop.value[0]))
+        return pids
+
+    def _xprop_pids(self):
+        output = subprocess.run(["xprop", "-root", "_NET_CLIENT_LIST"], capture_output=True,
+                                text=True, timeout=2).stdout
+        pids = set()
+        for window_id in _XPROP_WINDOW_RE.findall(output.partition("#")[2]):
+            line = subprocess.run(["xprop", "-id", window_id, "_NET_WM_PID"], capture_output=True,
+                                  text=True, timeout=2).stdout
+            match = _XPROP_PID_RE.search(line)
+            if match:
+                pids.add(int(match.group(1)))
+        return pids
+
+
+class AppReadiness:
+    """Polls a launched process with exponential backoff until its app is ready
+
+    Ready means a top-level window owned by the launched PID, one of its
+    descendants or a process with the app's name (launchers such as calc.exe
+    hand over to another process). Without a window backend the app is ready
+    once those processes use less than idle_cpu_percent for steady_polls polls
+    in a row. Polling waits go through `clock`.
+    """
+    def __init__(self, probe=None, initial_delay_s=0.05, max_delay_s=0.25, backoff=2.0,
+                 idle_cpu_percent=2.0, steady_polls=2, clock=None):
+        self.probe = probe or WindowProbe()
+        self.clock = clock or RealClock()
+        self.initial_delay_s = initial_delay_s
+        self.max_delay_s = max_delay_s
+        self.backoff = backoff
+        self.idle_cpu_percent = idle_cpu_percent
+        self.steady_polls = steady_polls
+
+    def candidates(self, pid, process_name, started_at, known):
+        """Live processes that may be the app: the PID, its descendants, same-named processes started since
+
+        Process objects are kept in `known` across polls so cpu_percent measures
+        the time between polls.
+        """
+        pids = set()
+        try:
+            root = known.get(pid) or psutil.Process(pid)
+            known[pid] = root
+            pids.add(pid)
+            for child in root.children(recursive=True):
+                pids.add(child.pid)
+                known.setdefault(child.pid, child)
+        except psutil.Error:
+            pass
+        if process_name:
+            process_index.refresh(force=True)
+            for candidate in process_index.find(process_name) - set(known):
+                try:
+                    proc = psutil.Process(candidate)
+                    if proc.create_time() < started_at:
+                        continue
+                except psutil.Error:
+                    continue
+                known[candidate] = proc
+            pids.update(p for p in known if p != pid)
+        live = {}
+        for candidate in pids:
+            try:
+                if known[candidate].status() != psutil.STATUS_ZOMBIE:
+                    live[candidate] = known[candidate]
+            except psutil.Error:
+                continue
+        return live
+
+    def wait(self, process, process_name=None, deadline_s=3.0):
+        """Block until the app started by a Popen `process` is ready or deadline_s passes
+
+        Returns {'ready', 'reason', 'latency_s'}; reason is 'window', 'steady',
+        'failed' (the launch exited with an error and nothing runs) or 'timeout'.
+        """
+        clock = self.clock
+        start = clock.now()
+        # Same-named processes only count when started around the launch
+        started_at = time.time() - 1.0
+        deadline = start + deadline_s
+        delay = self.initial_delay_s
+        known = {}
+        seen = set()
+        steady = 0
+        reason = "timeout"
+        while True:
+            processes = self.candidates(process.pid, process_name, started_at, known)
+            window_pids = self.probe.window_pids()
+            if window_pids is not None and window_pids & set(processes):
+                reason = "window"
+                break
+            if window_pids is None:
+                # A process seen for the first time has no CPU measurement yet
+                new = set(processes) - seen
+                seen |= new
+                idle = self._idle(processes)
+                steady = steady + 1 if processes and idle and not new else 0
+                if steady >= self.steady_polls:
+                    reason = "steady"
+                    break
+            if not processes and process.poll():
+                reason = "failed"
+                break
+            remaining = deadline - clock.now()
+            if remaining <= 0:
+                break
+            clock.sleep(min(delay, remaining), "app_ready")
+            delay = min(delay * self.backoff, self.max_delay_s)
+        return {"ready": reason in ("window", "steady"), "reason": reason,
+                "latency_s": clock.now() - start}
+
+    def _idle(self, processes):
+        """Whether every candidate process is below the CPU threshold since the last poll"""
+        for proc in processes.values():
+            try:
+                if proc.cpu_percent(None) > self.idle_cpu_percent:
+                    return False
+            except psutil.Error:
+                continue
+        return True
@@ -0,0 +1,222 @@
+# backends.py - Desktop backends: the real machine through pyautogui, or a simulated desktop
+import webbrowser
+import subprocess
+import zlib
+from collections import deque
+
+import numpy as np
+import psutil
+from PIL import Image
+
+from app_readiness import AppReadiness
+from clock import RealClock
+from process_index import process_index
+
+try:
+    import pyautogui
+    PYAUTOGUI_AVAILABLE = True
+except Exception as e:
+    # pyautogui raises more than ImportError without a display
+    PYAUTOGUI_AVAILABLE = False
+    PYAUTOGUI_ERROR = e
+
+
+class RealDesktop:
+    """Mouse, keyboard and screen through pyautogui; apps as real processes"""
+    name = "real"
+
+    def __init__(self, clock=None):
+        if not PYAUTOGUI_AVAILABLE:
+            raise RuntimeError(f"pyautogui is not available: {PYAUTOGUI_ERROR}")
+        pyautogui.FAILSAFE = True
+        # Actions wait for the screen to settle instead of a fixed pause per call
+        pyautogui.PAUSE = 0
+        self.clock = clock or RealClock()
+        self.readiness = AppReadiness(clock=self.clock)
+
+    def size(self):
+        return pyautogui.size()
+
+    def click(self, x, y):
+        pyautogui.click(x, y)
+
+    def typewrite(self, text, interval=0.0):
+        pyautogui.typewrite(text, interval=interval)
+
+    def press(self, key):
+        pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        pyautogui.hotkey(*keys)
+
+    def scroll(self, clicks):
+        pyautogui.scroll(clicks)
+
+    def screenshot(self):
+        return pyautogui.screenshot()
+
+    def launch(self, command, process_name=None):
+        process = subprocess.Popen(command, shell=True)
+        if process_name:
+            # A second OPEN_APP before the next index refresh must see this launch
+            process_index.record(process.pid, process_name)
+        return process
+
+    def wait_ready(self, process, process_name=None, deadline_s=3.0):
+        return self.readiness.wait(process, process_name, deadline_s)
+
+    def is_running(self, process_name):
+        return process_index.is_running(process_name)
+
+    def terminate(self, process):
+        try:
+            # shell=True launches the app as a child of the PID we hold
+            for child in psutil.Process(process.pid).children(recursive=True):
+                child.terminate()
+        except psutil.Error:
+            pass
+        if process.poll() is None:
+            process.terminate()
+
+    def open_url(self, url):
+        webbrowser.open(url)
+
+
+class SimulatedProcess:
+    """Entry in the simulated process table, with the parts of Popen the executor uses"""
+    def __init__(self, pid, name, command, started_at=0.0):
+        self.pid = pid
+        self.name = name
+        self.command = command
+        self.started_at = started_at
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        if self.returncode is None:
+            self.returncode = -15
+
+
+class SimulatedDesktop:
+    """A headless desktop: framebuffer screen, input event log and process table
+
+    Input draws into the framebuffer right away; launched apps and opened URLs
+    draw their window after startup_s, so screen-settle and readiness checks
+    see the same change-then-stable pattern as on a real screen. Event times
+    and app startup follow `clock`, so a virtual clock starts apps instantly in
+    nominal time. The event log keeps the last `history` events.
+    """
+    name = "simulated"
+
+    def __init__(self, width=1280, height=720, startup_s=0.2, history=10000, clock=None):
+        self.clock = clock or RealClock()
+        self.width = width
+        self.height = height
+        self.startup_s = startup_s
+        self.framebuffer = np.zeros((height, width, 3), dtype=np.uint8)
+        self.events = deque(maxlen=history)
+        self.processes = {}
+        self.cursor = (width // 2, height // 2)
+        self._text_x = 0
+        self._next_pid = 10000
+        self._pending = []
+
+    def _log(self, kind, **data):
+        data["kind"] = kind
+        data["t"] = self.clock.now()
+        self.events.append(data)
+
+    def _paint(self, x, y, w, h, seed):
+        color = zlib.crc32(str(seed).encode()) & 0xFFFFFF
+        x, y = max(0, min(self.width - 1, x)), max(0, min(self.height - 1, y))
+        self.framebuffer[y:y + h, x:x + w] = (color >> 16, (color >> 8) & 0xFF, color & 0xFF)
+
+    def _open_window(self, title):
+        """Schedule a window to appear once the app has started"""
+        self._pending.append((self.clock.now() + self.startup_s, title))
+
+    def _flush(self):
+        now = self.clock.now()
+        due = [item for item in self._pending if item[0] <= now]
+        if due:
+            self._pending = [item for item in self._pending if item[0] > now]
+            for _, title in due:
+                self._paint(self.width // 8, self.height // 8, self.width * 3 // 4, self.height * 3 // 4, title)
+                self._log("window", title=title)
+
+    def size(self):
+        return self.width, self.height
+
+    def click(self, x, y):
+        self.cursor = (x, y)
+        self._log("click", x=x, y=y)
+        self._paint(x - 4, y - 4, 8, 8, ("click", x, y))
+
+    def typewrite(self, text, interval=0.0):
+        self._log("type", text=text)
+        for ch in text:
+            self._paint(self._text_x, self.height - 20, 8, 16, ch)
+            self._text_x = (self._text_x + 8) % self.width
+
+    def press(self, key):
+        self._log("press", key=key)
+        self._paint(0, 0, 16, 16, ("press", key))
+
+    def hotkey(self, *keys):
+        self._log("hotkey", keys=list(keys))
+        self._paint(16, 0, 16, 16, ("hotkey",) + keys)
+
+    def scroll(self, clicks):
+        self._log("scroll", clicks=clicks)
+        self.framebuffer = np.roll(self.framebuffer, -np.sign(clicks) * 16, axis=0)
+
+    def screenshot(self):
+        self._flush()
+        return Image.fromarray(self.framebuffer.copy())
+
+    def launch(self, command, process_name=None):
+        pid = self._next_pid
+        self._next_pid += 1
+        process = SimulatedProcess(pid, process_name or command.split()[0], command, self.clock.now())
+        self.processes[pid] = process
+        self._log("launch", pid=pid, command=command)
+        self._open_window(process.name)
+        return process
+
+    def wait_ready(self, process, process_name=None, deadline_s=3.0):
+        """Ready once the window is drawn: startup_s after launch, or never past the deadline"""
+        start = self.clock.now()
+        startup_left = max(0.0, process.started_at + self.startup_s - start)
+        self.clock.sleep(min(startup_left, deadline_s), "app_ready")
+        self._flush()
+        ready = startup_left <= deadline_s
+        return {"ready": ready, "reason": "window" if ready else "timeout",
+                "latency_s": self.clock.now() - start}
+
+    def is_running(self, process_name):
+        name = process_name.lower()
+        return any(name in p.name.lower() for p in self.processes.values() if p.returncode is None)
+
+    def terminate(self, process):
+        process.terminate()
+        self._log("terminate", pid=process.pid)
+
+    def open_url(self, url):
+        self._log("open_url", url=url)
+        self._open_window(url)
+
+
+DESKTOP_BACKENDS = {
+    "real": RealDesktop,
+    "simulated": SimulatedDesktop,
+}
+
+
+def make_desktop(backend="real", clock=None):
+    try:
+        backend_class = DESKTOP_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown desktop backend: {backend} (choose from {', '.join(DESKTOP_BACKENDS)})")
+    return backend_class(clock=clock)
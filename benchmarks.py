@@ -0,0 +1,456 @@
+# benchmarks.py - Offline performance benchmarks for the planning path
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from metrics import percentile
+
+SONGS = [
+    "despacito", "shape of you", "gangnam style", "bohemian rhapsody", "blinding lights",
+    "hotel california", "let it be", "imagine", "smells like teen spirit", "billie jean",
+    "rolling in the deep", "uptown funk", "hey jude", "wonderwall", "thriller"
+]
+TOPICS = [
+    "python tutorial", "weather", "news", "flask tutorial", "machine learning",
+    "pasta recipe", "football scores", "stock market", "rust ownership", "linear algebra"
+]
+TASK_FORMS = [
+    "play song {song} on youtube",
+    "Play music {song}",
+    "listen to {song}",
+    "watch video {song}",
+    "search for {topic} on youtube",
+    "search for {topic} on google",
+    "open google and search for {topic}",
+    "google {topic}",
+    "open calculator",
+    "open notepad and type {topic}",
+    "take a screenshot",
+    "go to github.com",
+    "press ctrl+c",
+    "press enter",
+    "play song {song} and play song {song2}",
+    "scroll down",
+    "open my email and compose a new message",
+    "fill out a form with my name and email",
+]
+
+
+def generate_task_corpus(n, seed=42):
+    """Deterministic mix of task phrasings drawn from the supported action families"""
+    rng = random.Random(seed)
+    tasks = []
+    for _ in range(n):
+        form = rng.choice(TASK_FORMS)
+        tasks.append(form.format(song=rng.choice(SONGS), song2=rng.choice(SONGS), topic=rng.choice(TOPICS)))
+    return tasks
+
+
+def report_latencies(label, latencies):
+    values = sorted(latencies)
+    print(f"{label}: n={len(values)} "
+          f"mean={sum(values) / len(values) * 1e6:.1f}us "
+          f"p50={percentile(values, 50) * 1e6:.1f}us "
+          f"p95={percentile(values, 95) * 1e6:.1f}us "
+          f"p99={percentile(values, 99) * 1e6:.1f}us")
+
+
+def bench_intents(args):
+    """Time IntentEngine.plan per task over a synthetic corpus"""
+    from intent_engine import IntentEngine
+
+    engine = IntentEngine()
+    engine.compile()
+    tasks = generate_task_corpus(args.tasks, args.seed)
+
+    latencies = []
+    fast_path = 0
+    for task in tasks:
+        start = time.perf_counter()
+        instructions, confidence = engine.plan(task)
+        latencies.append(time.perf_counter() - start)
+        if instructions is not None and confidence >= args.min_confidence:
+            fast_path += 1
+
+    report_latencies("intent classification", latencies)
+    print(f"fast path coverage: {fast_path}/{len(tasks)} ({fast_path / len(tasks):.1%}) "
+          f"at confidence >= {args.min_confidence}")
+
+
+def _search(site, query, auto_play=False):
+    return {"action": "WEB_SEARCH", "params": {"site": site, "query": query, "auto_play": auto_play}}
+
+
+def _open_app(app):
+    return {"action": "OPEN_APP", "params": {"app": app, "wait_time": 3}}
+
+
+# Phrasings the intent engine leaves to the LLM, with their hand-labelled plans
+LLM_TASK_FORMS = [
+    ("google {topic}", lambda v: [_search("google", v["topic"])]),
+    ("what does the internet say about {topic}", lambda v: [_search("google", v["topic"])]),
+    ("show me youtube videos about {topic}", lambda v: [_search("youtube", v["topic"])]),
+    ("i want to hear {song}", lambda v: [_search("youtube", v["song"], True)]),
+    ("queue up {song} on youtube", lambda v: [_search("youtube", v["song"], True)]),
+    ("bring up the calculator", lambda v: [_open_app("calc")]),
+    ("open notepad and write {topic}", lambda v: [
+        _open_app("notepad"), {"action": "TYPE", "params": {"text": v["topic"], "interval": 0.05}}]),
+]
+
+
+def labelled_corpus(n, seed):
+    """Tasks with known plans that the intent engine does not fast-path, so they reach the LLM"""
+    from intent_engine import IntentEngine
+
+    engine = IntentEngine()
+    rng = random.Random(seed)
+    labelled = []
+    for _ in range(n):
+        form, label = rng.choice(LLM_TASK_FORMS)
+        values = {"song": rng.choice(SONGS), "topic": rng.choice(TOPICS)}
+        task = form.format(**values)
+        if engine.fast_plan(task) is None:
+            labelled.append((task, label(values)))
+    return labelled
+
+
+def plans_match(plan, expected):
+    from plan_templates import plan_signature
+    return plan is not None and plan_signature(plan) == plan_signature(expected)
+
+
+def bench_prompts(args):
+    """Compare the fixed few-shot prompt with retrieval-selected examples"""
+    from prompt_builder import PromptBuilder, estimate_tokens
+
+    corpus = labelled_corpus(args.tasks, args.seed)
+    builders = [("full", PromptBuilder(mode="full")),
+                ("retrieval", PromptBuilder(mode="retrieval", k=args.k))]
+
+    client = None
+    if args.live:
+        from llm_client import OllamaClient
+        client = OllamaClient(args.ollama_url)
+        if not client.is_available():
+            print(f"❌ Ollama not reachable at {args.ollama_url}; reporting prompt sizes only")
+            client = None
+
+    for name, builder in builders:
+        build_times = []
+        tokens = []
+        prompt_eval_counts = []
+        latencies = []
+        correct = 0
+        for task, expected in corpus:
+            start = time.perf_counter()
+            prompt = builder.build(task)
+            build_times.append(time.perf_counter() - start)
+            tokens.append(estimate_tokens(prompt))
+            if client is None:
+                continue
+
+            start = time.perf_counter()
+            result = client.generate({"model": args.model, "prompt": prompt, "stream": False,
+                                      "options": {"temperature": 0.1, "top_p": 0.9, "num_predict": 1000}})
+            latencies.append(time.perf_counter() - start)
+            if result is None:
+                continue
+            prompt_eval_counts.append(result.get("prompt_eval_count", 0))
+            text = result.get("response", "")
+            try:
+                plan = json.loads(text[text.find("["):text.rfind("]") + 1])
+            except ValueError:
+                plan = None
+            correct += plans_match(plan, expected)
+
+        print(f"\n[{name}] {len(corpus)} labelled tasks")
+        print(f"  estimated prompt tokens: mean={sum(tokens) / len(tokens):.0f} max={max(tokens)}")
+        report_latencies("  prompt build", build_times)
+        if client is not None:
+            print(f"  Ollama prompt_eval_count: mean={sum(prompt_eval_counts) / max(1, len(prompt_eval_counts)):.0f}")
+            latencies.sort()
+            print(f"  LLM latency: p50={percentile(latencies, 50):.2f}s p95={percentile(latencies, 95):.2f}s")
+            print(f"  plan accuracy: {correct}/{len(corpus)} ({correct / len(corpus):.1%})")
+
+
+def llm_task_candidates(seed):
+    """Endless LLM-form tasks; topics are combined so the cache and templates see new text"""
+    rng = random.Random(seed)
+    while True:
+        form, _ = rng.choice(LLM_TASK_FORMS)
+        yield form.format(song=f"{rng.choice(SONGS)} {rng.choice(SONGS)}",
+                          topic=f"{rng.choice(TOPICS)} {rng.choice(TOPICS)} {rng.randint(1, 1000)}")
+
+
+def _phase_summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "tasks": len(latencies),
+        "elapsed_s": elapsed,
+        "throughput_tasks_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1e3 if latencies else 0.0,
+        "p95_ms": percentile(latencies, 95) * 1e3 if latencies else 0.0,
+        "p99_ms": percentile(latencies, 99) * 1e3 if latencies else 0.0,
+    }
+
+
+def bench_planning(args):
+    """Drive RPABot planning against the Ollama stub, replaying recordings
+
+    The local corpus measures the intent engine, cache and templates end to end; the LLM
+    corpus only keeps tasks that every local planner rejects, so each one reaches the stub.
+    """
+    from ollama_stub import OllamaStub, ModelProfile, load_recording
+    from metrics import metrics
+
+    recording = load_recording(args.replay) if args.replay else None
+    stub = OllamaStub({args.model: ModelProfile(args.tokens_per_s)}, recording=recording,
+                      zero_latency=args.zero_latency).start()
+    tasks = generate_task_corpus(args.tasks, args.seed)
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        from main import RPABot
+        bot = RPABot(plan_cache_path=None, warm_up=False, ollama_url=stub.url)
+        bot.model_name = args.model
+        metrics.reset()
+
+        latencies = []
+        start = time.perf_counter()
+        for task in tasks:
+            task_start = time.perf_counter()
+            bot.generate_rpa_instructions(task)
+            latencies.append(time.perf_counter() - task_start)
+        local = _phase_summary(latencies, time.perf_counter() - start)
+        local_counters = metrics.snapshot()["counters"]
+        local_requests, local_replayed, local_unrecorded = len(stub.requests), stub.replay_hits, stub.replay_misses
+
+        metrics.reset()
+        latencies = []
+        absorbed = 0
+        candidates = llm_task_candidates(args.seed)
+        start = time.perf_counter()
+        while len(latencies) < args.llm_tasks and absorbed < 10 * args.llm_tasks:
+            task = next(candidates)
+            if bot.lookup_local_plan(task) is not None:
+                absorbed += 1
+                continue
+            task_start = time.perf_counter()
+            bot.plan_remotely(task)
+            latencies.append(time.perf_counter() - task_start)
+        remote = _phase_summary(latencies, time.perf_counter() - start)
+        counters = metrics.snapshot()["counters"]
+    stub.stop()
+
+    cache_hits = local_counters.get("plan_cache.memory_hits", 0) + local_counters.get("plan_cache.disk_hits", 0)
+    cache_lookups = cache_hits + local_counters.get("plan_cache.misses", 0)
+    local.update({
+        "intent_fast_path_ratio": local_counters.get("intent_engine.hits", 0) / len(tasks),
+        "cache_hit_ratio": cache_hits / cache_lookups if cache_lookups else 0.0,
+        "template_hits": local_counters.get("plan_templates.hits", 0),
+        "llm_requests": local_requests,
+    })
+    reused = counters.get("ollama.connections_reused", 0)
+    opened = counters.get("ollama.connections_opened", 0)
+    remote.update({
+        "absorbed_locally": absorbed,
+        "llm_requests": len(stub.requests) - local_requests,
+        "replay_hits": stub.replay_hits - local_replayed,
+        "replay_misses": stub.replay_misses - local_unrecorded,
+        "connections_opened": opened,
+        "connections_reused": reused,
+        "connection_reuse_ratio": reused / (reused + opened) if reused + opened else 0.0,
+        "fallback_rate": counters.get("plan.fallbacks", 0) / remote["tasks"] if remote["tasks"] else 0.0,
+    })
+    summary = {"local": local, "llm": remote}
+
+    print(f"local planning: {local['tasks']} tasks in {local['elapsed_s']:.2f}s "
+          f"({local['throughput_tasks_per_s']:.0f} tasks/s)")
+    print(f"  latency: p50={local['p50_ms']:.2f}ms p95={local['p95_ms']:.2f}ms p99={local['p99_ms']:.2f}ms")
+    print(f"  intent fast path: {local['intent_fast_path_ratio']:.1%}  "
+          f"cache hit ratio: {local['cache_hit_ratio']:.1%}  template hits: {local['template_hits']}  "
+          f"LLM requests: {local['llm_requests']}")
+    print(f"LLM planning: {remote['tasks']} tasks in {remote['elapsed_s']:.2f}s "
+          f"({remote['throughput_tasks_per_s']:.0f} tasks/s, {absorbed} candidates served locally)")
+    print(f"  latency: p50={remote['p50_ms']:.2f}ms p95={remote['p95_ms']:.2f}ms p99={remote['p99_ms']:.2f}ms")
+    print(f"  LLM requests: {remote['llm_requests']} (replayed {remote['replay_hits']}, "
+          f"simulated {remote['llm_requests'] - remote['replay_hits']})  fallback rate: {remote['fallback_rate']:.1%}")
+    print(f"  Ollama connections: {opened} opened, {reused} reused "
+          f"({remote['connection_reuse_ratio']:.1%} reuse)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    failures = []
+    if args.max_p95_ms is not None and local["p95_ms"] > args.max_p95_ms:
+        failures.append(f"local p95 {local['p95_ms']:.2f}ms > {args.max_p95_ms}ms")
+    if args.min_throughput is not None and local["throughput_tasks_per_s"] < args.min_throughput:
+        failures.append(f"local throughput {local['throughput_tasks_per_s']:.0f}/s < {args.min_throughput}/s")
+    if args.min_llm_calls is not None and remote["llm_requests"] < args.min_llm_calls:
+        failures.append(f"LLM requests {remote['llm_requests']} < {args.min_llm_calls}")
+    if args.max_fallback_rate is not None and remote["fallback_rate"] > args.max_fallback_rate:
+        failures.append(f"fallback rate {remote['fallback_rate']:.1%} > {args.max_fallback_rate:.1%}")
+    if (args.min_connection_reuse is not None
+            and remote["connection_reuse_ratio"] < args.min_connection_reuse):
+        failures.append(f"connection reuse {remote['connection_reuse_ratio']:.1%} "
+                        f"< {args.min_connection_reuse:.1%}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        raise SystemExit(1)
+
+
+def bench_splitter(args):
+    """Time extract_search_terms on tasks of growing clause counts"""
+    from task_splitter import extract_search_terms
+
+    rng = random.Random(args.seed)
+    separators = [" and ", " then ", " , ", " & "]
+    size = 10
+    while size <= args.max_clauses:
+        parts = [f"play song {rng.choice(SONGS)}"]
+        for _ in range(size - 1):
+            parts += [rng.choice(separators), f"play song {rng.choice(SONGS)} {rng.randrange(size)}"]
+        task = "".join(parts)
+
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            terms = extract_search_terms(task)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{size:>6} clauses: {best * 1e3:8.2f}ms  {best / size * 1e6:6.2f}us/clause  "
+              f"{len(terms)} unique terms")
+        size *= 10
+
+
+def bench_processes(args):
+    """Compare a full process-table scan with the incremental process index"""
+    import psutil
+    from process_index import ProcessIndex
+
+    def scan(name):
+        for proc in psutil.process_iter(['pid', 'name']):
+            if name.lower() in (proc.info['name'] or "").lower():
+                return True
+        return False
+
+    index = ProcessIndex(ttl_s=args.ttl)
+    start = time.perf_counter()
+    index.refresh(force=True)
+    cold = time.perf_counter() - start
+    print(f"{len(psutil.pids())} processes, first index build {cold * 1e3:.1f}ms")
+
+    for label, lookup in (("process_iter scan", scan), ("process index", index.is_running)):
+        latencies = []
+        for i in range(args.lookups):
+            name = args.names[i % len(args.names)]
+            start = time.perf_counter()
+            lookup(name)
+            latencies.append(time.perf_counter() - start)
+        report_latencies(label, latencies)
+
+
+def bench_executor(args):
+    """Execute intent-engine plans on the simulated desktop and browser, on a virtual or real clock"""
+    from clock import make_clock
+    from intent_engine import IntentEngine
+
+    engine = IntentEngine()
+    engine.compile()
+    plans = [plan for plan, _ in map(engine.plan, generate_task_corpus(args.plans, args.seed)) if plan]
+    clock = make_clock(args.clock)
+
+    cwd = os.getcwd()
+    latencies = []
+    failed = 0
+    # Screenshot steps write files; keep them out of the working tree
+    with tempfile.TemporaryDirectory() as workdir, open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        from main import RPAExecutor
+        os.chdir(workdir)
+        executor = RPAExecutor(backend="simulated", clock=clock)
+        try:
+            start = time.perf_counter()
+            for plan in plans:
+                plan_start = time.perf_counter()
+                result = executor.execute_instructions(plan, interactive=False)
+                latencies.append(time.perf_counter() - plan_start)
+                failed += bool(result["failed_steps"])
+            elapsed = time.perf_counter() - start
+        finally:
+            executor.cleanup()
+            os.chdir(cwd)
+
+    print(f"executor ({clock.name} clock): {len(plans)} plans in {elapsed:.2f}s "
+          f"({len(plans) / elapsed * 60:.0f} plans/min), {failed} with failed steps")
+    report_latencies("plan execution", latencies)
+    if clock.name == "virtual":
+        waits = ", ".join(f"{label} {seconds:.1f}s" for label, seconds in sorted(clock.by_label().items()))
+        print(f"  nominal time: {clock.now():.1f}s ({clock.now() / elapsed:.0f}x compressed); waits: {waits}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RPA Bot planning benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    intents = subparsers.add_parser("intents", help="rule-based intent engine throughput")
+    intents.add_argument("--tasks", type=int, default=5000)
+    intents.add_argument("--seed", type=int, default=42)
+    intents.add_argument("--min-confidence", type=float, default=0.85)
+    intents.set_defaults(run=bench_intents)
+
+    prompts = subparsers.add_parser("prompts", help="fixed vs retrieval-selected few-shot prompts")
+    prompts.add_argument("--tasks", type=int, default=200)
+    prompts.add_argument("--seed", type=int, default=42)
+    prompts.add_argument("--k", type=int, default=2)
+    prompts.add_argument("--live", action="store_true", help="also measure latency and accuracy on Ollama")
+    prompts.add_argument("--ollama-url", default="http://localhost:11434")
+    prompts.add_argument("--model", default="llama2")
+    prompts.set_defaults(run=bench_prompts)
+
+    splitter = subparsers.add_parser("splitter", help="search-term extraction scaling with clause count")
+    splitter.add_argument("--max-clauses", type=int, default=10000)
+    splitter.add_argument("--repeat", type=int, default=5)
+    splitter.add_argument("--seed", type=int, default=42)
+    splitter.set_defaults(run=bench_splitter)
+
+    processes = subparsers.add_parser("processes", help="is_process_running: full scan vs process index")
+    processes.add_argument("--lookups", type=int, default=200)
+    processes.add_argument("--ttl", type=float, default=1.0)
+    processes.add_argument("--names", nargs="+", default=["calculator", "notepad", "mspaint", "python"])
+    processes.set_defaults(run=bench_processes)
+
+    executor = subparsers.add_parser("executor", help="plan execution on the simulated desktop and browser")
+    executor.add_argument("--plans", type=int, default=1000)
+    executor.add_argument("--seed", type=int, default=42)
+    executor.add_argument("--clock", choices=("virtual", "real"), default="virtual")
+    executor.set_defaults(run=bench_executor)
+
+    planning = subparsers.add_parser("planning", help="end-to-end planning against the Ollama stub")
+    planning.add_argument("--tasks", type=int, default=3000)
+    planning.add_argument("--seed", type=int, default=42)
+    planning.add_argument("--llm-tasks", type=int, default=100,
+                          help="tasks drawn from phrasings every local planner rejects")
+    planning.add_argument("--model", default="llama2")
+    planning.add_argument("--replay", help="JSONL recorded with 'python ollama_stub.py --record'")
+    planning.add_argument("--zero-latency", action="store_true", help="serve LLM responses without delays")
+    planning.add_argument("--tokens-per-s", type=float, default=200.0,
+                          help="simulated decode speed for tasks missing from the recording")
+    planning.add_argument("--json", help="also write the summary to this file")
+    planning.add_argument("--max-p95-ms", type=float, help="fail if local p95 latency is above this")
+    planning.add_argument("--min-throughput", type=float, help="fail if local tasks/s is below this")
+    planning.add_argument("--min-llm-calls", type=int, help="fail if fewer requests than this reach the LLM")
+    planning.add_argument("--max-fallback-rate", type=float, help="fail if the fallback rate is above this")
+    planning.add_argument("--min-connection-reuse", type=float,
+                          help="fail if fewer Ollama requests than this share reuse a pooled connection")
+    planning.set_defaults(run=bench_planning)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# clock.py - Injectable clocks: real waits in production, instant virtual waits in simulation
+import threading
+import time
+from collections import deque
+
+
+class RealClock:
+    """Sleeps for real; now() is time.perf_counter()"""
+    name = "real"
+
+    def now(self):
+        return time.perf_counter()
+
+    def sleep(self, seconds, label=None):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def branch(self, at):
+        """Continue the calling thread's timeline from `at`; real time needs no help"""
+
+
+class VirtualClock:
+    """A clock whose sleeps return at once and move its time forward instead
+
+    Every thread has its own timeline, so waits on concurrent threads overlap
+    the way real sleeps would: a sleep only moves the calling thread's time,
+    and a thread first seen starts at the latest time any thread has reached.
+    branch(at) restarts the calling thread's timeline at `at`, e.g. when a
+    scheduled step may start once the steps it depends on finished. Every
+    sleep is recorded in `timeline` as {'start', 'seconds', 'label', 'thread'}
+    on the nominal time axis; `slept_s` sums all waits. The timeline keeps the
+    last `history` waits.
+    """
+    name = "virtual"
+
+    def __init__(self, start=0.0, history=10000):
+        self._now = start
+        self.slept_s = 0.0
+        self.sleeps = 0
+        self.timeline = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._thread = threading.local()
+
+    def now(self):
+        now = getattr(self._thread, "now", None)
+        if now is None:
+            now = self._thread.now = self._now
+        return now
+
+    def horizon(self):
+        """The latest time any thread has reached"""
+        return self._now
+
+    def _move(self, seconds):
+        self._thread.now = self.now() + seconds
+        self._now = max(self._now, self._thread.now)
+
+    def sleep(self, seconds, label=None):
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.timeline.append({"start": self.now(), "seconds": seconds, "label": label,
+                                  "thread": threading.current_thread().name})
+            self._move(seconds)
+            self.slept_s += seconds
+            self.sleeps += 1
+
+    def advance(self, seconds):
+        """Move the calling thread's time forward without recording a wait"""
+        with self._lock:
+            self._move(max(0.0, seconds))
+
+    def branch(self, at):
+        with self._lock:
+            self._thread.now = at
+            self._now = max(self._now, at)
+
+    def by_label(self):
+        """Nominal seconds waited per label"""
+        totals = {}
+        for entry in self.timeline:
+            totals[entry["label"]] = totals.get(entry["label"], 0.0) + entry["seconds"]
+        return totals
+
+
+CLOCKS = {
+    "real": RealClock,
+    "virtual": VirtualClock,
+}
+
+
+def make_clock(clock="real"):
+    try:
+        return CLOCKS[clock]()
+    except KeyError:
+        raise ValueError(f"Unknown clock: {clock} (choose from {', '.join(CLOCKS)})")
@@ -0,0 +1,172 @@
+# fake_webdriver.py - A WebDriver stand-in that serves local HTML fixtures instead of driving Chrome
+import html
+import os
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlparse, parse_qs, urlencode, urljoin
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+
+from clock import RealClock
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "web")
+
+# (host suffix, path prefix, fixture, query parameter shown on the page)
+ROUTES = [
+    ("youtube.com", "/results", "youtube_results.html", "search_query"),
+    ("youtube.com", "/watch", "youtube_watch.html", None),
+    ("youtube.com", "/", "youtube_home.html", None),
+    ("google.com", "/search", "google_results.html", "q"),
+    ("google.com", "/", "google_home.html", None),
+]
+
+_SELECTOR_RE = re.compile(r"^(?P<tag>[\w-]+)?(?:#(?P<id>[\w-]+))?"
+                          r"(?:\[(?P<attr>[\w-]+)=['\"]?(?P<value>[^'\"\]]*)['\"]?\])?$")
+
+
+class FakeElement:
+    """A parsed element with the WebElement methods the automation uses"""
+    def __init__(self, driver, tag, attrs, form):
+        self.driver = driver
+        self.tag_name = tag
+        self.attrs = attrs
+        self.form = form
+        self.text = ""
+        self.value = attrs.get("value", "")
+
+    def get_attribute(self, name):
+        return self.attrs.get(name)
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def clear(self):
+        self.value = ""
+
+    def send_keys(self, *values):
+        for value in values:
+            if value == Keys.RETURN or value == Keys.ENTER:
+                self.submit()
+            else:
+                self.value += value
+
+    def submit(self):
+        action = (self.form or {}).get("action", "")
+        query = urlencode({self.attrs.get("name", "q"): self.value})
+        self.driver.get(urljoin(self.driver.current_url, action) + "?" + query)
+
+    def click(self):
+        if self.attrs.get("href"):
+            self.driver.get(urljoin(self.driver.current_url, self.attrs["href"]))
+
+
+class _PageParser(HTMLParser):
+    def __init__(self, driver):
+        super().__init__()
+        self.driver = driver
+        self.elements = []
+        self.title = ""
+        self._form = None
+        self._open = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        if tag == "form":
+            self._form = attrs
+        element = FakeElement(self.driver, tag, attrs, self._form)
+        self.elements.append(element)
+        self._open.append(element)
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+        if self._open and self._open[-1].tag_name == tag:
+            self._open.pop()
+
+    def handle_data(self, data):
+        if self._open:
+            if self._open[-1].tag_name == "title":
+                self.title += data
+            self._open[-1].text += data.strip()
+
+
+class FakeWebDriver:
+    """Serves fixture pages for YouTube and Google URLs and a blank page for the rest
+
+    Pages are rendered from FIXTURE_DIR with {query} and {url} filled in; load_s
+    simulates page load time on `clock`. Only the find_element strategies the automation
+    uses are supported: By.NAME, By.ID, By.TAG_NAME and simple CSS selectors
+    (tag, #id and one [attr=value]).
+    """
+    def __init__(self, fixture_dir=FIXTURE_DIR, load_s=0.0, clock=None):
+        self.fixture_dir = fixture_dir
+        self.load_s = load_s
+        self.clock = clock or RealClock()
+        self.current_url = "about:blank"
+        self.title = ""
+        self.page_source = ""
+        self.history = []
+        self.elements = []
+        self._templates = {}
+
+    def _template(self, name):
+        if name not in self._templates:
+            with open(os.path.join(self.fixture_dir, name), encoding="utf-8") as f:
+                self._templates[name] = f.read()
+        return self._templates[name]
+
+    def route(self, url):
+        parsed = urlparse(url if "://" in url else "https://" + url)
+        host, path = parsed.netloc.lower(), parsed.path or "/"
+        for suffix, prefix, fixture, param in ROUTES:
+            if host.endswith(suffix) and path.startswith(prefix):
+                query = parse_qs(parsed.query).get(param, [""])[0] if param else ""
+                return fixture, query
+        return "blank.html", ""
+
+    def get(self, url):
+        self.clock.sleep(self.load_s, "page_load")
+        fixture, query = self.route(url)
+        page = self._template(fixture).replace("{query}", html.escape(query)).replace("{url}", html.escape(url))
+        self.current_url = url
+        self.history.append(url)
+        self.page_source = page
+        parser = _PageParser(self)
+        parser.feed(page)
+        self.elements = parser.elements
+        self.title = parser.title.strip()
+
+    def find_elements(self, by=By.ID, value=None):
+        if by == By.NAME:
+            return [e for e in self.elements if e.attrs.get("name") == value]
+        if by == By.ID:
+            return [e for e in self.elements if e.attrs.get("id") == value]
+        if by == By.TAG_NAME:
+            return [e for e in self.elements if e.tag_name == value]
+        if by == By.CSS_SELECTOR:
+            match = _SELECTOR_RE.match(value.strip())
+            if match is None:
+                raise NoSuchElementException(f"Unsupported selector in fake driver: {value}")
+            tag, element_id, attr, attr_value = match.group("tag", "id", "attr", "value")
+            return [e for e in self.elements
+                    if (tag is None or e.tag_name == tag)
+                    and (element_id is None or e.attrs.get("id") == element_id)
+                    and (attr is None or e.attrs.get(attr) == attr_value)]
+        raise NoSuchElementException(f"Unsupported locator in fake driver: {by}")
+
+    def find_element(self, by=By.ID, value=None):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"No element for {by}={value} on {self.current_url}")
+        return found[0]
+
+    def execute_script(self, script, *args):
+        return None
+
+    def quit(self):
+        self.elements = []
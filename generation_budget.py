@@ -0,0 +1,81 @@
+# generation_budget.py - Per-task num_predict and deadline estimates from history
+import threading
+from collections import deque
+
+from metrics import percentile
+
+DEFAULT_NUM_PREDICT = 1000
+
+
+class GenerationBudget:
+    """Estimates how many tokens and seconds a plan should need, per intent family"""
+    def __init__(self, intent_engine, min_tokens=64, max_tokens=DEFAULT_NUM_PREDICT,
+                 tokens_per_clause=60, headroom=1.5, min_samples=5, history=200,
+                 default_deadline_s=60.0, max_deadline_s=120.0):
+        self.intent_engine = intent_engine
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.tokens_per_clause = tokens_per_clause
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.history = history
+        self.default_deadline_s = default_deadline_s
+        self.max_deadline_s = max_deadline_s
+        self._tokens = {}
+        self._seconds = {}
+        self._lock = threading.Lock()
+
+    def classify(self, user_task):
+        """Return (intent family, clause count) using the rule engine's clause splitter"""
+        _, clauses = self.intent_engine.split_clauses(user_task)
+        intent = "unknown"
+        if clauses:
+            result = self.intent_engine.classify(clauses[0])
+            if result is not None:
+                intent = result[0]
+        return intent, max(1, len(clauses))
+
+    def estimate(self, user_task):
+        """Return the budget for a task: num_predict, deadline and what they are based on"""
+        intent, clauses = self.classify(user_task)
+        with self._lock:
+            tokens = sorted(self._tokens.get(intent, ()))
+            seconds = sorted(self._seconds.get(intent, ()))
+
+        if len(tokens) >= self.min_samples:
+            per_clause = percentile(tokens, 95)
+            source = "history"
+        else:
+            per_clause = self.tokens_per_clause
+            source = "default"
+        num_predict = int(per_clause * clauses * self.headroom)
+        num_predict = max(self.min_tokens, min(self.max_tokens, num_predict))
+
+        if len(seconds) >= self.min_samples:
+            deadline_s = min(self.max_deadline_s, percentile(seconds, 95) * clauses * 2)
+        else:
+            deadline_s = self.default_deadline_s
+        deadline_s = max(deadline_s, 5.0)
+
+        return {
+            "intent": intent,
+            "clauses": clauses,
+            "num_predict": num_predict,
+            "deadline_s": deadline_s,
+            "source": source
+        }
+
+    def record(self, budget, tokens_generated, elapsed_s, outcome="completed"):
+        """Learn from a generation: 'completed', 'truncated' (hit num_predict) or 'deadline'"""
+        if outcome == "deadline" or tokens_generated <= 0:
+            return
+        if outcome == "truncated":
+            # The plan needed more than we allowed, so push the estimate up
+            tokens_generated = min(self.max_tokens, tokens_generated * 2)
+        clauses = budget["clauses"]
+        with self._lock:
+            self._tokens.setdefault(budget["intent"], deque(maxlen=self.history)).append(
+                tokens_generated / clauses)
+            if outcome == "completed":
+                self._seconds.setdefault(budget["intent"], deque(maxlen=self.history)).append(
+                    elapsed_s / clauses)
@@ -0,0 +1,102 @@
+# instruction_schema.py - JSON schema and precompiled validator for RPA plans
+import json
+
+from action_registry import ACTIONS
+
+# action -> {param: (type, required)}; types follow JSON schema names
+ACTION_PARAMS = ACTIONS.action_params()
+
+# Closed vocabularies, enforced by both the schema and the validator
+PARAM_ENUMS = {
+    ("WEB_SEARCH", "site"): ["youtube", "google"],
+    ("SCROLL", "direction"): ["up", "down"],
+}
+
+
+def _type_check(json_type):
+    if json_type == "string":
+        return lambda v: isinstance(v, str)
+    if json_type == "boolean":
+        return lambda v: isinstance(v, bool)
+    if json_type == "integer":
+        return lambda v: isinstance(v, int) and not isinstance(v, bool)
+    if json_type == "number":
+        return lambda v: isinstance(v, (int, float)) and not isinstance(v, bool)
+    if json_type == "array":
+        return lambda v: isinstance(v, list) and bool(v) and all(isinstance(i, str) for i in v)
+    raise ValueError(f"Unsupported param type: {json_type}")
+
+
+def build_plan_schema(action_params=None):
+    """JSON schema for a plan, usable as Ollama's `format` to constrain decoding"""
+    action_params = ACTION_PARAMS if action_params is None else action_params
+    variants = []
+    for action, params in action_params.items():
+        properties = {}
+        for name, (json_type, _) in params.items():
+            prop = {"type": json_type}
+            if json_type == "array":
+                prop["items"] = {"type": "string"}
+            if (action, name) in PARAM_ENUMS:
+                prop["enum"] = PARAM_ENUMS[(action, name)]
+            properties[name] = prop
+        variants.append({
+            "type": "object",
+            "properties": {
+                "action": {"type": "string", "enum": [action]},
+                "params": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": [n for n, (_, required) in params.items() if required]
+                }
+            },
+            "required": ["action", "params"]
+        })
+    return {"type": "array", "minItems": 1, "items": {"anyOf": variants}}
+
+
+class InstructionValidator:
+    """Checks instructions against per-action param checks compiled once"""
+    def __init__(self, action_params=None):
+        action_params = ACTION_PARAMS if action_params is None else action_params
+        self._checks = {}
+        for action, params in action_params.items():
+            checks = []
+            for name, (json_type, required) in params.items():
+                checks.append((name, required, _type_check(json_type), json_type,
+                               PARAM_ENUMS.get((action, name))))
+            self._checks[action] = checks
+
+    def validate_instruction(self, instruction):
+        """Return a list of problems with one instruction (empty when valid)"""
+        if not isinstance(instruction, dict):
+            return ["instruction must be an object"]
+        action = instruction.get("action")
+        checks = self._checks.get(action)
+        if checks is None:
+            return [f"unknown action {json.dumps(action)}"]
+        params = instruction.get("params", {})
+        if not isinstance(params, dict):
+            return [f"{action}.params must be an object"]
+
+        errors = []
+        for name, required, check, json_type, allowed in checks:
+            if name not in params:
+                if required:
+                    errors.append(f"{action}.{name} is required")
+                continue
+            value = params[name]
+            if not check(value):
+                errors.append(f"{action}.{name} must be {json_type}")
+            elif allowed is not None and value.lower() not in allowed:
+                errors.append(f"{action}.{name} must be one of {allowed}")
+        return errors
+
+    def validate(self, plan):
+        """Return a list of problems with a whole plan (empty when valid)"""
+        if not isinstance(plan, list) or not plan:
+            return ["plan must be a non-empty JSON array"]
+        errors = []
+        for i, instruction in enumerate(plan, 1):
+            errors.extend(f"step {i}: {error}" for error in self.validate_instruction(instruction))
+        return errors
@@ -0,0 +1,249 @@
+# intent_engine.py - Compiled rule-based intent recognition (zero-LLM fast path)
+import re
+import threading
+
+from metrics import metrics
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_CLAUSE_SPLIT_RE = re.compile(r",? (?:and(?: then)?|then|&|,) |, ", re.IGNORECASE)
+_SLOT_GROUP_RE = re.compile(r"\(\?P<(\w+)>")
+
+APP_ALIASES = {
+    "calculator": "calc",
+    "calc": "calc",
+    "notepad": "notepad",
+    "paint": "paint",
+    "mspaint": "paint"
+}
+
+SITE_URLS = {
+    "youtube": "https://www.youtube.com",
+    "google": "https://google.com",
+    "gmail": "https://mail.google.com",
+    "github": "https://github.com",
+    "wikipedia": "https://www.wikipedia.org",
+    "chrome": "https://google.com",
+    "browser": "https://google.com"
+}
+
+KEY_ALIASES = {"control": "ctrl", "command": "cmd", "return": "enter", "esc": "escape"}
+
+
+class IntentRule:
+    """One intent: regex patterns with named slots and a builder for the instruction"""
+    def __init__(self, name, patterns, build, confidence):
+        self.name = name
+        self.patterns = patterns
+        self.build = build
+        self.confidence = confidence
+
+
+def _web_search(site, auto_play):
+    def build(slots):
+        return {"action": "WEB_SEARCH", "params": {
+            "site": site, "query": slots["query"].lower().strip(" '\""), "auto_play": auto_play}}
+    return build
+
+
+def _open_app(slots):
+    return {"action": "OPEN_APP", "params": {"app": APP_ALIASES[slots["app"].lower()], "wait_time": 3}}
+
+
+def _open_url(slots):
+    if slots.get("site"):
+        url = SITE_URLS[slots["site"].lower()]
+    else:
+        url = slots["url"]
+        if not url.lower().startswith(("http://", "https://")):
+            url = "https://" + url
+    return {"action": "OPEN_URL", "params": {"url": url, "wait_time": 4}}
+
+
+def _screenshot(slots):
+    return {"action": "SCREENSHOT", "params": {"filename": "screenshot.png"}}
+
+
+def _type_text(slots):
+    return {"action": "TYPE", "params": {"text": slots["text"].strip("'\""), "interval": 0.05}}
+
+
+def _hotkey(slots):
+    keys = [k.strip().lower() for k in slots["keys"].split("+")]
+    return {"action": "HOTKEY", "params": {"keys": [KEY_ALIASES.get(k, k) for k in keys]}}
+
+
+def _press_key(slots):
+    key = slots["key"].lower()
+    return {"action": "PRESS_KEY", "params": {"key": KEY_ALIASES.get(key, key)}}
+
+
+def _scroll(slots):
+    return {"action": "SCROLL", "params": {
+        "direction": slots["direction"].lower(), "clicks": int(slots.get("clicks") or 3)}}
+
+
+DEFAULT_RULES = [
+    IntentRule("google_search", [
+        r"(?:open|go to) google and search(?: for)? (?P<query>.+)",
+        r"(?:search|look up|find)(?: for)? (?P<query>.+?) on google",
+        r"(?:search google for|google search(?: for)?) (?P<query>.+)",
+    ], _web_search("google", False), 0.95),
+    IntentRule("youtube_search", [
+        r"(?:open|go to) youtube and search(?: for)? (?P<query>.+)",
+        r"(?:search|look up|find)(?: for)?(?: videos?(?: of| about)?)? (?P<query>.+?) on youtube",
+        r"(?:search youtube for|youtube search(?: for)?) (?P<query>.+)",
+    ], _web_search("youtube", False), 0.95),
+    IntentRule("youtube_play", [
+        r"(?:play|listen to|put on)(?: the)?(?: song| music| video| track)?(?: called)? (?P<query>.+?)(?: on youtube| from youtube)?",
+        r"watch(?: the)?(?: video)? (?P<query>.+?)(?: on youtube)?",
+    ], _web_search("youtube", True), 0.9),
+    IntentRule("open_app", [
+        r"(?:open|launch|start|run)(?: the| a)? (?P<app>calculator|calc|notepad|mspaint|paint)(?: app| application)?",
+    ], _open_app, 0.95),
+    IntentRule("screenshot", [
+        r"(?:(?:take|capture|grab|make)(?: a| the)? )?(?:screenshot|screen shot|screen capture)(?: of .+)?",
+    ], _screenshot, 0.95),
+    IntentRule("open_url", [
+        r"(?:open|go to|visit|navigate to|browse to)(?: the)? (?P<site>youtube|google|gmail|github|wikipedia|chrome|browser)",
+        r"(?:open|go to|visit|navigate to|browse to)(?: the)?(?: website| site| url)? (?P<url>(?:https?://)?(?:[\w-]+\.)+[a-z]{2,}(?:/\S*)?)",
+    ], _open_url, 0.9),
+    IntentRule("hotkey", [
+        r"(?:press |hit )?(?P<keys>(?:ctrl|control|alt|shift|win|cmd|command)(?: ?\+ ?\w+)+)",
+    ], _hotkey, 0.95),
+    IntentRule("press_key", [
+        r"(?:press|hit|tap)(?: the)? (?P<key>enter|return|tab|escape|esc|space|backspace|delete|up|down|left|right|home|end|pageup|pagedown|f\d{1,2})(?: key)?",
+    ], _press_key, 0.9),
+    IntentRule("scroll", [
+        r"scroll (?P<direction>up|down)(?: (?P<clicks>\d+)(?: times| clicks)?)?",
+    ], _scroll, 0.9),
+    IntentRule("type_text", [
+        r"(?:type|write|enter)(?: the text)? (?P<text>\"[^\"]+\"|'[^']+')",
+        r"type the text (?P<text>.+)",
+    ], _type_text, 0.9),
+    # "type a letter to bob", "write an email" or "google docs" are rarely literal text or
+    # a search: these broad forms are usable as a fallback, never as a fast path
+    IntentRule("loose_type_text", [
+        r"(?:type|write|enter)(?: the text)? (?P<text>.+)",
+    ], _type_text, 0.6),
+    IntentRule("generic_search", [
+        r"(?:search|look up)(?: for)? (?P<query>.+)",
+        r"google (?P<query>.+)",
+    ], _web_search("google", False), 0.6),
+]
+
+
+class IntentEngine:
+    """Classifies task clauses with one precompiled alternation over all rule patterns"""
+    def __init__(self, rules=None):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self._compiled = None
+        self._branches = {}
+        self._lock = threading.Lock()
+
+    def add_rule(self, rule, priority=None):
+        """Register a new intent; earlier rules win when several match"""
+        with self._lock:
+            if priority is None:
+                self.rules.append(rule)
+            else:
+                self.rules.insert(priority, rule)
+            self._compiled = None
+
+    def compile(self):
+        with self._lock:
+            if self._compiled is not None:
+                return self._compiled
+            alternatives = []
+            branches = {}
+            for rule in self.rules:
+                for pattern in rule.patterns:
+                    branch = f"b{len(branches)}"
+                    slots = _SLOT_GROUP_RE.findall(pattern)
+                    renamed = _SLOT_GROUP_RE.sub(lambda m: f"(?P<{branch}_{m.group(1)}>", pattern)
+                    alternatives.append(f"(?P<{branch}>{renamed})")
+                    branches[branch] = (rule, [(f"{branch}_{slot}", slot) for slot in slots])
+            self._branches = branches
+            self._compiled = re.compile("|".join(alternatives), re.IGNORECASE)
+            return self._compiled
+
+    def classify(self, clause):
+        """Return (rule_name, instruction, confidence) for one clause, or None"""
+        pattern = self._compiled or self.compile()
+        m = pattern.fullmatch(clause)
+        if m is None:
+            return None
+        rule, slots = self._branches[m.lastgroup]
+        values = {slot: m.group(group) for group, slot in slots}
+        return rule.name, rule.build(values), rule.confidence
+
+    def split_clauses(self, user_task):
+        text = _WHITESPACE_RE.sub(" ", user_task).strip().rstrip(".!?")
+        return text, [c.strip() for c in _CLAUSE_SPLIT_RE.split(text) if c.strip()]
+
+    def plan(self, user_task):
+        """Return (instructions, confidence); (None, 0.0) unless every clause is recognized"""
+        text, clauses = self.split_clauses(user_task)
+        if len(clauses) > 1:
+            # "open google and search for X" is one search, not two clauses
+            whole = self.classify(text)
+            if (whole is not None and whole[0] in ("google_search", "youtube_search")
+                    and not _CLAUSE_SPLIT_RE.search(whole[1]["params"]["query"])):
+                return [whole[1]], whole[2]
+
+        instructions = []
+        confidence = 1.0
+        for clause in clauses:
+            result = self.classify(clause)
+            if result is None:
+                return None, 0.0
+            instructions.append(result[1])
+            confidence = min(confidence, result[2])
+        if not instructions:
+            return None, 0.0
+        return instructions, confidence
+
+    def fast_plan(self, user_task, min_confidence=0.85):
+        """Return a plan only when it is confident enough to skip the LLM"""
+        instructions, confidence = self.plan(user_task)
+        if instructions is None or confidence < min_confidence:
+            metrics.incr("intent_engine.misses")
+            return None
+        metrics.incr("intent_engine.hits")
+        return instructions
+
+
+def _type(text):
+    return {"action": "TYPE", "params": {"text": text, "interval": 0.05}}
+
+
+# (name, task, expected fast_plan); None means the task is left to the LLM
+INTENT_CASES = [
+    ("quoted text is typed literally", 'type "hello world"', [_type("hello world")]),
+    ("'type the text' is typed literally", "type the text hello world", [_type("hello world")]),
+    ("bare type is a request, not text", "type a letter to bob about the meeting", None),
+    ("comma then splits clauses", "Open calculator, then take a screenshot",
+     [_open_app({"app": "calculator"}), _screenshot({})]),
+    ("comma and splits clauses", "open notepad, and type 'hi'",
+     [_open_app({"app": "notepad"}), _type("hi")]),
+    ("and then splits clauses", "open notepad and then press enter",
+     [_open_app({"app": "notepad"}), _press_key({"key": "enter"})]),
+    ("search with and stays one query", "open google and search for cute cats",
+     [_web_search("google", False)({"query": "cute cats"})]),
+]
+
+
+def check_intent_cases():
+    engine = IntentEngine()
+    failures = 0
+    for name, task, expected in INTENT_CASES:
+        actual = engine.fast_plan(task)
+        if actual != expected:
+            failures += 1
+            print(f"❌ {name}\n   expected {expected}\n   got      {actual}")
+        else:
+            print(f"✅ {name}")
+    return failures
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if check_intent_cases() else 0)
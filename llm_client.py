@@ -0,0 +1,262 @@
+# llm_client.py - Pooled keep-alive Ollama client shared across Flask threads
+import json
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent opening new TCP connections by the current thread
+_connect_timing = threading.local()
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _connect_timing.seconds = getattr(_connect_timing, "seconds", 0.0) + time.perf_counter() - start
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _connect_timing.seconds = getattr(_connect_timing, "seconds", 0.0) + time.perf_counter() - start
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools report how long new connections take to open"""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool
+        }
+
+
+class OllamaClient:
+    """Keep-alive HTTP client for Ollama with a background health probe"""
+    def __init__(self, base_url="http://localhost:11434", health_ttl=10.0, pool_size=10,
+                 timeout=120):
+        self.base_url = base_url.rstrip("/")
+        self.generate_url = f"{self.base_url}/api/generate"
+        self.chat_url = f"{self.base_url}/api/chat"
+        self.tags_url = f"{self.base_url}/api/tags"
+        self.health_ttl = health_ttl
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._health = None
+        self._health_lock = threading.Lock()
+        self._monitor = None
+        self._stop = threading.Event()
+
+    def probe_health(self):
+        """Run one GET /api/tags and store the resulting health state"""
+        _connect_timing.seconds = 0.0
+        start = time.perf_counter()
+        state = {"ok": False, "models": [], "error": None}
+        try:
+            response = self.session.get(self.tags_url, timeout=5)
+            if response.status_code == 200:
+                state["models"] = [m["name"] for m in response.json().get("models", [])]
+                state["ok"] = bool(state["models"])
+                if not state["ok"]:
+                    state["error"] = "no_models"
+            else:
+                state["error"] = f"http_{response.status_code}"
+        except requests.exceptions.ConnectionError:
+            state["error"] = "not_running"
+        except Exception as e:
+            state["error"] = str(e)
+
+        elapsed = time.perf_counter() - start
+        state["checked_at"] = time.monotonic()
+        state["probe_s"] = elapsed
+        metrics.observe("ollama.health_probe_s", elapsed)
+        metrics.incr("ollama.health_probes")
+
+        with self._health_lock:
+            self._health = state
+        return state
+
+    def health(self):
+        """Return the cached health state, probing only if none exists yet"""
+        self._ensure_monitor()
+        with self._health_lock:
+            state = self._health
+        if state is None:
+            state = self.probe_health()
+        return state
+
+    def is_available(self):
+        return self.health()["ok"]
+
+    def mark_unavailable(self, error):
+        with self._health_lock:
+            self._health = {
+                "ok": False,
+                "models": self._health["models"] if self._health else [],
+                "error": error,
+                "checked_at": time.monotonic(),
+                "probe_s": 0.0
+            }
+
+    def _ensure_monitor(self):
+        if self._monitor is not None:
+            return
+        with self._health_lock:
+            if self._monitor is not None:
+                return
+            self._monitor = threading.Thread(target=self._monitor_loop, name="ollama-health", daemon=True)
+            self._monitor.start()
+
+    def _monitor_loop(self):
+        while not self._stop.wait(self.health_ttl):
+            try:
+                self.probe_health()
+            except Exception as e:
+                logger.warning(f"Ollama health probe failed: {e}")
+
+    def generate(self, payload, timeout=None):
+        """POST /api/generate over a pooled connection and return the decoded JSON"""
+        return self._post(self.generate_url, payload, timeout)
+
+    def chat(self, payload, timeout=None):
+        """POST /api/chat over a pooled connection and return the decoded JSON"""
+        return self._post(self.chat_url, payload, timeout)
+
+    def generate_stream(self, payload, timeout=None):
+        """POST /api/generate with streaming and yield each decoded NDJSON chunk"""
+        return self._post_stream(self.generate_url, payload, timeout)
+
+    def chat_stream(self, payload, timeout=None):
+        """POST /api/chat with streaming and yield each decoded NDJSON chunk"""
+        return self._post_stream(self.chat_url, payload, timeout)
+
+    def _post(self, url, payload, timeout):
+        _connect_timing.seconds = 0.0
+        start = time.perf_counter()
+        try:
+            response = self.session.post(url, json=payload, timeout=timeout or self.timeout)
+        except requests.exceptions.ConnectionError:
+            self.mark_unavailable("not_running")
+            metrics.incr("ollama.request_errors")
+            raise
+        finally:
+            self._record_connect()
+            metrics.observe("ollama.request_s", time.perf_counter() - start)
+
+        if response.status_code != 200:
+            metrics.incr("ollama.request_errors")
+            logger.error(f"LLM request failed: {response.status_code}")
+            return None
+        return response.json()
+
+    def _post_stream(self, url, payload, timeout):
+        payload = dict(payload, stream=True)
+        _connect_timing.seconds = 0.0
+        start = time.perf_counter()
+        try:
+            response = self.session.post(url, json=payload, stream=True, timeout=timeout or self.timeout)
+        except requests.exceptions.ConnectionError:
+            self.mark_unavailable("not_running")
+            metrics.incr("ollama.request_errors")
+            raise
+        finally:
+            self._record_connect()
+
+        try:
+            if response.status_code != 200:
+                metrics.incr("ollama.request_errors")
+                logger.error(f"LLM request failed: {response.status_code}")
+                return
+            first_chunk = True
+            lines = response.iter_lines()
+            for line in lines:
+                if not line:
+                    continue
+                if first_chunk:
+                    metrics.observe("ollama.time_to_first_chunk_s", time.perf_counter() - start)
+                    first_chunk = False
+                chunk = json.loads(line)
+                if chunk.get("done"):
+                    # Read the body to its end so the connection goes back to the pool
+                    for _ in lines:
+                        pass
+                yield chunk
+        finally:
+            # Closing before the body is read (a cancel or timeout) drops the
+            # connection, which makes Ollama stop decoding
+            response.close()
+            metrics.observe("ollama.request_s", time.perf_counter() - start)
+
+    def warm_up(self, model, keep_alive, system=None):
+        """Load the model (and evaluate a shared system prompt) and report cold vs warm latency"""
+        if system is None:
+            send = self.generate
+            payload = {"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive}
+        else:
+            send = self.chat
+            payload = {
+                "model": model,
+                "messages": [{"role": "system", "content": system}],
+                "stream": False,
+                "keep_alive": keep_alive,
+                "options": {"num_predict": 1}
+            }
+
+        report = {}
+        for phase in ("cold", "warm"):
+            start = time.perf_counter()
+            result = send(payload)
+            elapsed = time.perf_counter() - start
+            if result is None:
+                return None
+            report[f"{phase}_s"] = elapsed
+            report[f"{phase}_load_s"] = result.get("load_duration", 0) / 1e9
+            report[f"{phase}_prompt_eval_count"] = result.get("prompt_eval_count", 0)
+            metrics.observe(f"ollama.warmup_{phase}_s", elapsed)
+        return report
+
+    @staticmethod
+    def response_text(chunk):
+        """Text carried by a /api/generate or /api/chat response chunk"""
+        if "message" in chunk:
+            return (chunk.get("message") or {}).get("content", "")
+        return chunk.get("response", "")
+
+    def _record_connect(self):
+        connect_s = getattr(_connect_timing, "seconds", 0.0)
+        if connect_s > 0:
+            metrics.incr("ollama.connections_opened")
+            metrics.observe("ollama.connect_s", connect_s)
+        else:
+            metrics.incr("ollama.connections_reused")
+
+    def close(self):
+        self._stop.set()
+        self.session.close()
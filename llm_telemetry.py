@@ -0,0 +1,181 @@
+# llm_telemetry.py - Per-call Ollama timings attributed to tasks and sessions
+import bisect
+import threading
+import time
+from collections import deque
+
+from metrics import percentile
+
+NANOSECONDS = 1e9
+
+# Histogram bucket upper bounds; the last bucket is open-ended
+TOKENS_PER_S_BUCKETS = [1, 2, 5, 10, 20, 40, 80, 160]
+SECONDS_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30]
+
+
+class RollingHistogram:
+    """Bucketed counts and percentiles over the last `window` samples"""
+    def __init__(self, bounds, window=1000):
+        self.bounds = list(bounds)
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        with self._lock:
+            self._samples.append(value)
+
+    def snapshot(self):
+        with self._lock:
+            values = sorted(self._samples)
+        counts = [0] * (len(self.bounds) + 1)
+        for value in values:
+            counts[bisect.bisect_left(self.bounds, value)] += 1
+        # A list keeps bucket order through JSON encoders that sort keys
+        buckets = [{"le": bound, "count": count} for bound, count in zip(self.bounds + [None], counts)]
+        result = {"count": len(values), "buckets": buckets}
+        if values:
+            result.update({
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": values[-1]
+            })
+        return result
+
+
+def _seconds(chunk, field):
+    value = chunk.get(field)
+    return value / NANOSECONDS if value is not None else None
+
+
+def _rate(count, seconds):
+    if not count or not seconds:
+        return None
+    return count / seconds
+
+
+class LLMCall:
+    """Timings of one LLM request, filled in while its response streams"""
+    def __init__(self, model, endpoint, prompt_chars, task=None, session_id=None, phase="plan"):
+        self.model = model
+        self.endpoint = endpoint
+        self.prompt_chars = prompt_chars
+        self.task = task
+        self.session_id = session_id
+        self.phase = phase
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.ttft_s = None
+        self.chunks = 0
+        self.final = None
+
+    def on_chunk(self, chunk, text):
+        if text and self.ttft_s is None:
+            self.ttft_s = time.perf_counter() - self._start
+        if chunk.get("done"):
+            self.final = chunk
+        else:
+            self.chunks += 1
+
+    def finish(self, outcome):
+        """Return the call record; server timings only exist when the final chunk arrived"""
+        wall_s = time.perf_counter() - self._start
+        record = {
+            "task": self.task,
+            "session_id": self.session_id,
+            "phase": self.phase,
+            "model": self.model,
+            "endpoint": self.endpoint,
+            "outcome": outcome,
+            "started_at": self.started_at,
+            "wall_s": wall_s,
+            "ttft_s": self.ttft_s,
+            "prompt_chars": self.prompt_chars,
+            "server_timings": self.final is not None
+        }
+        final = self.final or {}
+        record.update({
+            "total_duration_s": _seconds(final, "total_duration"),
+            "load_duration_s": _seconds(final, "load_duration"),
+            "prompt_eval_count": final.get("prompt_eval_count"),
+            "prompt_eval_duration_s": _seconds(final, "prompt_eval_duration"),
+            "eval_count": final.get("eval_count", self.chunks),
+            "eval_duration_s": _seconds(final, "eval_duration")
+        })
+
+        if record["eval_duration_s"] is None and self.ttft_s is not None:
+            # Cancelled early: estimate decode time from the client side
+            record["eval_duration_s"] = wall_s - self.ttft_s
+        if record["load_duration_s"] is not None and record["prompt_eval_duration_s"] is not None:
+            # Ollama's own view of time to first token, without network and queueing
+            record["server_ttft_s"] = record["load_duration_s"] + record["prompt_eval_duration_s"]
+        else:
+            record["server_ttft_s"] = None
+        record["tokens_per_s"] = _rate(record["eval_count"], record["eval_duration_s"])
+        record["prompt_tokens_per_s"] = _rate(record["prompt_eval_count"], record["prompt_eval_duration_s"])
+        record["bottleneck"] = bottleneck(record)
+        return record
+
+
+def bottleneck(record):
+    """Name the phase that dominated a call: cold load, prompt evaluation or decoding"""
+    phases = {
+        "load": record["load_duration_s"] or 0.0,
+        "prompt_eval": record["prompt_eval_duration_s"] or 0.0,
+        "decode": record["eval_duration_s"] or 0.0
+    }
+    if not any(phases.values()):
+        return "unknown"
+    return max(phases, key=phases.get)
+
+
+class LLMTelemetry:
+    """Keeps recent LLM call records and rolling histograms of their timings"""
+    def __init__(self, max_calls=500, window=1000):
+        self._calls = deque(maxlen=max_calls)
+        self._lock = threading.Lock()
+        self.histograms = {
+            "tokens_per_s": RollingHistogram(TOKENS_PER_S_BUCKETS, window),
+            "prompt_tokens_per_s": RollingHistogram([10, 50, 100, 250, 500, 1000, 2000], window),
+            "ttft_s": RollingHistogram(SECONDS_BUCKETS, window),
+            "load_s": RollingHistogram(SECONDS_BUCKETS, window),
+            "wall_s": RollingHistogram(SECONDS_BUCKETS, window)
+        }
+        self._bottlenecks = {}
+
+    def start(self, model, endpoint, prompt_chars, task=None, session_id=None, phase="plan"):
+        return LLMCall(model, endpoint, prompt_chars, task, session_id, phase)
+
+    def record(self, call, outcome):
+        record = call.finish(outcome)
+        for name, field in (("tokens_per_s", "tokens_per_s"), ("prompt_tokens_per_s", "prompt_tokens_per_s"),
+                            ("ttft_s", "ttft_s"), ("load_s", "load_duration_s"), ("wall_s", "wall_s")):
+            if record[field] is not None:
+                self.histograms[name].add(record[field])
+        with self._lock:
+            self._calls.append(record)
+            self._bottlenecks[record["bottleneck"]] = self._bottlenecks.get(record["bottleneck"], 0) + 1
+        return record
+
+    def calls(self, session_id=None, limit=50):
+        """Most recent call records first, optionally for one session"""
+        with self._lock:
+            calls = list(self._calls)
+        if session_id is not None:
+            calls = [c for c in calls if c["session_id"] == session_id]
+        return calls[::-1][:limit]
+
+    def snapshot(self, session_id=None, limit=50):
+        with self._lock:
+            bottlenecks = dict(self._bottlenecks)
+            total = len(self._calls)
+        return {
+            "calls_recorded": total,
+            "bottlenecks": bottlenecks,
+            "histograms": {name: h.snapshot() for name, h in self.histograms.items()},
+            "recent": self.calls(session_id, limit)
+        }
+
+
+# Shared recorder used by the bot and exposed by the web app
+llm_telemetry = LLMTelemetry()
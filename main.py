@@ -1,21 +1,39 @@
 # main.py - Flask Web Application for RPA Bot
 
+import argparse
 import json
+import sys
 import time
-import subprocess
-import webbrowser
-import pyautogui
 import pyperclip
-import requests
 import config
 import os
 from web_automation import WebAutomation
+from llm_client import OllamaClient
+from plan_cache import PlanCache, make_cache_key
+from plan_templates import TemplateIndex
+from plan_stream import IncrementalPlanParser
+from intent_engine import IntentEngine
+from prompt_builder import PromptBuilder
+from instruction_schema import InstructionValidator, build_plan_schema
+from generation_budget import GenerationBudget, DEFAULT_NUM_PREDICT
+from llm_telemetry import llm_telemetry
+from model_router import PlanningRouter
+from speculation import Speculation
+from plan_optimizer import PlanOptimizer, pause_after
+from task_splitter import extract_search_terms
+from task_runner import TaskRunner, read_tasks
+from action_registry import ACTIONS
+from settle import ScreenSettler, SETTLE_POLICIES
+from backends import make_desktop
+from clock import RealClock, make_clock
+from plan_scheduler import PlanScheduler
+from metrics import metrics
 
 
 import logging
 import threading
+from contextlib import contextmanager
 from PIL import Image
-import psutil
 
 # Web automation imports
 ''' from selenium import webdriver
@@ -39,6 +57,7 @@ try:
     from selenium import webdriver
     from selenium.webdriver.chrome.service import Service
     from webdriver_manager.chrome import ChromeDriverManager
+    from fake_webdriver import FakeWebDriver
     SELENIUM_AVAILABLE = True
     print("✅ Web automation available")
 except ImportError as e:
@@ -80,12 +99,66 @@ try:
 except ImportError as e:
     print(f"⚠️  Text-to-speech not available: {e}")
 
+# Bump whenever the planning prompt changes so cached plans are not reused
+PROMPT_TEMPLATE_VERSION = 2
+
+# Fragments still read after the plan's closing bracket, so the final chunk with
+# Ollama's timings usually arrives before the request is cancelled
+TRAILING_CHUNKS = 2
+
+LLM_CONNECT_TIMEOUT_S = 5.0
+# Extra read time for a model that may need loading: measured cold load x2, at least
+# MIN_LOAD_ALLOWANCE_S, or DEFAULT_LOAD_ALLOWANCE_S before any load has been measured
+DEFAULT_LOAD_ALLOWANCE_S = 60.0
+MIN_LOAD_ALLOWANCE_S = 10.0
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def keep_alive_s(keep_alive):
+    """Seconds Ollama keeps a model loaded for a keep_alive value ('30m', 300, -1 = forever)"""
+    try:
+        seconds = float(keep_alive)
+    except (TypeError, ValueError):
+        text = str(keep_alive).strip().lower()
+        unit = "ms" if text.endswith("ms") else text[-1:]
+        try:
+            seconds = float(text[:-len(unit)]) * _DURATION_UNITS[unit]
+        except (KeyError, ValueError):
+            return 0.0
+    return float("inf") if seconds < 0 else seconds
+
 class RPABot:
-    def __init__(self):
+    def __init__(self, plan_cache_path="plan_cache.db", template_min_confidence=0.5,
+                 template_min_support=2, intent_min_confidence=0.85, prompt_mode="retrieval",
+                 prompt_examples=2, keep_alive="30m", warm_up=True, reuse_prompt_prefix=True,
+                 constrained_output=True, max_repair_attempts=1, fast_model=None,
+                 ollama_url="http://localhost:11434"):
         self.setup_logging()
         self.setup_speech()
-        self.ollama_url = "http://localhost:11434/api/generate"
+        self.llm_client = OllamaClient(ollama_url)
+        self.ollama_url = self.llm_client.generate_url
         self.model_name = "llama2"
+        self.plan_cache = PlanCache(plan_cache_path)
+        self.plan_templates = TemplateIndex(min_confidence=template_min_confidence,
+                                            min_support=template_min_support)
+        self.intent_engine = IntentEngine()
+        self.intent_min_confidence = intent_min_confidence
+        self.prompt_builder = PromptBuilder(mode=prompt_mode, k=prompt_examples)
+        self.keep_alive = keep_alive
+        self.reuse_prompt_prefix = reuse_prompt_prefix
+        self.warmup_report = None
+        # model -> when it last answered, and its last measured cold load time
+        self.model_seen_at = {}
+        self.model_load_s = {}
+        self.constrained_output = constrained_output
+        self.max_repair_attempts = max_repair_attempts
+        self.plan_schema = build_plan_schema()
+        self.validator = InstructionValidator()
+        self.generation_budget = GenerationBudget(self.intent_engine)
+        # With a fast model, plans are hedged between it and model_name
+        self.router = PlanningRouter(self, fast_model, self.model_name) if fast_model else None
+        if warm_up:
+            threading.Thread(target=self.warm_up_model, name="ollama-warmup", daemon=True).start()
         
     def setup_logging(self):
         logging.basicConfig(level=logging.INFO)
@@ -154,179 +227,382 @@ class RPABot:
             print(f"🔊 Bot: {text}")
     
     def check_ollama_connection(self):
-        """Check if Ollama is running"""
-        try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
-            if response.status_code == 200:
-                models = response.json().get('models', [])
-                if models:
-                    print(f"✅ Ollama connected. Available models: {[m['name'] for m in models]}")
-                    return True
-                else:
-                    print("⚠️  Ollama connected but no models found. Run: ollama pull llama2")
-                    return False
-            return False
-        except requests.exceptions.ConnectionError:
+        """Check if Ollama is running (uses the cached health state)"""
+        health = self.llm_client.health()
+        if health["ok"]:
+            print(f"✅ Ollama connected. Available models: {health['models']}")
+            return True
+        if health["error"] == "no_models":
+            print("⚠️  Ollama connected but no models found. Run: ollama pull llama2")
+        elif health["error"] == "not_running":
             print("❌ Ollama not running. Start with: ollama serve")
-            return False
-        except Exception as e:
-            print(f"❌ Ollama connection error: {e}")
-            return False
+        else:
+            print(f"❌ Ollama connection error: {health['error']}")
+        return False
     
-    def query_llm(self, prompt):
-        """Query the local LLM via Ollama"""
-        if not self.check_ollama_connection():
+    def warm_up_model(self):
+        """Load the model (and the shared prompt prefix) so the first task does not pay for it"""
+        if not self.llm_client.is_available():
+            print("⚠️  Skipping model warm-up: Ollama not available")
             return None
-            
-        try:
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.1,
-                    "top_p": 0.9,
-                    "num_predict": 1000
-                }
+        system = self.shared_prompt_prefix() if self.reuse_prompt_prefix else None
+        models = [self.model_name]
+        if self.router is not None:
+            models.insert(0, self.router.fast_model)
+        for model in models:
+            try:
+                report = self.llm_client.warm_up(model, self.keep_alive, system=system)
+            except Exception as e:
+                self.logger.error(f"Model warm-up failed: {e}")
+                return None
+            if report:
+                self.model_seen_at[model] = time.perf_counter()
+                self.model_load_s[model] = report["cold_load_s"]
+                print(f"🔥 {model} warm-up: cold {report['cold_s']:.2f}s "
+                      f"(load {report['cold_load_s']:.2f}s), warm {report['warm_s']:.2f}s "
+                      f"(prompt tokens evaluated {report['cold_prompt_eval_count']} -> "
+                      f"{report['warm_prompt_eval_count']})")
+        self.warmup_report = report
+        return report
+    
+    def shared_prompt_prefix(self):
+        """Task-independent part of the planning prompt, sent as the chat system message"""
+        head, _ = self.prompt_builder.build_parts("", shared_prefix=True)
+        return head
+    
+    def build_llm_payload(self, prompt, system=None, budget=None, model=None):
+        """Build a /api/chat payload when a shared system prefix is used, else /api/generate"""
+        payload = {
+            "model": model or self.model_name,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": 0.1,
+                "top_p": 0.9,
+                "num_predict": budget["num_predict"] if budget else DEFAULT_NUM_PREDICT,
+                # Few-shot prompts invite the model to continue with another example
+                "stop": ["\nTask:"]
             }
+        }
+        if self.constrained_output:
+            payload["format"] = self.plan_schema
+        if system is not None:
+            payload["messages"] = [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ]
+        else:
+            payload["prompt"] = prompt
+        return payload
+    
+    def query_llm(self, prompt, system=None, budget=None, context=None, model=None, cancel=None):
+        """Query the local LLM via Ollama, stopping as soon as the JSON plan is complete"""
+        tracker = IncrementalPlanParser()
+        parts = []
+        stream = self.query_llm_stream(prompt, system=system, budget=budget, context=context, model=model)
+        try:
+            trailing = 0
+            for fragment in stream:
+                if cancel is not None and cancel.is_set():
+                    # Another model already produced the plan
+                    return None
+                if tracker.closed:
+                    # Give Ollama a chunk or two to send its final timings before cancelling
+                    trailing += 1
+                    if trailing > TRAILING_CHUNKS:
+                        break
+                parts.append(fragment)
+                tracker.feed(fragment)
+        finally:
+            stream.close()
+        
+        if not parts:
+            return None
+        print("✅ LLM response received")
+        return "".join(parts)
+    
+    def query_llm_stream(self, prompt, system=None, budget=None, context=None, model=None):
+        """Query the local LLM and yield response text as it is decoded
+
+        context carries the task, session_id and phase the call is attributed to in
+        the LLM telemetry.
+        """
+        if not self.llm_client.is_available():
+            self.check_ollama_connection()
+            return
             
+        payload = self.build_llm_payload(prompt, system, budget, model)
+        num_predict = payload["options"]["num_predict"]
+        deadline_s = budget["deadline_s"] if budget else self.llm_client.timeout
+        # No chunk arrives while the model loads, so a cold model gets extra read time
+        load_allowance_s = self.expected_load_s(payload["model"])
+        timeout = (LLM_CONNECT_TIMEOUT_S, deadline_s + load_allowance_s)
+        start = time.perf_counter()
+        # The deadline covers decoding: it starts once the first chunk shows the model is loaded
+        first_chunk_at = None
+        chunks = 0
+        tokens = None
+        outcome = "stopped_early"
+        call = llm_telemetry.start(payload["model"], "chat" if system is not None else "generate",
+                                   len(prompt) + len(system or ""), **(context or {}))
+        
+        try:
             print("🤖 Querying local LLM...")
-            response = requests.post(self.ollama_url, json=payload, timeout=120)
-            
-            if response.status_code == 200:
-                result = response.json()["response"]
-                print("✅ LLM response received")
-                return result
+            if system is not None:
+                chunks_stream = self.llm_client.chat_stream(payload, timeout=timeout)
             else:
-                self.logger.error(f"LLM request failed: {response.status_code}")
-                return None
-                
+                chunks_stream = self.llm_client.generate_stream(payload, timeout=timeout)
+            try:
+                for chunk in chunks_stream:
+                    if first_chunk_at is None:
+                        first_chunk_at = time.perf_counter()
+                        self.model_seen_at[payload["model"]] = first_chunk_at
+                    text = self.llm_client.response_text(chunk)
+                    call.on_chunk(chunk, text)
+                    if chunk.get("done"):
+                        tokens = chunk.get("eval_count")
+                        load_s = chunk.get("load_duration", 0) / 1e9
+                        if load_s > 1.0:
+                            self.model_load_s[payload["model"]] = load_s
+                        outcome = "truncated" if chunk.get("done_reason") == "length" else "completed"
+                        if text:
+                            yield text
+                        break
+                    chunks += 1
+                    if text:
+                        yield text
+                    if time.perf_counter() - first_chunk_at > deadline_s:
+                        outcome = "deadline"
+                        print(f"⏱️  LLM generation exceeded its {deadline_s:.0f}s deadline")
+                        break
+            finally:
+                chunks_stream.close()
         except Exception as e:
             self.logger.error(f"Error querying LLM: {e}")
-            return None
+            outcome = "error"
+        finally:
+            end = time.perf_counter()
+            if tokens is None:
+                # No final chunk with eval_count: Ollama streams about one token per chunk
+                tokens = chunks
+                metrics.incr("llm.tokens_estimated")
+            if first_chunk_at is not None:
+                metrics.observe("llm.load_wait_s", first_chunk_at - start)
+            decode_s = end - (first_chunk_at or start)
+            self.record_generation(budget, num_predict, tokens, end - start, decode_s, outcome)
+            llm_telemetry.record(call, outcome)
+    
+    def expected_load_s(self, model):
+        """Read time to allow for loading a model that keep_alive may have unloaded"""
+        seen_at = self.model_seen_at.get(model)
+        if seen_at is not None and time.perf_counter() - seen_at < keep_alive_s(self.keep_alive):
+            return 0.0
+        load_s = self.model_load_s.get(model)
+        if load_s is None:
+            return DEFAULT_LOAD_ALLOWANCE_S
+        return max(MIN_LOAD_ALLOWANCE_S, load_s * 2)
+    
+    def record_generation(self, budget, num_predict, tokens, elapsed, decode_s, outcome):
+        """Per-request generation metrics: budget, tokens actually decoded and latency"""
+        metrics.observe("llm.num_predict", num_predict)
+        metrics.observe("llm.tokens_generated", tokens)
+        metrics.observe("llm.latency_s", elapsed)
+        metrics.incr(f"llm.outcome.{outcome}")
+        # Tokens the old fixed budget allowed but this request could never spend
+        metrics.observe("llm.tokens_capped", DEFAULT_NUM_PREDICT - num_predict)
+        if budget is not None:
+            # Deadlines are learned from decode time, the span they are enforced on
+            learned = "completed" if outcome == "stopped_early" else outcome
+            self.generation_budget.record(budget, tokens, decode_s, learned)
     
     def extract_search_terms(self, user_task):
         """Extract search terms from user task - handles multiple instructions"""
-        task_lower = user_task.lower()
+        return extract_search_terms(user_task)
+    
+    def lookup_local_plan(self, user_task):
+        """Return a rule-based, cached or template-instantiated plan without calling the LLM"""
+        recognized = self.intent_engine.fast_plan(user_task, self.intent_min_confidence)
+        if recognized is not None:
+            print("⚡ Recognized task without the LLM")
+            return recognized
         
-        # Common patterns for YouTube searches
-        patterns = [
-            "play song",
-            "play music",
-            "search for",
-            "find song",
-            "listen to",
-            "watch video",
-            "play video"
-        ]
-        
-        # Split by common separators to handle multiple instructions
-        separators = [" and ", " then ", " , ", " & "]
-        tasks = [user_task]
-        
-        for sep in separators:
-            new_tasks = []
-            for task in tasks:
-                if sep in task.lower():
-                    new_tasks.extend([t.strip() for t in task.split(sep)])
-                else:
-                    new_tasks.append(task.strip())
-            tasks = new_tasks
+        cached = self.plan_cache.get(self.plan_cache_key(user_task))
+        if cached is not None:
+            print("⚡ Using cached plan")
+            return cached
+        
+        templated, confidence = self.plan_templates.match(user_task)
+        if templated is not None:
+            print(f"⚡ Using learned plan template (confidence {confidence:.2f})")
+            return templated
+        return None
+    
+    def plan_cache_key(self, user_task):
+        prompt_version = (f"{PROMPT_TEMPLATE_VERSION}-{self.prompt_builder.mode}-{self.prompt_builder.k}"
+                          f"-{'chat' if self.reuse_prompt_prefix else 'generate'}")
+        return make_cache_key(self.model_name, prompt_version, user_task)
+    
+    def remember_plan(self, user_task, instructions):
+        """Store a successful LLM plan in the cache and the template index"""
+        if instructions:
+            self.plan_cache.put(self.plan_cache_key(user_task), user_task, instructions)
+            self.plan_templates.learn(user_task, instructions)
+    
+    def build_planning_prompt(self, user_task):
+        """Build the few-shot planning prompt for a task"""
+        return self.prompt_builder.build(user_task)
+    
+    def build_planning_messages(self, user_task):
+        """Return (system, prompt); system is None when the prefix is not shared"""
+        if not self.reuse_prompt_prefix:
+            return None, self.build_planning_prompt(user_task)
+        head, body = self.prompt_builder.build_parts(user_task, shared_prefix=True)
+        return head, body
+    
+    def parse_llm_plan(self, response):
+        """Extract and validate a plan from LLM text; returns (instructions, errors)"""
+        with metrics.timer("plan.parse_s"):
+            response = response.strip()
+            json_start = response.find('[')
+            json_end = response.rfind(']') + 1
+            if json_start == -1 or json_end == 0:
+                return None, ["no JSON array found in the response"]
+            try:
+                instructions = json.loads(response[json_start:json_end])
+            except json.JSONDecodeError as e:
+                return None, [f"invalid JSON: {e}"]
         
-        search_terms = []
+        with metrics.timer("plan.validate_s"):
+            errors = self.validator.validate(instructions)
+        return instructions, errors
+    
+    def build_repair_prompt(self, prompt, response, errors):
+        """Ask the LLM to correct its previous output"""
+        return (f"{prompt} {response.strip()}\n\n"
+                f"That output is invalid: {'; '.join(errors)}\n"
+                f"Return only the corrected JSON array.\nOutput:")
+    
+    def generate_rpa_instructions(self, user_task, session_id=None):
+        """Generate RPA instructions from natural language task"""
+        local_plan = self.lookup_local_plan(user_task)
+        if local_plan is not None:
+            return local_plan
+        return self.plan_remotely(user_task, session_id)
+    
+    def speculative_plan(self, user_task, automator, session_id=None):
+        """Plan a task while preparing the browser from the rule-based plan
+
+        Returns (instructions, report); report is None when no LLM call was needed.
+        """
+        local_plan = self.lookup_local_plan(user_task)
+        if local_plan is not None:
+            return local_plan, None
         
-        for task in tasks:
-            task_lower = task.lower()
-            search_term = task
+        speculation = self.start_speculation(user_task, automator)
+        instructions = self.plan_remotely(user_task, session_id)
+        return instructions, speculation.resolve(instructions)
+    
+    def start_speculation(self, user_task, automator):
+        """Start preparing for the rule-based plan of a task"""
+        rule_plan = None
+        if SELENIUM_AVAILABLE:
+            rule_plan = self.create_fallback_instructions(user_task)
+            # Nothing to prepare when the rule-based plan never opens a browser
+            if "browser" not in ACTIONS.resources(rule_plan or ()):
+                rule_plan = None
+        return Speculation(automator, rule_plan).start()
+    
+    def plan_remotely(self, user_task, session_id=None):
+        """Plan with the LLM (through the router when configured), else the fallback parser"""
+        if self.router is not None:
+            instructions = self.router.plan(user_task, session_id)
+        else:
+            instructions = self.plan_with_llm(user_task, session_id)
+        if instructions is not None:
+            self.remember_plan(user_task, instructions)
+            return instructions
+        metrics.incr("plan.fallbacks")
+        return self.create_fallback_instructions(user_task)
+    
+    def plan_with_llm(self, user_task, session_id=None, model=None, cancel=None, repair=True):
+        """Ask one model for a valid plan, with repair attempts; None when it fails"""
+        system, prompt = self.build_planning_messages(user_task)
+        budget = self.generation_budget.estimate(user_task)
+        attempts = self.max_repair_attempts + 1 if repair else 1
+        for attempt in range(attempts):
+            context = {"task": user_task, "session_id": session_id,
+                       "phase": "repair" if attempt else "plan"}
+            response = self.query_llm(prompt, system=system, budget=budget, context=context,
+                                      model=model, cancel=cancel)
+            if not response:
+                break
             
-            for pattern in patterns:
-                if pattern in task_lower:
-                    # Remove the pattern and get the actual search term
-                    search_term = task_lower.replace(pattern, "").strip()
-                    # Remove common words
-                    search_term = search_term.replace("on youtube", "").strip()
-                    search_term = search_term.replace("youtube", "").strip()
-                    break
+            instructions, errors = self.parse_llm_plan(response)
+            if not errors:
+                metrics.observe("plan.repair_attempts", attempt)
+                return instructions
             
-            # Clean up the search term
-            search_term = search_term.strip()
-            if search_term and search_term not in search_terms:
-                search_terms.append(search_term)
+            metrics.incr("plan.validation_failures")
+            print(f"❌ Invalid plan from LLM: {'; '.join(errors)}")
+            if attempt < attempts - 1:
+                metrics.incr("plan.repair_retries")
+                print("🔧 Asking the LLM to repair its plan...")
+                prompt = self.build_repair_prompt(prompt, response, errors)
         
-        return search_terms if search_terms else ["music"]
+        return None
     
-    def generate_rpa_instructions(self, user_task):
-        """Generate RPA instructions from natural language task"""
+    def stream_rpa_instructions(self, user_task, session_id=None):
+        """Yield instructions one by one as soon as the LLM has finished each of them"""
+        local_plan = self.lookup_local_plan(user_task)
+        if local_plan is not None:
+            yield from local_plan
+            return
         
-        system_prompt = f"""You are an RPA expert. Convert this task to JSON instructions.
-
-Available actions:
-- OPEN_APP: Open application
-- OPEN_URL: Open website
-- WEB_SEARCH: Search on a website (YouTube, Google, etc.)
-- WEB_CLICK: Click web element by text, ID, or CSS selector
-- WEB_TYPE: Type in web input field
-- WEB_WAIT: Wait for web element to load
-- CLICK: Click coordinates
-- TYPE: Type text
-- SCREENSHOT: Take screenshot
-- WAIT: Wait specified seconds
-- PRESS_KEY: Press keyboard key
-- HOTKEY: Key combinations
-
-IMPORTANT: For YouTube tasks, use WEB_SEARCH action!
-
-Examples:
-
-Task: "play song despacito on youtube"
-Output: [
-  {{"action": "WEB_SEARCH", "params": {{"site": "youtube", "query": "despacito", "auto_play": true}}}}
-]
-
-Task: "search for python tutorial on youtube"
-Output: [
-  {{"action": "WEB_SEARCH", "params": {{"site": "youtube", "query": "python tutorial", "auto_play": false}}}}
-]
-
-Task: "open google and search for weather"
-Output: [
-  {{"action": "WEB_SEARCH", "params": {{"site": "google", "query": "weather", "auto_play": false}}}}
-]
-
-Task: "open calculator and chrome"
-Output: [
-  {{"action": "OPEN_APP", "params": {{"app": "calc", "wait_time": 3}}}},
-  {{"action": "WAIT", "params": {{"seconds": 2}}}},
-  {{"action": "OPEN_URL", "params": {{"url": "https://google.com", "wait_time": 4}}}}
-]
-
-Now convert this task: "{user_task}"
-Output:"""
-
-        response = self.query_llm(system_prompt)
+        start = time.perf_counter()
+        parser = IncrementalPlanParser()
+        instructions = []
+        system, prompt = self.build_planning_messages(user_task)
+        budget = self.generation_budget.estimate(user_task)
+        context = {"task": user_task, "session_id": session_id, "phase": "plan"}
+        stream = self.query_llm_stream(prompt, system=system, budget=budget, context=context)
+        trailing = 0
+        try:
+            for fragment in stream:
+                if parser.closed:
+                    trailing += 1
+                    if trailing > TRAILING_CHUNKS:
+                        break
+                    continue
+                for instruction in parser.feed(fragment):
+                    errors = self.validator.validate_instruction(instruction)
+                    if errors:
+                        metrics.incr("plan.stream.invalid_steps")
+                        parser.errors.extend(errors)
+                        continue
+                    if not instructions:
+                        metrics.observe("plan.stream.first_instruction_s", time.perf_counter() - start)
+                    instructions.append(instruction)
+                    yield instruction
+        finally:
+            stream.close()
         
-        if response:
-            try:
-                response = response.strip()
-                json_start = response.find('[')
-                json_end = response.rfind(']') + 1
-                
-                if json_start != -1 and json_end != 0:
-                    json_str = response[json_start:json_end]
-                    instructions = json.loads(json_str)
-                    return instructions
-                else:
-                    print("❌ No valid JSON found in LLM response")
-                    return self.create_fallback_instructions(user_task)
-                    
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON parsing failed: {e}")
-                return self.create_fallback_instructions(user_task)
+        for error in parser.errors:
+            print(f"❌ Invalid step from LLM: {error}")
         
-        return self.create_fallback_instructions(user_task)
+        if instructions:
+            if parser.closed and not parser.errors:
+                self.remember_plan(user_task, instructions)
+            return
+        
+        print("❌ No valid JSON found in LLM response")
+        metrics.incr("plan.fallbacks")
+        yield from self.create_fallback_instructions(user_task) or []
     
     def create_fallback_instructions(self, user_task):
         """Create fallback instructions when LLM fails"""
+        recognized, confidence = self.intent_engine.plan(user_task)
+        if recognized:
+            return recognized
+        
         task_lower = user_task.lower()
         instructions = []
         
@@ -371,16 +647,47 @@ Output:"""
         return instructions if instructions else None
 
 class WebAutomator:
-    def __init__(self):
+    # Search site home pages and how long the original flow waited for them to load
+    SITE_HOMES = {
+        "youtube": ("https://www.youtube.com", 3),
+        "google": ("https://www.google.com", 2)
+    }
+    
+    def __init__(self, backend="real", clock=None):
+        # "real" drives Chrome; "simulated" serves local HTML fixtures through FakeWebDriver
+        self.backend = backend
+        self.clock = clock or RealClock()
         self.driver = None
         self.wait = None
+        self.preloaded_site = None
+        self._lock = threading.RLock()
         
     def setup_driver(self):
-        """Setup Chrome driver with options"""
+        """Setup Chrome driver with options; reuses a driver that is already running"""
         if not SELENIUM_AVAILABLE:
             print("❌ Selenium not available for web automation")
             return False
-            
+        
+        with self._lock:
+            if self.driver is not None:
+                try:
+                    self.driver.title
+                    return True
+                except Exception:
+                    # The browser was closed behind our back; start a new one
+                    self.driver = None
+                    self.preloaded_site = None
+            return self._start_driver()
+    
+    def spawn(self):
+        """Another automator with the same backend, for running searches side by side"""
+        return type(self)(self.backend, self.clock)
+    
+    def _start_driver(self):
+        if self.backend == "simulated":
+            self.driver = FakeWebDriver(clock=self.clock)
+            self.wait = WebDriverWait(self.driver, 10)
+            return True
         try:
             chrome_options = Options()
             chrome_options.add_argument("--no-sandbox")
@@ -404,14 +711,57 @@ class WebAutomator:
             print(f"❌ Failed to setup Chrome driver: {e}")
             return False
     
+    def preload(self, site, cancel=None):
+        """Open a search site's home page ahead of the search that will use it
+
+        cancel is checked under the lock, so a discarded preload never navigates
+        or marks the site loaded once the real plan may be using the browser.
+        """
+        url, settle_s = self.SITE_HOMES[site]
+        with self._lock:
+            if cancel is not None and cancel.is_set():
+                return False
+            self.driver.get(url)
+            self.clock.sleep(settle_s, "page_load")
+            if cancel is not None and cancel.is_set():
+                return False
+            self.preloaded_site = site
+            return True
+    
+    def forget_preload(self, site=None):
+        """Drop the preloaded mark (only for site when given); the next search navigates"""
+        with self._lock:
+            if site is None or self.preloaded_site == site:
+                self.preloaded_site = None
+    
+    def adopt(self, other):
+        """Take over another automator's browser; False when this one already has its own"""
+        with self._lock, other._lock:
+            if self.driver is not None:
+                return False
+            self.driver, self.wait, self.preloaded_site = other.driver, other.wait, other.preloaded_site
+            other.driver, other.wait, other.preloaded_site = None, None, None
+            return True
+    
+    def open_site(self, site):
+        """Go to a search site's home page unless it was preloaded"""
+        with self._lock:
+            preloaded = self.preloaded_site == site
+            self.preloaded_site = None
+        if preloaded:
+            print(f"⚡ {site} already loaded")
+            return
+        url, settle_s = self.SITE_HOMES[site]
+        self.driver.get(url)
+        self.clock.sleep(settle_s, "page_load")
+    
     def search_youtube(self, query, auto_play=True):
         """Search and optionally play video on YouTube"""
         try:
             print(f"🎵 Searching YouTube for: '{query}'")
             
             # Go to YouTube
-            self.driver.get("https://www.youtube.com")
-            time.sleep(3)
+            self.open_site("youtube")
             
             # Find and click search box
             search_box = self.wait.until(
@@ -422,7 +772,7 @@ class WebAutomator:
             search_box.send_keys(Keys.RETURN)
             
             print("🔍 Search submitted, waiting for results...")
-            time.sleep(3)
+            self.clock.sleep(3, "page_load")
             
             if auto_play:
                 # Click on the first video
@@ -436,7 +786,7 @@ class WebAutomator:
                     print(f"🎬 Playing: {video_title}")
                     
                     first_video.click()
-                    time.sleep(5)  # Wait for video to load
+                    self.clock.sleep(5, "page_load")  # Wait for video to load
                     
                     print("✅ Video should now be playing!")
                     return True
@@ -458,8 +808,7 @@ class WebAutomator:
         try:
             print(f"🔍 Searching Google for: '{query}'")
             
-            self.driver.get("https://www.google.com")
-            time.sleep(2)
+            self.open_site("google")
             
             # Find search box (Google has different possible names)
             search_selectors = ["q", "search"]
@@ -480,7 +829,7 @@ class WebAutomator:
             search_box.send_keys(query)
             search_box.send_keys(Keys.RETURN)
             
-            time.sleep(3)
+            self.clock.sleep(3, "page_load")
             print("✅ Google search completed")
             return True
             
@@ -490,87 +839,223 @@ class WebAutomator:
     
     def close(self):
         """Close the browser"""
-        if self.driver:
+        with self._lock:
+            driver, self.driver = self.driver, None
+            self.preloaded_site = None
+        if driver:
             try:
-                self.driver.quit()
+                driver.quit()
                 print("✅ Browser closed")
             except:
                 pass
 
 class RPAExecutor:
-    def __init__(self):
-        pyautogui.FAILSAFE = True
-        pyautogui.PAUSE = 0.5
-        self.opened_processes = []
-        self.web_automator = WebAutomator()
+    def __init__(self, max_workers=4, max_browsers=3, backend="real", clock=None):
+        """backend "real" drives this machine; "simulated" a headless desktop and fixture browser
+
+        Every wait goes through `clock`; a clock.VirtualClock makes them instant.
+        """
+        self.clock = clock or RealClock()
+        self.desktop = make_desktop(backend, self.clock)
+        # pid -> process of every app this executor launched
+        self.opened_processes = {}
+        # Launches made with defer_ready that WAIT_READY still has to wait for
+        self.pending_launches = []
+        self.web_automator = WebAutomator(backend, self.clock)
+        self.optimizer = PlanOptimizer()
+        self.actions = ACTIONS
+        self.settler = ScreenSettler(self.desktop.screenshot, clock=self.clock)
+        self.idle_s = 0.0
+        self.fixed_idle_s = 0.0
+        # Plans with independent steps run concurrently, browser steps in up to max_browsers browsers
+        self.scheduler = PlanScheduler(max_workers, max_browsers)
+        self._lane = threading.local()
         
+    @contextmanager
+    def browser_lane(self, automator):
+        """Send this thread's web actions to another browser"""
+        self._lane.automator = automator
+        try:
+            yield automator
+        finally:
+            self._lane.automator = None
+    
+    def browser(self):
+        """The browser web actions on this thread use"""
+        return getattr(self._lane, "automator", None) or self.web_automator
+    
+    def close_browsers(self):
+        self.scheduler.close()
+        self.web_automator.close()
+    
     def is_process_running(self, process_name):
         """Check if a process is running"""
         try:
-            for proc in psutil.process_iter(['pid', 'name']):
-                if process_name.lower() in proc.info['name'].lower():
-                    return True
-        except:
-            pass
-        return False
+            return self.desktop.is_running(process_name)
+        except Exception:
+            return False
+    
+    def settle(self, policy, **changes):
+        """Wait on a settle policy and add the wait to the plan's idle time"""
+        policy = SETTLE_POLICIES[policy]
+        if changes:
+            policy = policy.replace(**changes)
+        waited = self.settler.settle(policy)
+        self.idle_s += waited
+        self.fixed_idle_s += policy.fixed_s
+        metrics.observe("settle.waited_s", waited)
+        return waited
+    
+    def settle_after(self, instruction, next_instruction):
+        """Let the UI settle between two steps; the step pause this replaces counts as fixed idle time"""
+        pause = pause_after(instruction, next_instruction)
+        spec = self.actions.get(instruction.get("action"))
+        if not pause or spec is None:
+            return 0.0
+        self.fixed_idle_s += pause
+        return self.settle(spec.settle)
+    
+    def reset_idle(self):
+        self.idle_s = 0.0
+        self.fixed_idle_s = 0.0
+    
+    def incoming(self, instructions):
+        """Instructions from a planner or client as they arrive, without the optimizer's internal steps"""
+        self.pending_launches = []
+        for instruction in instructions:
+            yield from self.actions.strip_internal([instruction])
+    
+    def optimize_plan(self, instructions):
+        """Rewrite a plan to drop redundant steps and waits before running it
+
+        Internal actions and params only the optimizer may write are stripped
+        from the incoming plan first, and launches a previous plan left pending
+        are forgotten.
+        """
+        self.pending_launches = []
+        if isinstance(instructions, list):
+            instructions = self.actions.strip_internal(instructions)
+        optimized, report = self.optimizer.optimize(instructions)
+        metrics.observe("optimizer.estimated_saved_s", report["estimated_saved_s"])
+        for rule in report["rules"]:
+            metrics.incr(f"optimizer.{rule}")
+        return optimized, report
     
-    def execute_instructions(self, instructions):
-        """Execute the RPA instructions"""
+    def execute_instructions(self, instructions, interactive=True):
+        """Execute the RPA instructions
+
+        Returns a report of the steps run, the ones that failed and their durations
+        on the executor's clock, with clock_s the whole plan's time on it. With
+        interactive=False the browser is left open for the next task instead of
+        waiting for Enter; cleanup() closes it.
+        """
+        instructions, report = self.optimize_plan(instructions)
+        if report["rules"]:
+            print(f"🧹 Optimized plan ({', '.join(report['rules'])}): "
+                  f"{report['steps_before']} -> {report['steps_after']} steps, "
+                  f"~{report['estimated_saved_s']:.1f}s saved")
         print(f"🚀 Executing {len(instructions)} instructions...")
         
-        web_actions_present = any(
-            inst.get("action", "").startswith("WEB_") 
-            for inst in instructions
-        )
+        web_actions_present = "browser" in self.actions.resources(instructions)
         
+        self.reset_idle()
+        started = self.clock.now()
+        result = {"steps": len(instructions), "failed_steps": [], "step_s": [],
+                  "optimizer_rules": report["rules"]}
         if web_actions_present:
             if not self.web_automator.setup_driver():
                 print("❌ Cannot perform web actions without browser automation")
-                return
+                result["failed_steps"] = list(range(len(instructions)))
+                return result
+        
+        if self.scheduler.worthwhile(instructions):
+            schedule = self.scheduler.run(self, instructions)
+            result["failed_steps"] = schedule.pop("failed_steps")
+            result["step_s"] = schedule.pop("step_s")
+            result["schedule"] = schedule
+        else:
+            result["failed_steps"], result["step_s"] = self.run_in_order(instructions)
+                
+        print("\n✅ All instructions completed!")
+        print(f"💤 Idle {self.idle_s:.2f}s settling (fixed sleeps: {self.fixed_idle_s:.2f}s)")
+        result["idle_s"] = self.idle_s
+        result["fixed_idle_s"] = self.fixed_idle_s
+        result["clock_s"] = self.clock.now() - started
+        metrics.observe("settle.plan_idle_s", self.idle_s)
         
+        # Keep browser open for web actions
+        if web_actions_present and interactive:
+            input("\n🌐 Browser is open. Press Enter to close it...")
+            self.close_browsers()
+        return result
+    
+    def run_in_order(self, instructions):
+        """Run steps one after another; returns (indices of failed steps, seconds per step)"""
+        failed, step_s = [], []
         for i, instruction in enumerate(instructions):
+            start = self.clock.now()
             try:
-                print(f"\n🔄 Step {i+1}/{len(instructions)}: {instruction}")
-                action = instruction.get("action")
-                params = instruction.get("params", {})
+                self.log(f"🔄 Step {i+1}/{len(instructions)}: {instruction.get('action')} "
+                         f"{instruction.get('params', {})}")
+                self.execute_step(instruction)
+                next_instruction = instructions[i + 1] if i + 1 < len(instructions) else None
+                self.settle_after(instruction, next_instruction)
                 
-                if action == "WEB_SEARCH":
-                    self.web_search_action(params)
-                elif action == "OPEN_APP":
-                    self.open_app_action(params)
-                elif action == "OPEN_URL":
-                    self.open_url_action(params)
-                elif action == "CLICK":
-                    self.click_action(params)
-                elif action == "TYPE":
-                    self.type_action(params)
-                elif action == "SCREENSHOT":
-                    self.screenshot_action(params)
-                elif action == "WAIT":
-                    self.wait_action(params)
-                elif action == "COPY":
-                    self.copy_action()
-                elif action == "PASTE":
-                    self.paste_action()
-                elif action == "SCROLL":
-                    self.scroll_action(params)
-                elif action == "PRESS_KEY":
-                    self.press_key_action(params)
-                elif action == "HOTKEY":
-                    self.hotkey_action(params)
-                else:
-                    print(f"❌ Unknown action: {action}")
-                    
-                time.sleep(0.5)
+            except Exception as e:
+                self.log(f"❌ Error in step {i+1}: {e}", "error")
+                failed.append(i)
+            finally:
+                step_s.append(self.clock.now() - start)
+        return failed, step_s
+    
+    def log(self, message, level="info"):
+        print(message)
+    
+    def execute_step(self, instruction):
+        """Run a single instruction through the action registry"""
+        action = instruction.get("action")
+        if action not in self.actions:
+            self.unknown_action(action)
+            return
+        self.actions.dispatch(self, instruction)
+    
+    def unknown_action(self, action):
+        print(f"❌ Unknown action: {action}")
+    
+    def execute_instruction_stream(self, instructions, interactive=True):
+        """Execute instructions as they arrive from a generator"""
+        print("🚀 Executing instructions as they are generated...")
+        start = time.perf_counter()
+        web_ready = False
+        count = 0
+        previous = None
+        self.reset_idle()
+        
+        for instruction in self.incoming(instructions):
+            count += 1
+            if count == 1:
+                metrics.observe("executor.time_to_first_action_s", time.perf_counter() - start)
+            try:
+                # The next step is known only once it arrives, so settle before it
+                if previous is not None:
+                    self.settle_after(previous, instruction)
+                previous = instruction
+                print(f"\n🔄 Step {count}: {instruction}")
+                if not web_ready and "browser" in self.actions.resources([instruction]):
+                    if not self.web_automator.setup_driver():
+                        print("❌ Cannot perform web actions without browser automation")
+                        continue
+                    web_ready = True
+                self.execute_step(instruction)
                 
             except Exception as e:
-                print(f"❌ Error in step {i+1}: {e}")
+                print(f"❌ Error in step {count}: {e}")
                 continue
-                
-        print("\n✅ All instructions completed!")
         
-        # Keep browser open for web actions
-        if web_actions_present:
+        print(f"\n✅ All {count} instructions completed!")
+        print(f"💤 Idle {self.idle_s:.2f}s settling (fixed sleeps: {self.fixed_idle_s:.2f}s)")
+        
+        if web_ready and interactive:
             input("\n🌐 Browser is open. Press Enter to close it...")
             self.web_automator.close()
     
@@ -585,9 +1070,9 @@ class RPAExecutor:
             return
             
         if site == "youtube":
-            self.web_automator.search_youtube(query, auto_play)
+            self.browser().search_youtube(query, auto_play)
         elif site == "google":
-            self.web_automator.search_google(query)
+            self.browser().search_google(query)
         else:
             print(f"❌ Unsupported search site: {site}")
     
@@ -614,10 +1099,26 @@ class RPAExecutor:
                     return
                 
                 print(f"🚀 Starting {app_name}...")
-                process = subprocess.Popen(exe_name, shell=True)
-                self.opened_processes.append(process)
-                time.sleep(wait_time)
-                print(f"✅ {app_name} opened")
+                process = self.desktop.launch(exe_name, process_name)
+                self.opened_processes[process.pid] = process
+                if params.get("defer_ready"):
+                    # Checked by the WAIT_READY step after the other launches are under way
+                    self.pending_launches.append(
+                        {"name": app_name, "process": process, "process_name": process_name,
+                         "wait_time": wait_time, "deadline": self.clock.now() + wait_time})
+                    return
+                readiness = self.desktop.wait_ready(process, process_name, deadline_s=wait_time)
+                self.idle_s += readiness["latency_s"]
+                self.fixed_idle_s += wait_time
+                metrics.observe("app.ready_s", readiness["latency_s"])
+                metrics.incr(f"app.ready.{readiness['reason']}")
+                if readiness["ready"]:
+                    print(f"✅ {app_name} ready in {readiness['latency_s']:.2f}s ({readiness['reason']})")
+                elif readiness["reason"] == "failed":
+                    print(f"❌ {app_name} failed to start")
+                else:
+                    print(f"⚠️  {app_name} not ready after {wait_time}s, continuing")
+                return readiness
                 
         except Exception as e:
             print(f"❌ Failed to open {app_name}: {e}")
@@ -629,30 +1130,66 @@ class RPAExecutor:
         
         if url:
             print(f"🌐 Opening URL: {url}")
-            webbrowser.open(url)
-            time.sleep(wait_time)
+            self.desktop.open_url(url)
+            if params.get("defer_ready"):
+                self.pending_launches.append(
+                    {"name": url, "process": None, "process_name": None,
+                     "wait_time": wait_time, "deadline": self.clock.now() + wait_time})
+                return
+            self.settle("launch", max_wait_s=wait_time, fixed_s=wait_time)
+    
+    def wait_ready_action(self, params):
+        """Wait for every deferred launch, each until it is ready or its own deadline passes
+
+        The launches started back to back, so this takes as long as the slowest
+        one rather than the sum of their start-ups; wait_time caps the whole wait.
+        """
+        pending, self.pending_launches = self.pending_launches, []
+        if not pending:
+            return
+        start = self.clock.now()
+        cap = params.get("wait_time")
+        end = start + cap if isinstance(cap, (int, float)) else None
+        print(f"⏳ Waiting for {len(pending)} launch(es) to be ready...")
+        for launch in pending:
+            deadline = launch["deadline"] if end is None else min(launch["deadline"], end)
+            remaining = max(0.0, deadline - self.clock.now())
+            if launch["process"] is None:
+                self.settler.settle(SETTLE_POLICIES["launch"].replace(max_wait_s=remaining, fixed_s=remaining))
+                continue
+            readiness = self.desktop.wait_ready(launch["process"], launch["process_name"], deadline_s=remaining)
+            metrics.observe("app.ready_s", readiness["latency_s"])
+            metrics.incr(f"app.ready.{readiness['reason']}")
+            if readiness["ready"]:
+                print(f"✅ {launch['name']} ready after {self.clock.now() - start:.2f}s ({readiness['reason']})")
+            elif readiness["reason"] == "failed":
+                print(f"❌ {launch['name']} failed to start")
+            else:
+                print(f"⚠️  {launch['name']} not ready after {launch['wait_time']}s, continuing")
+        self.idle_s += self.clock.now() - start
+        self.fixed_idle_s += max(launch["wait_time"] for launch in pending)
     
     def click_action(self, params):
         if "x" in params and "y" in params:
-            pyautogui.click(params["x"], params["y"])
+            self.desktop.click(params["x"], params["y"])
             print(f"✅ Clicked at ({params['x']}, {params['y']})")
         else:
-            screen_width, screen_height = pyautogui.size()
-            pyautogui.click(screen_width // 2, screen_height // 2)
+            screen_width, screen_height = self.desktop.size()
+            self.desktop.click(screen_width // 2, screen_height // 2)
             print("✅ Clicked center of screen")
     
     def type_action(self, params):
         text = params.get("text", "")
         interval = params.get("interval", 0.05)
-        time.sleep(0.5)
-        pyautogui.typewrite(text, interval=interval)
+        self.settle("input")
+        self.desktop.typewrite(text, interval=interval)
         print(f"✅ Typed: '{text}'")
     
     def screenshot_action(self, params):
         filename = params.get("filename", f"screenshot_{int(time.time())}.png")
         try:
-            time.sleep(1)
-            screenshot = pyautogui.screenshot()
+            self.settle("screenshot")
+            screenshot = self.desktop.screenshot()
             screenshot.save(filename)
             print(f"✅ Screenshot saved: {filename}")
         except Exception as e:
@@ -661,14 +1198,14 @@ class RPAExecutor:
     def wait_action(self, params):
         seconds = params.get("seconds", 1)
         print(f"⏳ Waiting {seconds} seconds...")
-        time.sleep(seconds)
+        self.clock.sleep(seconds, "wait")
     
     def copy_action(self):
-        pyautogui.hotkey('ctrl', 'c')
+        self.desktop.hotkey('ctrl', 'c')
         print("✅ Copied to clipboard")
     
     def paste_action(self):
-        pyautogui.hotkey('ctrl', 'v')
+        self.desktop.hotkey('ctrl', 'v')
         print("✅ Pasted from clipboard")
     
     def scroll_action(self, params):
@@ -676,39 +1213,76 @@ class RPAExecutor:
         clicks = params.get("clicks", 3)
         
         if direction.lower() == "up":
-            pyautogui.scroll(clicks)
+            self.desktop.scroll(clicks)
         else:
-            pyautogui.scroll(-clicks)
+            self.desktop.scroll(-clicks)
         print(f"✅ Scrolled {direction}")
     
     def press_key_action(self, params):
         key = params.get("key", "")
         if key:
-            pyautogui.press(key.lower())
+            self.desktop.press(key.lower())
             print(f"✅ Pressed: {key}")
     
     def hotkey_action(self, params):
         keys = params.get("keys", [])
         if keys:
-            pyautogui.hotkey(*keys)
+            self.desktop.hotkey(*keys)
             print(f"✅ Hotkey: {'+'.join(keys)}")
     
     def cleanup(self):
         """Clean up resources"""
-        self.web_automator.close()
-        for process in self.opened_processes:
+        self.close_browsers()
+        for process in self.opened_processes.values():
             try:
-                if process.poll() is None:
-                    process.terminate()
+                self.desktop.terminate(process)
             except:
                 pass
+        self.opened_processes.clear()
+        self.pending_launches = []
+
+def run_task_file(args):
+    """Run every task of a JSONL/CSV file (or stdin) without prompting"""
+    bot = RPABot()
+    clock = make_clock(args.clock)
+    executor = RPAExecutor(backend=args.backend, clock=clock)
+    start = time.perf_counter()
+    with open(args.output, "a", encoding="utf-8") as output:
+        runner = TaskRunner(bot, executor, output, stop_on_error=args.stop_on_error)
+        try:
+            runner.run(read_tasks(args.tasks, args.format))
+        except KeyboardInterrupt:
+            print("\n👋 Run interrupted")
+        finally:
+            executor.cleanup()
+    counts = runner.counts
+    print(f"\n📊 {counts['completed']}/{counts['tasks']} tasks completed in "
+          f"{time.perf_counter() - start:.1f}s, results in {args.output}")
+    if clock.name == "virtual":
+        print(f"⏱️  Virtual clock: {clock.slept_s:.1f}s of waits in {clock.sleeps} sleeps skipped")
+    return 0 if counts["failed"] == 0 else 1
+
 
 def main():
+    parser = argparse.ArgumentParser(description="RPA Bot with Web Automation")
+    parser.add_argument("--tasks", metavar="PATH",
+                        help="run the tasks of a JSONL/CSV file ('-' for stdin) unattended")
+    parser.add_argument("--output", default="task_results.jsonl", help="JSONL file to append one result per task to")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="task file format (default: from extension)")
+    parser.add_argument("--stop-on-error", action="store_true", help="stop at the first task that does not complete")
+    parser.add_argument("--backend", choices=("real", "simulated"), default="real",
+                        help="run actions on this machine or on a simulated desktop and fixture browser")
+    parser.add_argument("--clock", choices=("real", "virtual"), default="real",
+                        help="'virtual' skips every wait and only records it (for simulated runs)")
+    args = parser.parse_args()
+    if args.tasks:
+        return run_task_file(args)
+    
     print("🤖 RPA Bot with Web Automation - YouTube & Google Search")
     print("=" * 65)
     
     bot = RPABot()
-    executor = RPAExecutor()
+    executor = RPAExecutor(backend=args.backend, clock=make_clock(args.clock))
     
     features = []
     if SPEECH_AVAILABLE and bot.recognizer:
@@ -789,7 +1363,7 @@ def main():
                 print(f"\n🎯 Task: {user_task}")
                 bot.speak("Processing your task")
                 
-                instructions = bot.generate_rpa_instructions(user_task)
+                instructions, _ = bot.speculative_plan(user_task, executor.web_automator)
                 
                 if instructions:
                     print(f"\n📋 Generated {len(instructions)} instructions:")
@@ -823,4 +1397,4 @@ def main():
         executor.cleanup()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
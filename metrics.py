@@ -0,0 +1,79 @@
+# metrics.py - Lightweight in-process metrics for the RPA Bot
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+def percentile(sorted_values, q):
+    """Return the q-th percentile (0-100) of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class MetricsRegistry:
+    """Thread-safe counters and rolling timing samples"""
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._samples = {}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name, value):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(value)
+
+    @contextmanager
+    def timer(self, name):
+        """Record the wall time of a block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def summary(self, name):
+        """Summarize the rolling window of a timing series"""
+        with self._lock:
+            values = sorted(self._samples.get(name, ()))
+        if not values:
+            return {"count": 0}
+        return {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": values[-1]
+        }
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            names = list(self._samples)
+        return {
+            "counters": counters,
+            "timings": {name: self.summary(name) for name in names}
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._samples.clear()
+
+
+# Shared registry used by the bot, the executors and the web app
+metrics = MetricsRegistry()
@@ -0,0 +1,154 @@
+# model_router.py - Hedged planning across a fast small model and a strong large model
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from metrics import metrics, percentile
+
+
+class ModelStats:
+    """Outcome history of one model on one intent family"""
+    def __init__(self, history=200):
+        self.latencies = deque(maxlen=history)
+        self.outcomes = deque(maxlen=history)
+
+    def record(self, ok, elapsed_s):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(elapsed_s)
+
+    def success_rate(self):
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 1.0
+
+
+class PlanningRouter:
+    """Plans with the fast model first and hedges to the strong model when it is late or wrong
+
+    The hedge delay per (model, intent) is the latency_quantile of the fast model's
+    past valid plans; intents where the fast model is usually wrong hedge at once.
+    The first valid plan wins and the other request is cancelled.
+    """
+    def __init__(self, bot, fast_model, strong_model, default_hedge_after_s=5.0,
+                 min_hedge_after_s=0.25, max_hedge_after_s=30.0, latency_quantile=90,
+                 hedge_margin=1.2, min_samples=5, min_success_rate=0.5, min_confidence=0.5,
+                 max_workers=8, history=200):
+        self.bot = bot
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.default_hedge_after_s = default_hedge_after_s
+        self.min_hedge_after_s = min_hedge_after_s
+        self.max_hedge_after_s = max_hedge_after_s
+        self.latency_quantile = latency_quantile
+        self.hedge_margin = hedge_margin
+        self.min_samples = min_samples
+        self.min_success_rate = min_success_rate
+        self.min_confidence = min_confidence
+        self.history = history
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan-router")
+
+    def stats(self, model, intent):
+        with self._lock:
+            key = (model, intent)
+            if key not in self._stats:
+                self._stats[key] = ModelStats(self.history)
+            return self._stats[key]
+
+    def hedge_after(self, model, intent):
+        """Seconds to wait for `model` before also asking the strong model"""
+        stats = self.stats(model, intent)
+        with self._lock:
+            outcomes = len(stats.outcomes)
+            success_rate = stats.success_rate()
+            latencies = sorted(stats.latencies)
+        if outcomes >= self.min_samples and success_rate < self.min_success_rate:
+            return 0.0
+        if len(latencies) < self.min_samples:
+            return self.default_hedge_after_s
+        learned = percentile(latencies, self.latency_quantile) * self.hedge_margin
+        return max(self.min_hedge_after_s, min(self.max_hedge_after_s, learned))
+
+    def plan_confidence(self, user_task, instructions):
+        """Share of the clauses the intent engine recognizes whose action the plan contains"""
+        _, clauses = self.bot.intent_engine.split_clauses(user_task)
+        actions = {step.get("action") for step in instructions}
+        recognized = covered = 0
+        for clause in clauses:
+            result = self.bot.intent_engine.classify(clause)
+            if result is None:
+                continue
+            recognized += 1
+            covered += result[1]["action"] in actions
+        return covered / recognized if recognized else 1.0
+
+    def attempt(self, model, user_task, session_id, intent, cancel, repair):
+        start = time.perf_counter()
+        instructions = self.bot.plan_with_llm(user_task, session_id, model=model, cancel=cancel, repair=repair)
+        elapsed = time.perf_counter() - start
+        if cancel.is_set():
+            # The other model won the race; count it as a miss so the hedge comes sooner
+            instructions = None
+            reason = "cancelled"
+        elif instructions is None:
+            reason = "invalid"
+        elif self.plan_confidence(user_task, instructions) < self.min_confidence:
+            reason = "low_confidence"
+            instructions = None
+        else:
+            reason = "ok"
+        with self._lock:
+            stats = self._stats.setdefault((model, intent), ModelStats(self.history))
+            stats.record(instructions is not None, elapsed)
+        metrics.observe(f"router.{model}.latency_s", elapsed)
+        return model, instructions, reason
+
+    def plan(self, user_task, session_id=None):
+        """Return the first valid plan from either model, or None when both fail"""
+        intent, _ = self.bot.generation_budget.classify(user_task)
+        cancel = threading.Event()
+        start = time.perf_counter()
+        pending = {self._pool.submit(self.attempt, self.fast_model, user_task, session_id,
+                                     intent, cancel, False)}
+        hedge_after = self.hedge_after(self.fast_model, intent)
+        hedged = False
+
+        while pending:
+            timeout = None if hedged else max(0.0, hedge_after - (time.perf_counter() - start))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                model, instructions, reason = future.result()
+                if instructions is not None:
+                    cancel.set()
+                    metrics.incr(f"router.wins.{model}")
+                    metrics.observe("router.plan_s", time.perf_counter() - start)
+                    print(f"🏁 Plan from {model}" + (" (hedged)" if hedged else ""))
+                    return instructions
+                metrics.incr(f"router.{reason}.{model}")
+            if not hedged:
+                hedged = True
+                metrics.incr("router.hedges")
+                metrics.incr(f"router.hedge_reason.{'timeout' if pending else 'failed'}")
+                print(f"🔀 Hedging to {self.strong_model}")
+                pending.add(self._pool.submit(self.attempt, self.strong_model, user_task, session_id,
+                                              intent, cancel, True))
+
+        metrics.incr("router.failures")
+        return None
+
+    def thresholds(self):
+        """Learned hedge delays and success rates per (model, intent)"""
+        with self._lock:
+            keys = list(self._stats)
+        result = []
+        for model, intent in keys:
+            stats = self.stats(model, intent)
+            result.append({
+                "model": model,
+                "intent": intent,
+                "samples": len(stats.outcomes),
+                "success_rate": stats.success_rate(),
+                "hedge_after_s": self.hedge_after(model, intent)
+            })
+        return result
@@ -0,0 +1,339 @@
+# ollama_stub.py - Local stand-in for the Ollama HTTP API: simulated, replayed or recording
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from intent_engine import IntentEngine
+from plan_cache import normalize_task
+
+NANOSECONDS = 1e9
+_TASK_RE = re.compile(r'convert this task: "(.*?)"', re.IGNORECASE | re.DOTALL)
+_PIECE_RE = re.compile(r"\s*\S{1,4}")
+
+INVALID_PLAN = '[{"action": "FLY_TO_MOON", "params": {}}]'
+
+
+class ModelProfile:
+    """How a simulated model behaves: load time, prompt/decode speed and bad-plan rate"""
+    def __init__(self, tokens_per_s=50.0, load_s=0.0, prompt_tokens_per_s=500.0, invalid_rate=0.0):
+        self.tokens_per_s = tokens_per_s
+        self.load_s = load_s
+        self.prompt_tokens_per_s = prompt_tokens_per_s
+        self.invalid_rate = invalid_rate
+
+    @classmethod
+    def parse(cls, spec):
+        """Parse 'TOKENS_PER_S[,LOAD_S[,INVALID_RATE]]'"""
+        values = [float(v) for v in spec.split(",")]
+        return cls(*values[:2], invalid_rate=values[2] if len(values) > 2 else 0.0)
+
+
+_ENGINE = IntentEngine()
+
+
+def rule_based_response(task):
+    """Default responder: the rule-based plan, or a Google search for unrecognized tasks"""
+    plan, _ = _ENGINE.plan(task)
+    if plan is None:
+        plan = [{"action": "WEB_SEARCH", "params": {"site": "google", "query": task, "auto_play": False}}]
+    return json.dumps(plan)
+
+
+TIMING_FIELDS = ("total_duration", "load_duration", "prompt_eval_count", "prompt_eval_duration",
+                 "eval_count", "eval_duration")
+
+
+def load_recording(path):
+    """Read recorded responses into {(model, normalized task): record}"""
+    recording = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                recording[(record["model"], normalize_task(record["task"]))] = record
+    return recording
+
+
+def extract_task(payload, chat):
+    """The task a planning request is about, and the full prompt text"""
+    if chat:
+        prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+    else:
+        prompt = payload.get("prompt", "")
+    match = _TASK_RE.search(prompt)
+    return (match.group(1) if match else prompt.strip()), prompt
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, as Ollama's clients do once the plan is complete
+            self.server.stub.cancelled += 1
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != "/api/tags":
+            return self.send_json(404, {"error": "not found"})
+        stub = self.server.stub
+        if stub.upstream:
+            upstream = requests.get(stub.upstream + self.path, timeout=10)
+            return self.send_json(upstream.status_code, upstream.json())
+        models = [{"name": name} for name in stub.models()]
+        self.send_json(200, {"models": models})
+
+    def do_POST(self):
+        if self.path not in ("/api/generate", "/api/chat"):
+            return self.send_json(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        stub = self.server.stub
+        stub.requests.append((self.path, payload))
+        chat = self.path == "/api/chat"
+        if stub.upstream:
+            return self.proxy(payload, chat)
+        reply = stub.reply(payload, chat)
+        if reply is None:
+            return self.send_json(404, {"error": f"model '{payload.get('model')}' not found"})
+        if payload.get("stream", True):
+            self.stream(reply, chat)
+        else:
+            stub.sleep(reply.first_token_s + reply.token_s * len(reply.pieces))
+            self.send_json(200, reply.final(reply.text, chat))
+
+    def stream(self, reply, chat):
+        sleep = self.server.stub.sleep
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sleep(reply.first_token_s)
+        for piece in reply.pieces:
+            self.write_chunk(reply.chunk(piece, chat))
+            sleep(reply.token_s)
+        self.write_chunk(reply.final("", chat))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def proxy(self, payload, chat):
+        """Relay a request to a real Ollama and record its text and timings"""
+        stub = self.server.stub
+        task, _ = extract_task(payload, chat)
+        upstream = requests.post(stub.upstream + self.path, json=payload, stream=True, timeout=600)
+        parts = []
+        self.send_response(upstream.status_code)
+        self.send_header("Content-Type", upstream.headers.get("Content-Type", "application/x-ndjson"))
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        client_gone = False
+        try:
+            for line in upstream.iter_lines():
+                if not line:
+                    continue
+                body = json.loads(line)
+                parts.append(body.get("message", {}).get("content", "") if chat else body.get("response", ""))
+                if body.get("done"):
+                    stub.record(payload.get("model"), task, "".join(parts), body)
+                if client_gone:
+                    continue
+                try:
+                    self.write_chunk(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The bot stops reading once the plan is complete; keep going to record the timings
+                    client_gone = True
+            if not client_gone:
+                self.wfile.write(b"0\r\n\r\n")
+        finally:
+            upstream.close()
+
+    def write_chunk(self, body):
+        line = (json.dumps(body) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+class _Reply:
+    """One generation to serve: text, token pieces and timings"""
+    def __init__(self, model, text, load_s, prompt_tokens, prompt_eval_s, eval_s):
+        self.model = model
+        self.text = text
+        self.pieces = _PIECE_RE.findall(text)
+        self.prompt_tokens = prompt_tokens
+        self.load_s = load_s
+        self.prompt_eval_s = prompt_eval_s
+        self.token_s = eval_s / max(1, len(self.pieces))
+        self.first_token_s = load_s + prompt_eval_s
+
+    @classmethod
+    def simulated(cls, model, text, profile, prompt_tokens, load_s):
+        eval_s = len(_PIECE_RE.findall(text)) / profile.tokens_per_s
+        return cls(model, text, load_s, prompt_tokens, prompt_tokens / profile.prompt_tokens_per_s, eval_s)
+
+    @classmethod
+    def replayed(cls, record):
+        """Serve a recorded response with the durations Ollama reported for it"""
+        return cls(record["model"], record["response"], record.get("load_duration", 0) / NANOSECONDS,
+                   record.get("prompt_eval_count", 0), record.get("prompt_eval_duration", 0) / NANOSECONDS,
+                   record.get("eval_duration", 0) / NANOSECONDS)
+
+    def chunk(self, text, chat):
+        body = {"model": self.model, "done": False}
+        if chat:
+            body["message"] = {"role": "assistant", "content": text}
+        else:
+            body["response"] = text
+        return body
+
+    def final(self, text, chat):
+        body = self.chunk(text, chat)
+        eval_s = self.token_s * len(self.pieces)
+        body.update({
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((self.first_token_s + eval_s) * NANOSECONDS),
+            "load_duration": int(self.load_s * NANOSECONDS),
+            "prompt_eval_count": self.prompt_tokens,
+            "prompt_eval_duration": int(self.prompt_eval_s * NANOSECONDS),
+            "eval_count": len(self.pieces),
+            "eval_duration": int(eval_s * NANOSECONDS)
+        })
+        return body
+
+
+class OllamaStub:
+    """Serves /api/tags, /api/generate and /api/chat like Ollama, without a model
+
+    Tasks found in `recording` are answered with the recorded text and timings;
+    others get responder(task) (by default the rule-based plan) at the speed of
+    the model's profile. Each simulated model pays its load_s on first use, like
+    a cold Ollama model. zero_latency serves everything without sleeping but
+    still reports the timings. With `upstream` the stub is a recording proxy in
+    front of a real Ollama instead, appending each response to record_path.
+    """
+    def __init__(self, profiles=None, responder=rule_based_response, host="127.0.0.1", port=0, seed=0,
+                 recording=None, zero_latency=False, upstream=None, record_path=None):
+        self.profiles = dict(profiles or {})
+        self.responder = responder
+        self.recording = recording or {}
+        self.zero_latency = zero_latency
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.record_path = record_path
+        self.requests = []
+        self.cancelled = 0
+        self.replay_hits = 0
+        self.replay_misses = 0
+        self._loaded = set()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def models(self):
+        return sorted(set(self.profiles) | {model for model, _ in self.recording})
+
+    def sleep(self, seconds):
+        if not self.zero_latency and seconds > 0:
+            time.sleep(seconds)
+
+    def reply(self, payload, chat):
+        """The reply for a request, or None for an unknown model"""
+        task, prompt = extract_task(payload, chat)
+        model = payload.get("model")
+        record = self.recording.get((model, normalize_task(task)))
+        if record is not None:
+            with self._lock:
+                self.replay_hits += 1
+            return _Reply.replayed(record)
+
+        profile = self.profiles.get(model)
+        if profile is None:
+            if model not in self.models():
+                return None
+            profile = ModelProfile()
+        with self._lock:
+            self.replay_misses += bool(self.recording)
+            load_s = 0.0 if model in self._loaded else profile.load_s
+            self._loaded.add(model)
+            invalid = self._random.random() < profile.invalid_rate
+        text = INVALID_PLAN if invalid else self.responder(task)
+        return _Reply.simulated(model, text, profile, len(prompt.split()), load_s)
+
+    def record(self, model, task, response, final):
+        """Append one proxied response and its Ollama timings to record_path"""
+        record = {"model": model, "task": task, "response": response}
+        record.update({field: final[field] for field in TIMING_FIELDS if field in final})
+        with self._lock:
+            self.recording[(model, normalize_task(task))] = record
+            if self.record_path:
+                with open(self.record_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="ollama-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated Ollama server for offline runs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", action="append", default=[], metavar="NAME=TOKENS_PER_S[,LOAD_S[,INVALID_RATE]]",
+                        help="simulated model, e.g. llama3.2:1b=120,0.5,0.2 (repeatable)")
+    parser.add_argument("--replay", help="JSONL of recorded responses to serve with their timings")
+    parser.add_argument("--zero-latency", action="store_true", help="never sleep, only report timings")
+    parser.add_argument("--record", help="proxy to --upstream and append its responses to this JSONL")
+    parser.add_argument("--upstream", default="http://localhost:11434")
+    args = parser.parse_args()
+
+    if args.record:
+        stub = OllamaStub(host=args.host, port=args.port, upstream=args.upstream, record_path=args.record)
+        print(f"🔴 Recording {args.upstream} into {args.record} via {stub.url}")
+    else:
+        specs = args.model or ([] if args.replay else ["llama2=25,3"])
+        profiles = {}
+        for spec in specs:
+            name, _, values = spec.partition("=")
+            profiles[name] = ModelProfile.parse(values or "50")
+        recording = load_recording(args.replay) if args.replay else None
+        stub = OllamaStub(profiles, host=args.host, port=args.port, recording=recording,
+                          zero_latency=args.zero_latency)
+        print(f"🧪 Ollama stub serving {', '.join(stub.models())} on {stub.url}"
+              + (f" ({len(stub.recording)} recorded responses)" if recording else ""))
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
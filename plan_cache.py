@@ -0,0 +1,140 @@
+# plan_cache.py - Two-tier (memory LRU + SQLite) cache of generated RPA plans
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_task(user_task):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return _WHITESPACE_RE.sub(" ", user_task.lower()).strip().rstrip(".!?")
+
+
+def make_cache_key(model_name, prompt_version, user_task):
+    raw = json.dumps([model_name, prompt_version, normalize_task(user_task)])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """LRU memory tier in front of a persistent SQLite tier, both with TTL"""
+    def __init__(self, db_path="plan_cache.db", max_memory_entries=512,
+                 max_disk_entries=10000, ttl=7 * 24 * 3600):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.setup_db()
+
+    def setup_db(self):
+        if not self.db_path:
+            return
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                "key TEXT PRIMARY KEY, task TEXT, plan TEXT, "
+                "created_at REAL, last_used REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans(last_used)")
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Plan cache disk tier disabled: {e}")
+            self._db = None
+
+    def get(self, key):
+        """Return a fresh copy of the cached plan, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                plan_json, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    metrics.incr("plan_cache.memory_hits")
+                    return json.loads(plan_json)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT plan, created_at FROM plans WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    plan_json, created_at = row
+                    if now - created_at <= self.ttl:
+                        self._db.execute("UPDATE plans SET last_used = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, plan_json, created_at)
+                        metrics.incr("plan_cache.disk_hits")
+                        return json.loads(plan_json)
+                    self._db.execute("DELETE FROM plans WHERE key = ?", (key,))
+                    self._db.commit()
+
+        metrics.incr("plan_cache.misses")
+        return None
+
+    def put(self, key, user_task, plan):
+        plan_json = json.dumps(plan)
+        now = time.time()
+        with self._lock:
+            self._remember(key, plan_json, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO plans (key, task, plan, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, normalize_task(user_task), plan_json, now, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+        metrics.incr("plan_cache.stores")
+
+    def _remember(self, key, plan_json, created_at):
+        self._memory[key] = (plan_json, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            metrics.incr("plan_cache.memory_evictions")
+
+    def _evict_disk(self, now):
+        self._db.execute("DELETE FROM plans WHERE created_at < ?", (now - self.ttl,))
+        count = self._db.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+        if count > self.max_disk_entries:
+            self._db.execute(
+                "DELETE FROM plans WHERE key IN "
+                "(SELECT key FROM plans ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+            metrics.incr("plan_cache.disk_evictions", count - self.max_disk_entries)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM plans")
+                self._db.commit()
+
+    def stats(self):
+        memory_hits = metrics.counter("plan_cache.memory_hits")
+        disk_hits = metrics.counter("plan_cache.disk_hits")
+        misses = metrics.counter("plan_cache.misses")
+        lookups = memory_hits + disk_hits + misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": memory_hits,
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "hit_ratio": (memory_hits + disk_hits) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,381 @@
+# plan_optimizer.py - Rewrites instruction lists to drop redundant work before execution
+import copy
+import json
+from urllib.parse import urlparse
+
+from intent_engine import APP_ALIASES
+
+# Fixed pause the executors insert after every step
+STEP_PAUSE_S = 0.5
+
+LAUNCH_ACTIONS = ("OPEN_APP", "OPEN_URL")
+
+# Hosts that a WEB_SEARCH on a site makes redundant to open first
+SEARCH_SITE_HOSTS = {
+    "youtube": ("youtube.com", "www.youtube.com", "m.youtube.com"),
+    "google": ("google.com", "www.google.com")
+}
+
+
+def _number(params, key, default):
+    """A numeric param, default when it is missing, None when it is not a number"""
+    value = params.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+def _seconds(params, key, default):
+    """A duration param for estimates; malformed values count as no time"""
+    value = params.get(key, default)
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def estimate_step_s(step):
+    """Nominal duration of one step, following the executors' fixed sleeps"""
+    action = _action(step)
+    params = _params_of(step)
+    if action == "WAIT":
+        return _seconds(params, "seconds", 1)
+    if action in LAUNCH_ACTIONS and params.get("defer_ready"):
+        # Waited for by a later WAIT_READY
+        return 0.0
+    if action == "OPEN_APP":
+        return _seconds(params, "wait_time", 3)
+    if action == "OPEN_URL":
+        return _seconds(params, "wait_time", 4)
+    if action == "WAIT_READY":
+        return _seconds(params, "wait_time", 0)
+    if action == "TYPE":
+        return 0.5 + len(str(params.get("text") or "")) * _seconds(params, "interval", 0.05)
+    if action == "WEB_SEARCH":
+        if str(params.get("site", "google")).lower() == "youtube":
+            return 6.0 + (5.0 if params.get("auto_play") else 0.0)
+        return 5.0
+    if action == "SCREENSHOT":
+        return 1.0
+    return 0.0
+
+
+def pause_after(step, next_step):
+    """Pause to insert after a step; none at the end or next to an explicit WAIT"""
+    if next_step is None:
+        return 0.0
+    if _action(step) == "WAIT" or _action(next_step) == "WAIT":
+        return 0.0
+    return STEP_PAUSE_S
+
+
+def estimate_plan_s(plan):
+    total = 0.0
+    for i, step in enumerate(plan):
+        next_step = plan[i + 1] if i + 1 < len(plan) else None
+        total += estimate_step_s(step) + pause_after(step, next_step)
+    return total
+
+
+def _wait(seconds):
+    return {"action": "WAIT", "params": {"seconds": seconds}}
+
+
+def _action(step):
+    return step.get("action") if isinstance(step, dict) else None
+
+
+def _params_of(step):
+    """A step's params for reading; {} when they are missing or malformed"""
+    params = step.get("params") if isinstance(step, dict) else None
+    return params if isinstance(params, dict) else {}
+
+
+def _rewritable(step):
+    """Whether a rule may change a step; malformed ones are left as they are"""
+    return isinstance(step, dict) and isinstance(step.get("params", {}), dict)
+
+
+def _params(step):
+    return step.setdefault("params", {})
+
+
+def drop_dead_steps(plan):
+    """Remove steps that do nothing: zero waits, empty text, queries, URLs or key lists"""
+    result = []
+    for step in plan:
+        if not _rewritable(step):
+            result.append(step)
+            continue
+        action, params = _action(step), _params_of(step)
+        seconds = _number(params, "seconds", 1)
+        dead = ((action == "WAIT" and seconds is not None and seconds <= 0)
+                or (action == "TYPE" and not params.get("text"))
+                or (action == "WEB_SEARCH" and not params.get("query"))
+                or (action == "OPEN_URL" and not params.get("url"))
+                or (action == "PRESS_KEY" and not params.get("key"))
+                or (action == "HOTKEY" and not params.get("keys"))
+                or (action == "SCROLL" and params.get("clicks", 3) == 0))
+        if not dead:
+            result.append(step)
+    return result
+
+
+def merge_waits(plan):
+    """Collapse consecutive WAIT steps into one"""
+    result = []
+    for step in plan:
+        if (_action(step) == "WAIT" and result and _action(result[-1]) == "WAIT"
+                and _rewritable(step) and _rewritable(result[-1])):
+            previous = _params(result[-1])
+            first, second = _number(previous, "seconds", 1), _number(_params_of(step), "seconds", 1)
+            if first is not None and second is not None:
+                previous["seconds"] = first + second
+                continue
+        result.append(step)
+    return result
+
+
+def drop_duplicate_launches(plan):
+    """Open each app only once per plan; a second OPEN_APP would find it running"""
+    opened = set()
+    result = []
+    for step in plan:
+        if _action(step) == "OPEN_APP":
+            app = str(_params_of(step).get("app", "")).lower()
+            app = APP_ALIASES.get(app, app)
+            if app in opened:
+                continue
+            opened.add(app)
+        result.append(step)
+    return result
+
+
+def _url_site(url):
+    url = str(url)
+    host = urlparse(url if "://" in url else "https://" + url).netloc.lower()
+    for site, hosts in SEARCH_SITE_HOSTS.items():
+        if host in hosts:
+            return site
+    return None
+
+
+def drop_open_before_search(plan):
+    """OPEN_URL of a search site right before a WEB_SEARCH there only costs its wait
+
+    WEB_SEARCH navigates to the site itself; WAITs between the two go too.
+    """
+    result = []
+    i = 0
+    while i < len(plan):
+        step = plan[i]
+        if _action(step) == "OPEN_URL":
+            j = i + 1
+            while j < len(plan) and _action(plan[j]) == "WAIT":
+                j += 1
+            if (j < len(plan) and _action(plan[j]) == "WEB_SEARCH"
+                    and _url_site(_params_of(step).get("url", ""))
+                    == str(_params_of(plan[j]).get("site", "")).lower()):
+                i = j
+                continue
+        result.append(step)
+        i += 1
+    return result
+
+
+def coalesce_typing(plan):
+    """Join consecutive TYPE steps with the same interval into one"""
+    result = []
+    for step in plan:
+        if (_action(step) == "TYPE" and result and _action(result[-1]) == "TYPE"
+                and _rewritable(step) and _rewritable(result[-1])
+                and isinstance(_params_of(result[-1]).get("text", ""), str)
+                and isinstance(_params_of(step).get("text", ""), str)
+                and _params_of(result[-1]).get("interval", 0.05) == _params_of(step).get("interval", 0.05)):
+            previous = _params(result[-1])
+            previous["text"] = previous.get("text", "") + _params_of(step).get("text", "")
+            continue
+        result.append(step)
+    return result
+
+
+def _overlappable(step):
+    """A launch whose wait_time is a number, so its deadline can be deferred"""
+    return (_action(step) in LAUNCH_ACTIONS and _rewritable(step)
+            and _number(_params_of(step), "wait_time", 0) is not None)
+
+
+def overlap_launches(plan):
+    """Launch a run of apps/URLs back to back and wait once for all of them to be ready
+
+    A run only spans launches and the explicit WAITs between them, which are
+    kept where the plan put them; any other step may need a launched window
+    focused, so the run ends before it. Every launch keeps its wait_time as
+    its readiness deadline but defers the wait (defer_ready), and one
+    WAIT_READY in front of the next step waits for all of them, so the run
+    takes as long as its slowest start-up instead of the sum.
+    """
+    result = []
+    i = 0
+    while i < len(plan):
+        if not _overlappable(plan[i]):
+            result.append(plan[i])
+            i += 1
+            continue
+        # Seconds from the first launch: spent in kept WAITs, and until every launch is ready
+        run, launches, elapsed, ready_at = [], 0, 0.0, 0.0
+        j = i
+        while j < len(plan):
+            if _overlappable(plan[j]):
+                run.append(plan[j])
+                launches += 1
+                ready_at = max(ready_at, elapsed + estimate_step_s(plan[j]))
+                j += 1
+                continue
+            if _action(plan[j]) == "WAIT":
+                k = j
+                while k < len(plan) and _action(plan[k]) == "WAIT":
+                    k += 1
+                if k < len(plan) and _overlappable(plan[k]):
+                    run.extend(plan[j:k])
+                    elapsed += sum(estimate_step_s(step) for step in plan[j:k])
+                    j = k
+                    continue
+            break
+        if launches > 1:
+            for step in run:
+                if _overlappable(step):
+                    _params(step)["defer_ready"] = True
+            result.extend(run)
+            result.append({"action": "WAIT_READY", "params": {"wait_time": max(0.0, ready_at - elapsed)}})
+        else:
+            result.extend(run)
+        i = j
+    return result
+
+
+DEFAULT_RULES = [
+    ("drop_dead_steps", drop_dead_steps),
+    ("drop_open_before_search", drop_open_before_search),
+    ("drop_duplicate_launches", drop_duplicate_launches),
+    ("overlap_launches", overlap_launches),
+    ("merge_waits", merge_waits),
+    ("coalesce_typing", coalesce_typing),
+]
+
+
+class PlanOptimizer:
+    """Applies rewrite rules in order and reports which fired and the time they save"""
+    def __init__(self, rules=None):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+
+    def optimize(self, plan):
+        """Return (optimized plan, report); the input plan is not modified
+
+        Rules leave malformed steps alone so they still fail on their own when
+        run; should a rule raise anyway, the original plan is returned unchanged.
+        """
+        try:
+            before = estimate_plan_s(plan)
+            optimized = copy.deepcopy(plan)
+            applied = []
+            for name, rule in self.rules:
+                rewritten = rule(copy.deepcopy(optimized))
+                if rewritten != optimized:
+                    applied.append(name)
+                optimized = rewritten
+            after = estimate_plan_s(optimized)
+        except Exception as e:
+            print(f"⚠️  Plan optimizer skipped: {e}")
+            before = after = 0.0
+            optimized, applied = copy.deepcopy(plan), []
+        return optimized, {
+            "rules": applied,
+            "steps_before": len(plan),
+            "steps_after": len(optimized),
+            "estimated_before_s": before,
+            "estimated_after_s": after,
+            "estimated_saved_s": before - after
+        }
+
+
+def _open(app, wait_time=3):
+    return {"action": "OPEN_APP", "params": {"app": app, "wait_time": wait_time}}
+
+
+def _type(text):
+    return {"action": "TYPE", "params": {"text": text, "interval": 0.05}}
+
+
+# (name, rule, input plan, expected output); checked by running this module
+GOLDEN_CASES = [
+    ("stacked waits merge", merge_waits,
+     [_wait(1), _wait(2), _type("a"), _wait(1)],
+     [_wait(3), _type("a"), _wait(1)]),
+    ("dead steps dropped", drop_dead_steps,
+     [_wait(0), _type(""), {"action": "HOTKEY", "params": {"keys": []}}, _type("x")],
+     [_type("x")]),
+    ("open url before same-site search dropped", drop_open_before_search,
+     [{"action": "OPEN_URL", "params": {"url": "https://www.youtube.com", "wait_time": 4}}, _wait(2),
+      {"action": "WEB_SEARCH", "params": {"site": "youtube", "query": "q", "auto_play": True}}],
+     [{"action": "WEB_SEARCH", "params": {"site": "youtube", "query": "q", "auto_play": True}}]),
+    ("open url before other-site search kept", drop_open_before_search,
+     [{"action": "OPEN_URL", "params": {"url": "https://github.com", "wait_time": 4}},
+      {"action": "WEB_SEARCH", "params": {"site": "google", "query": "q"}}],
+     [{"action": "OPEN_URL", "params": {"url": "https://github.com", "wait_time": 4}},
+      {"action": "WEB_SEARCH", "params": {"site": "google", "query": "q"}}]),
+    ("repeated app launch dropped", drop_duplicate_launches,
+     [_open("calc"), _type("1+1"), _open("calculator")],
+     [_open("calc"), _type("1+1")]),
+    ("typing coalesced", coalesce_typing,
+     [_type("hello "), _type("world"), {"action": "PRESS_KEY", "params": {"key": "enter"}}, _type("!")],
+     [_type("hello world"), {"action": "PRESS_KEY", "params": {"key": "enter"}}, _type("!")]),
+    ("launch waits overlap", overlap_launches,
+     [_open("calc", 3), _wait(2), {"action": "OPEN_URL", "params": {"url": "https://google.com", "wait_time": 4}},
+      _type("x")],
+     [{"action": "OPEN_APP", "params": {"app": "calc", "wait_time": 3, "defer_ready": True}}, _wait(2),
+      {"action": "OPEN_URL", "params": {"url": "https://google.com", "wait_time": 4, "defer_ready": True}},
+      {"action": "WAIT_READY", "params": {"wait_time": 4.0}}, _type("x")]),
+    ("launch then typing untouched", overlap_launches,
+     [_open("notepad", 3), _type("x")],
+     [_open("notepad", 3), _type("x")]),
+    ("launch, wait, typing untouched", overlap_launches,
+     [_open("notepad", 3), _wait(1), _type("x")],
+     [_open("notepad", 3), _wait(1), _type("x")]),
+    ("readiness awaited before a trailing wait and input", overlap_launches,
+     [_open("calc", 3), _open("notepad", 3), _wait(1), {"action": "PRESS_KEY", "params": {"key": "enter"}}],
+     [{"action": "OPEN_APP", "params": {"app": "calc", "wait_time": 3, "defer_ready": True}},
+      {"action": "OPEN_APP", "params": {"app": "notepad", "wait_time": 3, "defer_ready": True}},
+      {"action": "WAIT_READY", "params": {"wait_time": 3.0}}, _wait(1),
+      {"action": "PRESS_KEY", "params": {"key": "enter"}}]),
+    ("input between launches ends the run", overlap_launches,
+     [_open("calc", 3), _type("1+1"), _open("notepad", 3)],
+     [_open("calc", 3), _type("1+1"), _open("notepad", 3)]),
+    ("malformed waits kept", merge_waits,
+     [_wait("2"), _wait(1), {"action": "WAIT", "params": None}, _wait(1)],
+     [_wait("2"), _wait(1), {"action": "WAIT", "params": None}, _wait(1)]),
+    ("malformed steps not dropped", drop_dead_steps,
+     [_wait("0"), {"action": "TYPE", "params": None}, _wait(0)],
+     [_wait("0"), {"action": "TYPE", "params": None}]),
+    ("launch with bad wait_time not overlapped", overlap_launches,
+     [_open("calc", "slow"), _open("notepad", 3), _open("paint", 3)],
+     [_open("calc", "slow"), {"action": "OPEN_APP", "params": {"app": "notepad", "wait_time": 3, "defer_ready": True}},
+      {"action": "OPEN_APP", "params": {"app": "paint", "wait_time": 3, "defer_ready": True}},
+      {"action": "WAIT_READY", "params": {"wait_time": 3.0}}]),
+]
+
+
+def check_golden_cases():
+    failures = 0
+    for name, rule, plan, expected in GOLDEN_CASES:
+        actual = rule(copy.deepcopy(plan))
+        if actual != expected:
+            failures += 1
+            print(f"❌ {name}\n   expected {json.dumps(expected)}\n   got      {json.dumps(actual)}")
+        else:
+            print(f"✅ {name}")
+    return failures
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if check_golden_cases() else 0)
@@ -0,0 +1,242 @@
+# plan_scheduler.py - Runs independent plan steps concurrently along a resource dependency DAG
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from action_registry import ACTIONS
+from metrics import metrics
+from plan_optimizer import estimate_step_s
+
+# Steps every earlier step must finish before, and every later step waits for
+BARRIER_ACTIONS = ("WAIT",)
+
+
+def build_dag(plan, registry=ACTIONS):
+    """Earlier steps each step depends on, as a list of sets of indices
+
+    Desktop steps run in plan order, and after any browser step before them
+    since keyboard focus may be in that browser. Browser steps open or raise a
+    browser window, so they also wait for the last desktop step (and the last
+    barrier); they only run alongside each other, each with its own browser.
+    Unknown actions are treated as desktop steps.
+    """
+    deps = []
+    barrier = None
+    since_barrier = []
+    last_desktop = None
+    browsers_since_desktop = []
+    for i, step in enumerate(plan):
+        action = step.get("action")
+        spec = registry.get(action)
+        resource = spec.resource if spec else "desktop"
+        if action in BARRIER_ACTIONS:
+            required = set(since_barrier) if since_barrier else ({barrier} if barrier is not None else set())
+            barrier, since_barrier, last_desktop, browsers_since_desktop = i, [], None, []
+            deps.append(required)
+            continue
+
+        required = {barrier} if barrier is not None else set()
+        if resource == "desktop":
+            if last_desktop is not None:
+                required.add(last_desktop)
+            required.update(browsers_since_desktop)
+            last_desktop, browsers_since_desktop = i, []
+        elif resource == "browser":
+            # A new or raised window would take focus from desktop input
+            if last_desktop is not None:
+                required.add(last_desktop)
+            browsers_since_desktop.append(i)
+        since_barrier.append(i)
+        deps.append(required)
+    return deps
+
+
+def critical_path_s(plan, deps, durations=None):
+    """Length of the longest dependency chain, from estimates or measured durations"""
+    finish = []
+    for i, step in enumerate(plan):
+        duration = durations[i] if durations is not None else estimate_step_s(step)
+        finish.append(max((finish[d] for d in deps[i]), default=0.0) + duration)
+    return max(finish, default=0.0)
+
+
+class BrowserLanes:
+    """The executor's browser plus up to max_browsers - 1 more, handed out one step at a time"""
+    def __init__(self, primary, max_browsers):
+        self.primary = primary
+        self.max_browsers = max(1, max_browsers)
+        self.extra = []
+        self._free = queue.Queue()
+        self._free.put(primary)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if 1 + len(self.extra) < self.max_browsers:
+                lane = self.primary.spawn()
+                self.extra.append(lane)
+                return lane
+        return self._free.get()
+
+    def release(self, lane):
+        self._free.put(lane)
+
+    def close(self):
+        """Close the extra browsers; the primary one belongs to the executor"""
+        with self._lock:
+            extra, self.extra = self.extra, []
+        for lane in extra:
+            lane.close()
+        self._free = queue.Queue()
+        self._free.put(self.primary)
+
+
+class PlanScheduler:
+    """Runs a plan's steps on a worker pool as soon as the steps they depend on finish
+
+    Returns a report with the wall time, the summed step time and the speedup
+    between them, next to the estimated sequential and critical-path times.
+    """
+    def __init__(self, max_workers=4, max_browsers=3, registry=ACTIONS):
+        self.max_workers = max_workers
+        self.max_browsers = max_browsers
+        self.registry = registry
+        self.lanes = None
+
+    def estimate(self, plan):
+        """(estimated sequential seconds, estimated seconds along the critical path)"""
+        deps = build_dag(plan, self.registry)
+        return sum(estimate_step_s(step) for step in plan), critical_path_s(plan, deps)
+
+    def worthwhile(self, plan):
+        """Whether running the plan concurrently is expected to save any time"""
+        sequential, parallel = self.estimate(plan)
+        return self.max_workers > 1 and parallel < sequential
+
+    def run(self, executor, plan):
+        deps = build_dag(plan, self.registry)
+        if self.lanes is None or self.lanes.primary is not executor.web_automator:
+            self.lanes = BrowserLanes(executor.web_automator, self.max_browsers)
+        durations = [0.0] * len(plan)
+        finished = [None] * len(plan)
+        failed = []
+        dependents = [[] for _ in plan]
+        for i, required in enumerate(deps):
+            for d in required:
+                dependents[d].append(i)
+        waiting = [len(required) for required in deps]
+
+        clock = executor.clock
+        start = clock.now()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan-step") as pool:
+            running = {pool.submit(self._run_step, executor, plan, i, start): i
+                       for i in range(len(plan)) if not waiting[i]}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    step_start, finished[i], error = future.result()
+                    durations[i] = finished[i] - step_start
+                    if error is not None:
+                        executor.log(f"❌ Error in step {i+1}: {error}", "error")
+                        failed.append(i)
+                    # Later steps still run after a failure, as in sequential execution
+                    for j in dependents[i]:
+                        waiting[j] -= 1
+                        if not waiting[j]:
+                            # A step starts once the last step it depends on finished
+                            ready_at = max(finished[d] for d in deps[j])
+                            running[pool.submit(self._run_step, executor, plan, j, ready_at)] = j
+        end = max((t for t in finished if t is not None), default=start)
+        # On a virtual clock each step has its own timeline; the plan continues after the last one
+        clock.branch(end)
+        wall = end - start
+
+        estimated_sequential, estimated_parallel = self.estimate(plan)
+        busy = sum(durations)
+        report = {
+            "wall_s": wall,
+            "busy_s": busy,
+            "speedup": busy / wall if wall > 0 else 1.0,
+            "critical_path_s": critical_path_s(plan, deps, durations),
+            "estimated_sequential_s": estimated_sequential,
+            "estimated_parallel_s": estimated_parallel,
+            "browsers": 1 + len(self.lanes.extra),
+            "failed_steps": sorted(failed),
+            "step_s": durations
+        }
+        metrics.observe("scheduler.speedup", report["speedup"])
+        executor.log(f"⚡ Ran {len(plan)} steps in {wall:.2f}s ({busy:.2f}s of work, "
+                     f"{report['speedup']:.1f}x, {report['browsers']} browser(s))")
+        return report
+
+    def _run_step(self, executor, plan, i, ready_at):
+        """Run one step; returns its start and end time on the executor's clock, and any error"""
+        instruction = plan[i]
+        spec = self.registry.get(instruction.get("action"))
+        executor.clock.branch(ready_at)
+        start = executor.clock.now()
+        error = None
+        try:
+            executor.log(f"🔄 Step {i+1}/{len(plan)}: {instruction.get('action')} "
+                         f"{instruction.get('params', {})}")
+            if spec is not None and spec.resource == "browser":
+                lane = self.lanes.acquire()
+                try:
+                    if not lane.setup_driver():
+                        raise RuntimeError("browser automation unavailable")
+                    with executor.browser_lane(lane):
+                        executor.execute_step(instruction)
+                finally:
+                    self.lanes.release(lane)
+            else:
+                executor.execute_step(instruction)
+                if spec is not None and spec.resource == "desktop":
+                    next_instruction = plan[i + 1] if i + 1 < len(plan) else None
+                    executor.settle_after(instruction, next_instruction)
+        except Exception as e:
+            error = e
+        return start, executor.clock.now(), error
+
+    def close(self):
+        if self.lanes is not None:
+            self.lanes.close()
+
+
+def check_virtual_timing():
+    """Three 11s YouTube searches run side by side on the virtual clock take 11s, not 33s"""
+    from contextlib import redirect_stdout
+    import io
+    from clock import VirtualClock
+    from main import RPAExecutor
+
+    executor = RPAExecutor(backend="simulated", clock=VirtualClock())
+    plan = [{"action": "WEB_SEARCH", "params": {"site": "youtube", "query": query, "auto_play": True}}
+            for query in ("despacito", "thriller", "hey jude")]
+    with redirect_stdout(io.StringIO()):
+        try:
+            report = executor.scheduler.run(executor, plan)
+        finally:
+            executor.close_browsers()
+    checks = [
+        ("each step takes its own 11s", all(abs(s - 11.0) < 0.5 for s in report["step_s"])),
+        ("wall time is the slowest step", abs(report["wall_s"] - 11.0) < 0.5),
+        ("speedup is the number of lanes", abs(report["speedup"] - 3.0) < 0.2),
+        ("the plan continues after the last step", abs(executor.clock.now() - report["wall_s"]) < 0.5),
+    ]
+    failures = 0
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+        failures += not ok
+    if failures:
+        print(f"   report: wall {report['wall_s']:.2f}s, busy {report['busy_s']:.2f}s, "
+              f"speedup {report['speedup']:.2f}x, steps {report['step_s']}")
+    return failures
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if check_virtual_timing() else 0)
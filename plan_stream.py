@@ -0,0 +1,90 @@
+# plan_stream.py - Incremental parsing of streamed LLM plans
+import json
+import queue
+import threading
+
+
+class IncrementalPlanParser:
+    """Parses a JSON array of instructions as text arrives, one object at a time"""
+    def __init__(self):
+        self.buffer = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.closed = False
+        self.object_start = None
+        self.errors = []
+        self._position = 0
+
+    def feed(self, text):
+        """Consume a text fragment and return the instructions it completed"""
+        completed = []
+        if self.closed:
+            return completed
+
+        for char in text:
+            position = self._position
+            self._position += 1
+
+            if not self.started:
+                if char == "[":
+                    self.started = True
+                    self.depth = 1
+                continue
+            self.buffer.append(char)
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in "[{":
+                if char == "{" and self.depth == 1:
+                    self.object_start = len(self.buffer) - 1
+                self.depth += 1
+            elif char in "]}":
+                self.depth -= 1
+                if char == "}" and self.depth == 1 and self.object_start is not None:
+                    raw = "".join(self.buffer[self.object_start:])
+                    self.object_start = None
+                    self.buffer = []
+                    try:
+                        completed.append(json.loads(raw))
+                    except json.JSONDecodeError as e:
+                        self.errors.append(f"object ending at {position}: {e}")
+                elif self.depth == 0:
+                    self.closed = True
+                    break
+        return completed
+
+
+_DONE = object()
+
+
+def prefetch(iterable, maxsize=0):
+    """Drain an iterable on a background thread so producers never wait on consumers"""
+    items = queue.Queue(maxsize)
+
+    def pump():
+        try:
+            for item in iterable:
+                items.put((item, None))
+        except Exception as e:
+            items.put((None, e))
+        items.put((_DONE, None))
+
+    threading.Thread(target=pump, name="plan-prefetch", daemon=True).start()
+    while True:
+        item, error = items.get()
+        if error is not None:
+            raise error
+        if item is _DONE:
+            return
+        yield item
@@ -0,0 +1,215 @@
+# plan_templates.py - Slot-parameterized plan templates learned from LLM plans
+import copy
+import json
+import re
+import threading
+
+from metrics import metrics
+from plan_cache import normalize_task
+
+# Captured slot text containing one of these belongs to more than one clause
+_CLAUSE_SEPARATOR_RE = re.compile(r" (?:and|then|,|&) |, ")
+_WORD_RE = re.compile(r"\w")
+# Params with a closed vocabulary stay literal so "on google" never becomes a slot
+_LITERAL_PARAMS = {"site", "app", "key"}
+
+
+def plan_signature(plan):
+    """Case-insensitive canonical form of a plan used to compare plans"""
+    def lower(value):
+        if isinstance(value, str):
+            return value.lower()
+        if isinstance(value, list):
+            return [lower(v) for v in value]
+        if isinstance(value, dict):
+            return {k: lower(v) for k, v in value.items()}
+        return value
+    return json.dumps(lower(plan), sort_keys=True)
+
+
+class PlanTemplate:
+    """A task pattern such as 'play song {0}' and the plan it expands to"""
+    def __init__(self, skeleton, literals, plan, slot_separators):
+        self.skeleton = skeleton
+        self.plan = plan
+        self.slot_separators = slot_separators
+        self.literal_chars = sum(len(part) for part in literals)
+        self.first_word = literals[0].split(" ", 1)[0] if literals[0] else "*"
+        self.support = 1
+        self.conflicts = 0
+
+        regex = "^" + re.escape(literals[0])
+        for i, literal in enumerate(literals[1:]):
+            regex += f"(?P<s{i}>.+?)" + re.escape(literal)
+        self.pattern = re.compile(regex + "$")
+
+    @property
+    def confidence(self):
+        return self.support / (self.support + self.conflicts + 1.0)
+
+    def match(self, task_norm):
+        """Return the slot values for a normalized task, or None"""
+        m = self.pattern.match(task_norm)
+        if not m:
+            return None
+        slots = m.groups()
+        for value, allow_separators in zip(slots, self.slot_separators):
+            if not value.strip() or (not allow_separators and _CLAUSE_SEPARATOR_RE.search(value)):
+                return None
+        return slots
+
+    def instantiate(self, slots):
+        def fill(value):
+            if isinstance(value, dict):
+                if "$slot" in value and len(value) == 1:
+                    return slots[value["$slot"]].strip()
+                return {k: fill(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [fill(v) for v in value]
+            return value
+        return fill(self.plan)
+
+    def to_dict(self):
+        return {
+            "template": self.skeleton,
+            "plan": self.plan,
+            "support": self.support,
+            "conflicts": self.conflicts,
+            "confidence": round(self.confidence, 3)
+        }
+
+
+class TemplateIndex:
+    """Learns templates from successful plans and instantiates them locally
+
+    A template is only used once min_support LLM plans agreed with it, so a
+    single plan is never trusted on its own.
+    """
+    def __init__(self, min_confidence=0.5, min_support=2, max_templates=500):
+        self.min_confidence = min_confidence
+        self.min_support = min_support
+        self.max_templates = max_templates
+        self._templates = {}
+        self._by_first_word = {}
+        self._lock = threading.Lock()
+
+    def build_template(self, task_norm, plan):
+        """Turn string params that occur verbatim in the task into slots"""
+        spans = []
+        for instruction in plan:
+            for name, value in (instruction.get("params") or {}).items():
+                if name in _LITERAL_PARAMS or not isinstance(value, str) or len(value.strip()) < 2:
+                    continue
+                needle = value.strip().lower()
+                start = task_norm.find(needle)
+                if start != -1:
+                    spans.append((start, start + len(needle), needle))
+        if not spans:
+            return None
+
+        # Keep the earliest, longest non-overlapping occurrences
+        spans.sort(key=lambda span: (span[0], -span[1]))
+        slots = []
+        for span in spans:
+            if slots and span[0] < slots[-1][1]:
+                continue
+            if span[2] not in [s[2] for s in slots]:
+                slots.append(span)
+
+        literals = []
+        position = 0
+        for start, end, _ in slots:
+            literals.append(task_norm[position:start])
+            position = end
+        literals.append(task_norm[position:])
+        if not _WORD_RE.search("".join(literals)):
+            return None
+
+        slot_index = {needle: i for i, (_, _, needle) in enumerate(slots)}
+
+        def parameterize(value, name=None):
+            if name not in _LITERAL_PARAMS and isinstance(value, str) and value.strip().lower() in slot_index:
+                return {"$slot": slot_index[value.strip().lower()]}
+            if isinstance(value, dict):
+                return {k: parameterize(v, k) for k, v in value.items()}
+            if isinstance(value, list):
+                return [parameterize(v) for v in value]
+            return value
+
+        skeleton = literals[0]
+        for i, literal in enumerate(literals[1:]):
+            skeleton += "{" + str(i) + "}" + literal
+        slot_separators = [bool(_CLAUSE_SEPARATOR_RE.search(needle)) for _, _, needle in slots]
+        return PlanTemplate(skeleton, literals, parameterize(copy.deepcopy(plan)), slot_separators)
+
+    def _candidates(self, task_norm):
+        first_word = task_norm.split(" ", 1)[0]
+        return self._by_first_word.get(first_word, []) + self._by_first_word.get("*", [])
+
+    def _best_match(self, task_norm):
+        best = None
+        for template in self._candidates(task_norm):
+            slots = template.match(task_norm)
+            if slots is None:
+                continue
+            rank = (template.confidence, template.literal_chars)
+            if best is None or rank > best[0]:
+                best = (rank, template, slots)
+        return (best[1], best[2]) if best else (None, None)
+
+    def match(self, user_task):
+        """Return (plan, confidence) for the best matching template, or (None, 0.0)"""
+        task_norm = normalize_task(user_task)
+        with self._lock:
+            template, slots = self._best_match(task_norm)
+            if template is None:
+                return None, 0.0
+            if template.support < self.min_support or template.confidence < self.min_confidence:
+                metrics.incr("plan_templates.below_threshold")
+                return None, template.confidence
+            metrics.incr("plan_templates.hits")
+            return template.instantiate(slots), template.confidence
+
+    def learn(self, user_task, plan):
+        """Record a successful LLM plan, reinforcing or creating a template"""
+        task_norm = normalize_task(user_task)
+        signature = plan_signature(plan)
+        with self._lock:
+            template, slots = self._best_match(task_norm)
+            if template is not None:
+                if plan_signature(template.instantiate(slots)) == signature:
+                    template.support += 1
+                    return template
+                template.conflicts += 1
+
+            candidate = self.build_template(task_norm, plan)
+            if candidate is None:
+                return None
+            existing = self._templates.get(candidate.skeleton)
+            if existing is not None:
+                if plan_signature(existing.plan) == plan_signature(candidate.plan):
+                    existing.support += 1
+                    return existing
+                existing.conflicts += 1
+                if existing.conflicts <= existing.support:
+                    return existing
+                self._remove(existing)
+
+            self._add(candidate)
+            metrics.incr("plan_templates.learned")
+            return candidate
+
+    def _add(self, template):
+        if len(self._templates) >= self.max_templates:
+            weakest = min(self._templates.values(), key=lambda t: (t.confidence, t.support))
+            self._remove(weakest)
+        self._templates[template.skeleton] = template
+        self._by_first_word.setdefault(template.first_word, []).append(template)
+
+    def _remove(self, template):
+        del self._templates[template.skeleton]
+        self._by_first_word[template.first_word].remove(template)
+
+    def templates(self):
+        with self._lock:
+            return [t.to_dict() for t in self._templates.values()]
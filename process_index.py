@@ -0,0 +1,124 @@
+# process_index.py - Shared name -> PIDs index of the process table, refreshed incrementally
+import sys
+import threading
+import time
+
+import psutil
+
+
+class ProcessIndex:
+    """Process names indexed for O(1) exact and cheap substring lookups
+
+    A refresh lists the current PIDs and only reads the names of processes that
+    appeared since the last one, so its cost follows process churn rather than
+    the size of the process table. Lookups refresh when the index is older than
+    ttl_s; start_sampler() refreshes in the background instead. Substring
+    lookups scan the interned set of distinct names, not every process, and are
+    memoized until the table changes. A PID reused between two refreshes keeps
+    its old name until it disappears from a listing.
+    """
+    def __init__(self, ttl_s=1.0):
+        self.ttl_s = ttl_s
+        self._names = {}   # pid -> lowercase name
+        self._pids = {}    # lowercase name -> set of pids
+        self._matches = {}
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._stop = threading.Event()
+
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed_at < self.ttl_s:
+                return
+            current = set(psutil.pids())
+            known = set(self._names)
+            changed = False
+            for pid in known - current:
+                self._remove(pid)
+                changed = True
+            for pid in current - known:
+                try:
+                    name = psutil.Process(pid).name()
+                except psutil.Error:
+                    continue
+                self._add(pid, name)
+                changed = True
+            if changed:
+                self._matches.clear()
+            self._refreshed_at = time.monotonic()
+
+    def record(self, pid, name):
+        """Index a process we just started under the name it is looked up by
+
+        Lookups within ttl_s of the launch see it without a refresh; the entry
+        goes away with the PID like any other.
+        """
+        with self._lock:
+            if pid in self._names:
+                self._remove(pid)
+            self._add(pid, name)
+            self._matches.clear()
+
+    def _add(self, pid, name):
+        name = sys.intern(name.lower())
+        self._names[pid] = name
+        self._pids.setdefault(name, set()).add(pid)
+
+    def _remove(self, pid):
+        name = self._names.pop(pid)
+        pids = self._pids[name]
+        pids.discard(pid)
+        if not pids:
+            del self._pids[name]
+
+    def pids(self, name):
+        """PIDs of processes named exactly `name` (case-insensitive)"""
+        self.refresh()
+        with self._lock:
+            return set(self._pids.get(name.lower(), ()))
+
+    def find(self, fragment):
+        """PIDs of processes whose name contains `fragment` (case-insensitive)"""
+        self.refresh()
+        fragment = fragment.lower()
+        with self._lock:
+            names = self._matches.get(fragment)
+            if names is None:
+                names = self._matches[fragment] = [name for name in self._pids if fragment in name]
+            return {pid for name in names for pid in self._pids[name]}
+
+    def find_prefix(self, prefix):
+        """PIDs of processes whose name starts with `prefix` (case-insensitive)"""
+        self.refresh()
+        prefix = prefix.lower()
+        with self._lock:
+            return {pid for name, pids in self._pids.items() if name.startswith(prefix) for pid in pids}
+
+    def is_running(self, fragment):
+        return bool(self.find(fragment))
+
+    def start_sampler(self, interval_s=None):
+        """Refresh every interval_s seconds (default ttl_s) in a background thread"""
+        if self._sampler is not None:
+            return self
+        interval_s = interval_s or self.ttl_s
+        self._stop.clear()
+
+        def sample():
+            while not self._stop.wait(interval_s):
+                try:
+                    self.refresh(force=True)
+                except Exception as e:
+                    print(f"⚠️  Process sampling failed: {e}")
+
+        self._sampler = threading.Thread(target=sample, name="process-index", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop_sampler(self):
+        self._stop.set()
+        self._sampler = None
+
+
+process_index = ProcessIndex()
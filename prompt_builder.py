@@ -0,0 +1,186 @@
+# prompt_builder.py - Planning prompts with retrieval-selected few-shot examples
+import json
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+PROMPT_HEADER = "You are an RPA expert. Convert this task to JSON instructions."
+
+ACTION_DESCRIPTIONS = OrderedDict([
+    ("OPEN_APP", "Open application"),
+    ("OPEN_URL", "Open website"),
+    ("WEB_SEARCH", "Search on a website (YouTube, Google, etc.)"),
+    ("WEB_CLICK", "Click web element by text, ID, or CSS selector"),
+    ("WEB_TYPE", "Type in web input field"),
+    ("WEB_WAIT", "Wait for web element to load"),
+    ("CLICK", "Click coordinates"),
+    ("TYPE", "Type text"),
+    ("SCREENSHOT", "Take screenshot"),
+    ("WAIT", "Wait specified seconds"),
+    ("COPY", "Copy selection to clipboard"),
+    ("PASTE", "Paste from clipboard"),
+    ("SCROLL", "Scroll up or down"),
+    ("PRESS_KEY", "Press keyboard key"),
+    ("HOTKEY", "Key combinations"),
+])
+
+# Listed by the original prompt but not implemented by RPAExecutor
+UNSUPPORTED_ACTIONS = ("WEB_CLICK", "WEB_TYPE", "WEB_WAIT")
+
+# The four examples the original fixed prompt always embedded
+DEFAULT_EXAMPLES = [
+    ("play song despacito on youtube", [
+        {"action": "WEB_SEARCH", "params": {"site": "youtube", "query": "despacito", "auto_play": True}}]),
+    ("search for python tutorial on youtube", [
+        {"action": "WEB_SEARCH", "params": {"site": "youtube", "query": "python tutorial", "auto_play": False}}]),
+    ("open google and search for weather", [
+        {"action": "WEB_SEARCH", "params": {"site": "google", "query": "weather", "auto_play": False}}]),
+    ("open calculator and chrome", [
+        {"action": "OPEN_APP", "params": {"app": "calc", "wait_time": 3}},
+        {"action": "WAIT", "params": {"seconds": 2}},
+        {"action": "OPEN_URL", "params": {"url": "https://google.com", "wait_time": 4}}]),
+]
+
+EXAMPLE_LIBRARY = DEFAULT_EXAMPLES + [
+    ("play music shape of you and play song gangnam style", [
+        {"action": "WEB_SEARCH", "params": {"site": "youtube", "query": "shape of you", "auto_play": True}},
+        {"action": "WEB_SEARCH", "params": {"site": "youtube", "query": "gangnam style", "auto_play": True}}]),
+    ("open notepad and type hello world", [
+        {"action": "OPEN_APP", "params": {"app": "notepad", "wait_time": 3}},
+        {"action": "TYPE", "params": {"text": "hello world", "interval": 0.05}}]),
+    ("take a screenshot of my desktop", [
+        {"action": "SCREENSHOT", "params": {"filename": "screenshot.png"}}]),
+    ("go to github.com", [
+        {"action": "OPEN_URL", "params": {"url": "https://github.com", "wait_time": 4}}]),
+    ("copy the selected text and paste it in notepad", [
+        {"action": "COPY", "params": {}},
+        {"action": "OPEN_APP", "params": {"app": "notepad", "wait_time": 3}},
+        {"action": "PASTE", "params": {}}]),
+    ("scroll down on the current webpage", [
+        {"action": "SCROLL", "params": {"direction": "down", "clicks": 3}}]),
+    ("press alt+tab to switch windows", [
+        {"action": "HOTKEY", "params": {"keys": ["alt", "tab"]}}]),
+    ("open calculator and calculate 25 + 37", [
+        {"action": "OPEN_APP", "params": {"app": "calc", "wait_time": 3}},
+        {"action": "TYPE", "params": {"text": "25+37", "interval": 0.05}},
+        {"action": "PRESS_KEY", "params": {"key": "enter"}}]),
+    ("click the middle of the screen and wait 2 seconds", [
+        {"action": "CLICK", "params": {}},
+        {"action": "WAIT", "params": {"seconds": 2}}]),
+    ("open paint", [
+        {"action": "OPEN_APP", "params": {"app": "paint", "wait_time": 3}}]),
+]
+
+_TOKEN_RE = re.compile(r"\w+")
+_ROUGH_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Rough prompt token count (words and punctuation) for offline comparisons"""
+    return len(_ROUGH_TOKEN_RE.findall(text))
+
+
+def ngrams(text):
+    """Word unigrams and bigrams of a lowercased text"""
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def format_example(task, plan):
+    steps = ",\n".join(f"  {json.dumps(step)}" for step in plan)
+    return f'Task: "{task}"\nOutput: [\n{steps}\n]'
+
+
+class ExampleIndex:
+    """TF-IDF index over example tasks, queried by cosine similarity"""
+    def __init__(self, examples):
+        self.examples = list(examples)
+        documents = [ngrams(task) for task, _ in self.examples]
+        self.vocabulary = {}
+        for terms in documents:
+            for term in terms:
+                self.vocabulary.setdefault(term, len(self.vocabulary))
+
+        counts = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, terms in enumerate(documents):
+            for term in terms:
+                counts[row, self.vocabulary[term]] += 1.0
+        document_frequency = (counts > 0).sum(axis=0)
+        self.idf = np.log((1.0 + len(documents)) / (1.0 + document_frequency)).astype(np.float32) + 1.0
+        matrix = counts * self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.maximum(norms, 1e-9)
+
+    def vectorize(self, text):
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for term in ngrams(text):
+            column = self.vocabulary.get(term)
+            if column is not None:
+                vector[column] += 1.0
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def top_k(self, text, k):
+        """Return the k most similar (task, plan) examples, best first"""
+        scores = self.matrix @ self.vectorize(text)
+        k = min(k, len(self.examples))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [self.examples[i] for i in best]
+
+
+class PromptBuilder:
+    """Builds the planning prompt; 'retrieval' keeps only the k nearest examples and their actions"""
+    def __init__(self, mode="retrieval", k=2, examples=None):
+        self.mode = mode
+        self.k = k
+        self.examples = EXAMPLE_LIBRARY if examples is None else examples
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = ExampleIndex(self.examples)
+        return self._index
+
+    def select_examples(self, user_task):
+        if self.mode == "full":
+            return DEFAULT_EXAMPLES
+        return self.index.top_k(user_task, self.k)
+
+    def build_parts(self, user_task, shared_prefix=False):
+        """Split the prompt into a task-independent head and a per-task body
+
+        With shared_prefix the head lists every executable action, so it is identical
+        on every call and Ollama can keep it evaluated between requests.
+        """
+        examples = self.select_examples(user_task)
+        if shared_prefix:
+            actions = [a for a in ACTION_DESCRIPTIONS if a not in UNSUPPORTED_ACTIONS]
+        elif self.mode == "full":
+            actions = [a for a in ACTION_DESCRIPTIONS if a not in ("COPY", "PASTE", "SCROLL")]
+        else:
+            used = {step["action"] for _, plan in examples for step in plan}
+            actions = [a for a in ACTION_DESCRIPTIONS if a in used]
+
+        head = [PROMPT_HEADER, "", "Available actions:"]
+        head += [f"- {action}: {ACTION_DESCRIPTIONS[action]}" for action in actions]
+        head.append("")
+        if "WEB_SEARCH" in actions:
+            head += ["IMPORTANT: For YouTube tasks, use WEB_SEARCH action!", ""]
+
+        body = ["Examples:", ""]
+        for task, plan in examples:
+            body += [format_example(task, plan), ""]
+        body += [f'Now convert this task: "{user_task}"', "Output:"]
+        return "\n".join(head), "\n".join(body)
+
+    def build(self, user_task):
+        head, body = self.build_parts(user_task)
+        return head + "\n" + body
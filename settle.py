@@ -0,0 +1,110 @@
+# settle.py - Waits until the screen stops changing instead of sleeping fixed amounts
+import numpy as np
+
+from clock import RealClock
+
+
+class SettlePolicy:
+    """How long an action may need before the UI is ready for the next one
+
+    The screen counts as settled after `stable_frames` consecutive captures whose
+    mean pixel difference is at most `threshold` (0-1). require_change first waits
+    for the screen to change at all, for actions like launches whose effect shows
+    up late. `fixed_s` is the fixed sleep the policy replaces, for reporting.
+    """
+    def __init__(self, max_wait_s, fixed_s=0.0, stable_frames=2, interval_s=0.05, threshold=0.003,
+                 require_change=False):
+        self.max_wait_s = max_wait_s
+        self.fixed_s = fixed_s
+        self.stable_frames = stable_frames
+        self.interval_s = interval_s
+        self.threshold = threshold
+        self.require_change = require_change
+
+    def replace(self, **changes):
+        values = dict(vars(self))
+        values.update(changes)
+        return SettlePolicy(**values)
+
+
+# Policies actions declare in the action registry
+SETTLE_POLICIES = {
+    "none": SettlePolicy(0.0),
+    "input": SettlePolicy(0.5, fixed_s=0.5),
+    "screenshot": SettlePolicy(1.0, fixed_s=1.0),
+    "launch": SettlePolicy(3.0, fixed_s=3.0, require_change=True),
+}
+
+
+class ScreenSettler:
+    """Compares downsampled grayscale captures until consecutive ones match
+
+    grab() returns a PIL image (pyautogui.screenshot by default). When capturing
+    fails, e.g. without a display, the settler sleeps the policy's fixed time
+    instead, capped at its max wait, and skips capturing for retry_s (doubling
+    up to max_retry_s while grabs keep failing). Waits go through `clock`.
+    """
+    def __init__(self, grab=None, downsample=16, clock=None, retry_s=1.0, max_retry_s=60.0):
+        self.grab = grab
+        self.downsample = downsample
+        self.clock = clock or RealClock()
+        self.available = grab is not None
+        self.retry_s = retry_s
+        self.max_retry_s = max_retry_s
+        self._backoff_s = retry_s
+        self._retry_at = None
+
+    def frame(self):
+        image = self.grab().convert("L").reduce(self.downsample)
+        return np.asarray(image, dtype=np.int16)
+
+    def _try_frame(self):
+        """A capture, or None after a failed grab, which backs capturing off"""
+        try:
+            frame = self.frame()
+        except Exception:
+            self._retry_at = self.clock.now() + self._backoff_s
+            self._backoff_s = min(self._backoff_s * 2, self.max_retry_s)
+            return None
+        self._retry_at = None
+        self._backoff_s = self.retry_s
+        return frame
+
+    def _fixed_wait(self, policy, start):
+        """Sleep out the rest of the policy's fixed time, counted from start"""
+        clock = self.clock
+        remaining = start + min(policy.fixed_s, policy.max_wait_s) - clock.now()
+        if remaining > 0:
+            clock.sleep(remaining, "settle")
+        return clock.now() - start
+
+    def settle(self, policy):
+        """Wait until the screen is stable or max_wait_s passes; returns the seconds waited"""
+        if policy.max_wait_s <= 0:
+            return 0.0
+        clock = self.clock
+        start = clock.now()
+        if not self.available or (self._retry_at is not None and start < self._retry_at):
+            return self._fixed_wait(policy, start)
+
+        deadline = start + policy.max_wait_s
+        previous = self._try_frame()
+        if previous is None:
+            return self._fixed_wait(policy, start)
+        changed = not policy.require_change
+        stable = 0
+        while clock.now() < deadline:
+            clock.sleep(min(policy.interval_s, max(0.0, deadline - clock.now())), "settle")
+            current = self._try_frame()
+            if current is None:
+                return self._fixed_wait(policy, start)
+            difference = np.abs(current - previous).mean() / 255.0 if current.shape == previous.shape else 1.0
+            previous = current
+            if difference > policy.threshold:
+                changed = True
+                stable = 0
+            elif changed:
+                stable += 1
+                if stable >= policy.stable_frames:
+                    break
+        return clock.now() - start
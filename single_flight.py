@@ -0,0 +1,43 @@
+# single_flight.py - Coalesce concurrent identical requests into one call
+import copy
+import threading
+from concurrent.futures import Future
+
+from metrics import metrics
+
+
+class SingleFlight:
+    """Concurrent callers with the same key share one in-flight call"""
+    def __init__(self, name="singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn once per key at a time and hand every waiter a copy of its result"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+
+        if not leader:
+            metrics.incr(f"{self.name}.deduplicated")
+            return copy.deepcopy(future.result())
+
+        metrics.incr(f"{self.name}.executed")
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
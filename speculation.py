@@ -0,0 +1,122 @@
+# speculation.py - Prepare the browser from the rule-based plan while the LLM is planning
+import threading
+import time
+
+from action_registry import ACTIONS
+from metrics import metrics
+
+
+def first_web_search(plan):
+    """The first WEB_SEARCH step of a plan, or None"""
+    for step in plan or ():
+        if step.get("action") == "WEB_SEARCH":
+            return step
+    return None
+
+
+class Speculation:
+    """Warms the browser and opens the search site the rule-based plan points at
+
+    Only side-effect-free preparation is speculated (no apps are launched and
+    nothing is typed), so a wrong guess costs nothing but a closed browser.
+    """
+    def __init__(self, automator, rule_plan):
+        self.automator = automator
+        step = first_web_search(rule_plan)
+        site = step["params"].get("site", "").lower() if step else None
+        self.site = site if site in automator.SITE_HOMES else None
+        self.stages = {}
+        # Never close a browser the user already had open. A browser started for the
+        # guess lives in its own automator until the plan agrees with it, so discarding
+        # it cannot close a browser that a later task has started using.
+        self._owns_browser = automator.driver is None
+        self._prepared = automator.spawn() if self._owns_browser else automator
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def active(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.site is None:
+            return self
+        self._thread = threading.Thread(target=self._prepare, name="speculation", daemon=True)
+        self._thread.start()
+        metrics.incr("speculation.started")
+        return self
+
+    def _stage(self, name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.stages[name] = (start, time.perf_counter())
+        return result
+
+    def _prepare(self):
+        try:
+            if not self._stage("browser", self._prepared.setup_driver):
+                return
+            if not self._cancel.is_set():
+                self._stage("navigate", self._prepared.preload, self.site, self._cancel)
+        except Exception as e:
+            print(f"⚠️  Speculative preparation failed: {e}")
+
+    def _saved(self, stages, resolved_at):
+        """Seconds of reused preparation that overlapped the wait for the plan"""
+        saved = 0.0
+        for name in stages:
+            if name in self.stages:
+                # Work still running when the plan arrived only counts up to that point
+                start, end = self.stages[name]
+                saved += max(0.0, min(end, resolved_at) - start)
+        return saved
+
+    def resolve(self, plan, resolved_at=None):
+        """Reuse or discard the prepared state once the real plan is known
+
+        Returns a report with the agreement level ('full' when the plan searches the
+        prepared site, 'browser' when it only needs a browser, 'none' otherwise)
+        and the time saved.
+        """
+        if not self.active:
+            return {"agreement": "skipped", "site": None, "time_saved_s": 0.0}
+        resolved_at = resolved_at or time.perf_counter()
+        step = first_web_search(plan)
+        needs_browser = "browser" in ACTIONS.resources(plan or ())
+
+        if step is not None and step["params"].get("site", "").lower() == self.site:
+            agreement, reused = "full", ("browser", "navigate")
+        elif needs_browser:
+            agreement, reused = "browser", ("browser",)
+            self._cancel.set()
+        else:
+            agreement, reused = "none", ()
+            self._cancel.set()
+
+        if reused:
+            # Wait for the preparation we are about to rely on
+            self._thread.join()
+            if self._owns_browser and not self.automator.adopt(self._prepared):
+                # Another browser was opened meanwhile; keep that one
+                self._prepared.close()
+                agreement, reused = "none", ()
+            elif agreement == "browser":
+                self.automator.forget_preload()
+        else:
+            threading.Thread(target=self._discard, name="speculation-discard", daemon=True).start()
+
+        saved = self._saved(reused, resolved_at)
+        metrics.incr(f"speculation.{agreement}")
+        metrics.observe("speculation.time_saved_s", saved)
+        report = {"agreement": agreement, "site": self.site, "time_saved_s": saved}
+        if saved:
+            print(f"⚡ Speculation {agreement}: saved {saved:.2f}s")
+        return report
+
+    def _discard(self):
+        self._thread.join()
+        if self._owns_browser:
+            self._prepared.close()
+        else:
+            # The cancelled preload never marks the site; this clears one marked before
+            self.automator.forget_preload(self.site)
@@ -0,0 +1,165 @@
+# task_runner.py - Unattended runs of task files: stream tasks in, one JSONL result per task out
+import csv
+import io
+import json
+import sys
+import time
+import uuid
+
+from metrics import metrics
+
+
+def _open_source(path):
+    return sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+
+
+def _jsonl_tasks(lines):
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # Plain text lines are tasks too, so `echo "Take a screenshot" | ...` works
+            record = line
+        if isinstance(record, str):
+            record = {"task": record}
+        elif not isinstance(record, dict):
+            # Reported as this line's result instead of stopping the run
+            record = {"line": number,
+                      "error": f"line {number}: expected a task object or string, got {type(record).__name__}"}
+        yield record
+
+
+def _csv_tasks(lines):
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [name.strip().lower() for name in header]
+    if "task" not in columns:
+        # No header row: every row is a task in its first column
+        columns = ["task"] + columns[1:]
+        yield {"task": header[0]}
+    for row in reader:
+        if row and any(cell.strip() for cell in row):
+            yield dict(zip(columns, row))
+
+
+def read_tasks(path, fmt=None):
+    """Yield task records ({'task': ..., optional 'id'}) from a JSONL or CSV file, or stdin for '-'
+
+    Records are read one at a time, so memory does not grow with the file.
+    Lines that cannot be a task are yielded as {'line', 'error'} records.
+    """
+    if fmt is None:
+        fmt = "csv" if str(path).lower().endswith(".csv") else "jsonl"
+    parse = _csv_tasks if fmt == "csv" else _jsonl_tasks
+    source = _open_source(path)
+    try:
+        for record in parse(source):
+            if "error" in record:
+                yield record
+                continue
+            task = str(record.get("task") or "").strip()
+            if task:
+                record["task"] = task
+                yield record
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+class TaskRunner:
+    """Plans and executes tasks one after another with a single bot, executor and browser"""
+    def __init__(self, bot, executor, output, stop_on_error=False):
+        self.bot = bot
+        self.executor = executor
+        self.output = output
+        self.stop_on_error = stop_on_error
+        self.counts = {"tasks": 0, "completed": 0, "failed": 0}
+
+    def run_task(self, index, record):
+        """Plan and execute one task and return its result record"""
+        if "error" in record:
+            return {"index": index, "id": None, "task": None, "line": record.get("line"),
+                    "status": "invalid", "error": record["error"], "total_s": 0.0}
+        task = record["task"]
+        session_id = str(record.get("id") or uuid.uuid4())
+        result = {"index": index, "id": record.get("id"), "task": task, "session_id": session_id}
+        start = time.perf_counter()
+        try:
+            instructions, speculation = self.bot.speculative_plan(task, self.executor.web_automator, session_id)
+            planned = time.perf_counter()
+            result["plan_s"] = planned - start
+            result["speculation"] = speculation["agreement"] if speculation else None
+            if not instructions:
+                result["status"] = "no_plan"
+            else:
+                report = self.executor.execute_instructions(instructions, interactive=False)
+                result["execute_s"] = time.perf_counter() - planned
+                result.update(report)
+                result["status"] = "completed" if not report["failed_steps"] else "partial"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+        result["total_s"] = time.perf_counter() - start
+        return result
+
+    def run(self, records):
+        """Run every record, writing each result as soon as it is known; returns the counts"""
+        for index, record in enumerate(records):
+            result = self.run_task(index, record)
+            self.output.write(json.dumps(result) + "\n")
+            self.output.flush()
+
+            ok = result["status"] == "completed"
+            self.counts["tasks"] += 1
+            self.counts["completed" if ok else "failed"] += 1
+            metrics.incr(f"runner.{result['status']}")
+            metrics.observe("runner.task_s", result["total_s"])
+            if not ok and self.stop_on_error:
+                break
+        return self.counts
+
+
+# (name, JSONL input, expected records); checked by running this module
+READ_CASES = [
+    ("objects, strings and plain text are tasks",
+     '{"task": "open notepad", "id": 1}\n"take a screenshot"\nscroll down\n',
+     [{"task": "open notepad", "id": 1}, {"task": "take a screenshot"}, {"task": "scroll down"}]),
+    ("other JSON values are per-line errors",
+     '2024\n["open notepad"]\n{"task": "open calculator"}\n',
+     [{"line": 1, "error": "line 1: expected a task object or string, got int"},
+      {"line": 2, "error": "line 2: expected a task object or string, got list"},
+      {"task": "open calculator"}]),
+]
+
+
+def check_read_cases():
+    failures = 0
+    for name, text, expected in READ_CASES:
+        actual = list(_jsonl_tasks(io.StringIO(text)))
+        if actual != expected:
+            failures += 1
+            print(f"❌ {name}\n   expected {json.dumps(expected)}\n   got      {json.dumps(actual)}")
+        else:
+            print(f"✅ {name}")
+
+    class NeverCalled:
+        def speculative_plan(self, *args):
+            raise AssertionError("an invalid line was planned")
+
+    output = io.StringIO()
+    runner = TaskRunner(NeverCalled(), None, output)
+    counts = runner.run(_jsonl_tasks(io.StringIO('2024\n"x"\n')))
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    ok = (results[0]["status"] == "invalid" and len(results) == 2
+          and counts == {"tasks": 2, "completed": 0, "failed": 2})
+    print(f"{'✅' if ok else '❌'} an invalid line is one failed result and the run goes on")
+    return failures + (not ok)
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if check_read_cases() else 0)
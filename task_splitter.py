@@ -0,0 +1,48 @@
+# task_splitter.py - One-pass splitting of multi-instruction tasks into search terms
+import re
+
+# Phrases that introduce a search term, in priority order
+SEARCH_PATTERNS = (
+    "play song",
+    "play music",
+    "search for",
+    "find song",
+    "listen to",
+    "watch video",
+    "play video"
+)
+
+_SEPARATOR_RE = re.compile(r" (?:and|then|,|&) ", re.IGNORECASE)
+_SEARCH_PATTERN_RE = re.compile("|".join(re.escape(p) for p in SEARCH_PATTERNS))
+_PRIORITY = {pattern: i for i, pattern in enumerate(SEARCH_PATTERNS)}
+_YOUTUBE_RE = re.compile(r"on youtube|youtube")
+
+
+def split_tasks(user_task):
+    """Split a task on ' and ', ' then ', ' , ' and ' & ' in a single pass"""
+    return [part.strip() for part in _SEPARATOR_RE.split(user_task)]
+
+
+def search_term(clause):
+    """The search term of one clause: the text around its search phrase, lowercased
+
+    A clause without a search phrase is returned as it was written.
+    """
+    lowered = clause.lower()
+    found = _SEARCH_PATTERN_RE.findall(lowered)
+    if not found:
+        return clause.strip()
+    pattern = min(found, key=_PRIORITY.__getitem__)
+    return _YOUTUBE_RE.sub("", lowered.replace(pattern, "")).strip()
+
+
+def extract_search_terms(user_task, default="music"):
+    """Unique search terms of every clause, in order of first appearance"""
+    seen = set()
+    terms = []
+    for clause in split_tasks(user_task):
+        term = search_term(clause)
+        if term and term not in seen:
+            seen.add(term)
+            terms.append(term)
+    return terms if terms else [default]